@@ -0,0 +1,150 @@
+import time
+from asyncio import Future, shield
+from collections import OrderedDict
+
+from anydex.core.histogram import Histogram
+
+
+class AddressResolver(object):
+    """
+    Resolves trader ids to network addresses and caches the results.
+
+    Known addresses are kept for a limited time and the least recently used addresses are evicted when the cache is
+    full. Concurrent lookups of the same trader share a single lookup and failed lookups are remembered for a short
+    time, so a burst of messages to an unknown trader results in at most one lookup.
+    """
+
+    def __init__(self, lookup, ttl=3600, negative_ttl=30, max_size=10000, clock=time.time):
+        """
+        :param lookup: Coroutine function that looks up the address of a trader id, returning None if not found
+        :param ttl: How long a known address is kept, in seconds
+        :param negative_ttl: How long a failed lookup is remembered, in seconds
+        :param max_size: The maximum number of addresses to keep
+        :param clock: Function that returns the current time in seconds
+        """
+        self.lookup = lookup
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.clock = clock
+
+        self.addresses = OrderedDict()  # Map: TraderId -> (address, expiry time), ordered from least recently used
+        self.failures = OrderedDict()  # Map: TraderId -> expiry time of the failed lookup
+        self.pending_lookups = {}  # Map: TraderId -> Future that fires with the address
+
+        self.num_hits = 0
+        self.num_negative_hits = 0
+        self.num_coalesced = 0
+        self.num_lookups = 0
+        self.num_failed_lookups = 0
+        self.lookup_latency = Histogram()
+
+    def get(self, trader_id):
+        """
+        Return the cached address of a trader, or None if the address is unknown or expired.
+        :type trader_id: TraderId
+        :rtype: tuple
+        """
+        entry = self.addresses.get(trader_id)
+        if not entry:
+            return None
+
+        address, expiry = entry
+        if expiry <= self.clock():
+            del self.addresses[trader_id]
+            return None
+
+        self.addresses.move_to_end(trader_id)
+        return address
+
+    def update(self, trader_id, address):
+        """
+        Store the address of a trader, for instance when we receive a message from that trader.
+        :type trader_id: TraderId
+        :type address: tuple
+        """
+        self.failures.pop(trader_id, None)
+        self.addresses[trader_id] = (address, self.clock() + self.ttl)
+        self.addresses.move_to_end(trader_id)
+        while len(self.addresses) > self.max_size:
+            self.addresses.popitem(last=False)
+
+    def pop(self, trader_id, default=None):
+        """
+        Forget the address of a trader.
+        """
+        self.failures.pop(trader_id, None)
+        entry = self.addresses.pop(trader_id, None)
+        return entry[0] if entry else default
+
+    def clear(self):
+        self.addresses.clear()
+        self.failures.clear()
+
+    def has_failed_recently(self, trader_id):
+        expiry = self.failures.get(trader_id)
+        if expiry is None:
+            return False
+        if expiry <= self.clock():
+            del self.failures[trader_id]
+            return False
+        return True
+
+    async def resolve(self, trader_id):
+        """
+        Return the address of a trader, looking it up if it is not cached.
+        :type trader_id: TraderId
+        :return: The address of the trader, or None if it could not be found
+        """
+        address = self.get(trader_id)
+        if address:
+            self.num_hits += 1
+            return address
+
+        if self.has_failed_recently(trader_id):
+            self.num_negative_hits += 1
+            return None
+
+        if trader_id in self.pending_lookups:
+            self.num_coalesced += 1
+            return await shield(self.pending_lookups[trader_id])
+
+        future = Future()
+        self.pending_lookups[trader_id] = future
+        self.num_lookups += 1
+        start_time = self.clock()
+        try:
+            address = await self.lookup(trader_id)
+            if address:
+                self.update(trader_id, address)
+            else:
+                self.num_failed_lookups += 1
+                self.failures[trader_id] = self.clock() + self.negative_ttl
+                while len(self.failures) > self.max_size:
+                    self.failures.popitem(last=False)
+            future.set_result(address)
+            return address
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # The exception is raised to the caller, there might be no other waiters
+            raise
+        finally:
+            self.lookup_latency.record_duration(self.clock() - start_time)
+            self.pending_lookups.pop(trader_id, None)
+            if not future.done():  # The lookup has been cancelled
+                future.cancel()
+
+    def to_dictionary(self):
+        num_requests = self.num_hits + self.num_negative_hits + self.num_coalesced + self.num_lookups
+        return {
+            "size": len(self.addresses),
+            "failed_size": len(self.failures),
+            "pending_lookups": len(self.pending_lookups),
+            "hits": self.num_hits,
+            "negative_hits": self.num_negative_hits,
+            "coalesced": self.num_coalesced,
+            "lookups": self.num_lookups,
+            "failed_lookups": self.num_failed_lookups,
+            "hit_rate": (num_requests - self.num_lookups) / num_requests if num_requests else 0,
+            "lookup_latency": self.lookup_latency.to_dictionary()
+        }
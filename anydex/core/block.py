@@ -1,7 +1,166 @@
-from ipv8.attestation.trustchain.block import TrustChainBlock
+from collections import OrderedDict
+from functools import wraps
+
+from ipv8.attestation.trustchain.block import EMPTY_SIG, TrustChainBlock
 
 from anydex.core import MAX_ORDER_TIMEOUT
 
+VALIDATION_CACHE_SIZE = 10000
+
+
+def compile_schema(schema, exact=False):
+    """
+    Compile a schema into a function that verifies in a single pass whether a dictionary matches the schema.
+    :param schema: Dictionary that maps every required field either to its type or to a function that validates the
+                   value of the field
+    :param exact: Whether the dictionary may only contain the fields in the schema
+    :return: A function that returns whether a dictionary matches the schema
+    """
+    rules = tuple((key, rule, None) if isinstance(rule, type) else (key, object, rule) for key, rule in schema.items())
+    num_fields = len(rules)
+
+    def validate(container):
+        if not isinstance(container, dict) or (exact and len(container) != num_fields):
+            return False
+        for key, required_type, validate_value in rules:
+            if key not in container:
+                return False
+            value = container[key]
+            if not isinstance(value, required_type) or (validate_value and not validate_value(value)):
+                return False
+        return True
+
+    return validate
+
+
+def is_valid_trader_id(trader_id):
+    if not isinstance(trader_id, str) or len(trader_id) != 40:
+        return False
+
+    try:
+        int(trader_id, 16)
+    except ValueError:  # Not a hexadecimal
+        return False
+    return True
+
+
+has_asset_pair_fields = compile_schema({
+    'first': compile_schema({'amount': int, 'type': str}),
+    'second': compile_schema({'amount': int, 'type': str})
+})
+
+
+def is_valid_asset_pair(assets_dict, amount_positive=True):
+    if not has_asset_pair_fields(assets_dict):
+        return False
+
+    first_amount = assets_dict['first']['amount']
+    second_amount = assets_dict['second']['amount']
+    if first_amount.bit_length() > 63 or second_amount.bit_length() > 63:
+        return False
+
+    if amount_positive and (first_amount <= 0 or second_amount <= 0):
+        return False
+
+    return True
+
+
+def is_valid_transferred_assets(assets_dict):
+    return is_valid_asset_pair(assets_dict, amount_positive=False)
+
+
+def is_valid_timeout(timeout):
+    return isinstance(timeout, int) and 0 <= timeout <= MAX_ORDER_TIMEOUT
+
+
+is_valid_tick = compile_schema({
+    'trader_id': is_valid_trader_id,
+    'order_number': int,
+    'assets': is_valid_asset_pair,
+    'timeout': is_valid_timeout,
+    'timestamp': int,
+    'traded': object
+})
+
+is_valid_tx_init = compile_schema({
+    'trader_id': is_valid_trader_id,
+    'order_number': int,
+    'partner_trader_id': is_valid_trader_id,
+    'partner_order_number': int,
+    'assets': is_valid_asset_pair,
+    'timestamp': int
+}, exact=True)
+
+is_valid_tx = compile_schema({
+    'trader_id': is_valid_trader_id,
+    'order_number': int,
+    'partner_trader_id': is_valid_trader_id,
+    'partner_order_number': int,
+    'transaction_id': str,
+    'assets': is_valid_asset_pair,
+    'transferred': is_valid_transferred_assets,
+    'timestamp': int
+}, exact=True)
+
+is_valid_payment = compile_schema({
+    'trader_id': is_valid_trader_id,
+    'transaction_id': str,
+    'transferred': dict,
+    'payment_id': str,
+    'address_from': str,
+    'address_to': str,
+    'timestamp': int
+}, exact=True)
+
+is_valid_tick_transaction = compile_schema({'tick': is_valid_tick})
+is_valid_cancel_transaction = compile_schema({'trader_id': str, 'order_number': int})
+is_valid_tx_init_transaction = compile_schema({'tx': is_valid_tx_init})
+is_valid_tx_done_transaction = compile_schema({'tx': is_valid_tx, 'ask': is_valid_tick, 'bid': is_valid_tick})
+is_valid_payment_transaction = compile_schema({'payment': is_valid_payment})
+
+
+def memoize_validation(method):
+    """
+    Remember the result of a block validation method by block hash, so the same block received from multiple peers is
+    only validated once. Only signed blocks are remembered, since their hash covers the complete block.
+    """
+    @wraps(method)
+    def wrapper(self):
+        if self.signature == EMPTY_SIG:
+            return method(self)
+
+        key = (self.hash, method.__name__)
+        result = MarketBlock.validation_results.get(key)
+        if result is None:
+            result = method(self)
+            MarketBlock.validation_results[key] = result
+            if len(MarketBlock.validation_results) > VALIDATION_CACHE_SIZE:
+                MarketBlock.validation_results.popitem(last=False)
+        return result
+    return wrapper
+
+
+class VerifiedSignatureCrypto(object):
+    """
+    Crypto wrapper for a block of which the signature has already been verified, for instance in another thread.
+    The verified signature is accepted without verifying it again, as long as it is checked for the same public key and
+    data. Other operations are passed to the wrapped crypto.
+    """
+
+    def __init__(self, crypto, public_key, data, signature):
+        self.crypto = crypto
+        self.public_key = public_key
+        self.data = data
+        self.signature = signature
+
+    def is_valid_signature(self, key, data, signature):
+        if signature == self.signature and data == self.data and key.key_to_bin() == self.public_key:
+            return True
+        return self.crypto.is_valid_signature(key, data, signature)
+
+    def __getattr__(self, name):
+        return getattr(self.crypto, name)
+
 
 class MarketBlock(TrustChainBlock):
     """
@@ -9,6 +168,16 @@ class MarketBlock(TrustChainBlock):
     It contains various utility methods to verify validity within the context of the market.
     """
 
+    validation_results = OrderedDict()  # Map: (block hash, validation method) -> validation result
+
+    def mark_signature_verified(self):
+        """
+        Remember that the signature of this block is valid, so it is not verified again when the block is validated.
+        """
+        if not isinstance(self.crypto, VerifiedSignatureCrypto):
+            self.crypto = VerifiedSignatureCrypto(self.crypto, self.public_key, self.pack(signature=False),
+                                                  self.signature)
+
     @staticmethod
     def has_fields(needles, haystack):
         for needle in needles:
@@ -23,202 +192,65 @@ class MarketBlock(TrustChainBlock):
                 return False
         return True
 
-    @staticmethod
-    def is_valid_asset_pair(assets_dict, amount_positive=True):
-        if 'first' not in assets_dict or 'second' not in assets_dict:
-            return False
-        if 'amount' not in assets_dict['first'] or 'type' not in assets_dict['first']:
-            return False
-        if 'amount' not in assets_dict['second'] or 'type' not in assets_dict['second']:
-            return False
-
-        if not MarketBlock.has_required_types([('amount', int), ('type', str)],
-                                              assets_dict['first']):
-            return False
-        if not MarketBlock.has_required_types([('amount', int), ('type', str)],
-                                              assets_dict['second']):
-            return False
-
-        if assets_dict['first']['amount'].bit_length() > 63 or assets_dict['second']['amount'].bit_length() > 63:
-            return False
-
-        if amount_positive and (assets_dict['first']['amount'] <= 0 or assets_dict['second']['amount'] <= 0):
-            return False
-
-        return True
-
-    @staticmethod
-    def is_valid_trader_id(trader_id):
-        if len(trader_id) != 40:
-            return False
-
-        try:
-            int(trader_id, 16)
-        except ValueError:  # Not a hexadecimal
-            return False
-        return True
+    is_valid_asset_pair = staticmethod(is_valid_asset_pair)
+    is_valid_trader_id = staticmethod(is_valid_trader_id)
 
     @staticmethod
     def is_valid_tick(tick):
         """
         Verify whether a dictionary that contains a tick, is valid.
         """
-        required_fields = ['trader_id', 'order_number', 'assets', 'timeout', 'timestamp', 'traded']
-        if not MarketBlock.has_fields(required_fields, tick):
-            return False
-
-        required_types = [('trader_id', str), ('order_number', int), ('assets', dict), ('timestamp', int),
-                          ('timeout', int)]
-
-        if not MarketBlock.is_valid_trader_id(tick['trader_id']):
-            return False
-        if not MarketBlock.is_valid_asset_pair(tick['assets']):
-            return False
-        if not MarketBlock.has_required_types(required_types, tick):
-            return False
-        if tick['timeout'] < 0 or tick['timeout'] > MAX_ORDER_TIMEOUT:
-            return False
-
-        return True
+        return is_valid_tick(tick)
 
     @staticmethod
     def is_valid_tx_init(tx):
         """
         Verify whether a tx_init that contains a tx transaction, is valid.
         """
-        required_fields = ['trader_id', 'order_number', 'partner_trader_id', 'partner_order_number',
-                           'assets', 'timestamp']
-        if not MarketBlock.has_fields(required_fields, tx):
-            return False
-        if len(tx) != len(required_fields):
-            return False
-
-        required_types = [('trader_id', str), ('order_number', int), ('partner_trader_id', str),
-                          ('partner_order_number', int), ('assets', dict), ('timestamp', int)]
-
-        if not MarketBlock.is_valid_trader_id(tx['trader_id']) or not \
-                MarketBlock.is_valid_trader_id(tx['partner_trader_id']):
-            return False
-        if not MarketBlock.is_valid_asset_pair(tx['assets']):
-            return False
-        if not MarketBlock.has_required_types(required_types, tx):
-            return False
-
-        return True
+        return is_valid_tx_init(tx)
 
     @staticmethod
     def is_valid_tx(tx):
         """
         Verify whether a dictionary that contains a transaction, is valid.
         """
-        required_fields = ['trader_id', 'order_number', 'partner_trader_id', 'partner_order_number', 'transaction_id',
-                           'assets', 'transferred', 'timestamp']
-        if not MarketBlock.has_fields(required_fields, tx):
-            return False
-        if len(tx) != len(required_fields):
-            return False
-
-        required_types = [('trader_id', str), ('order_number', int), ('partner_trader_id', str),
-                          ('partner_order_number', int), ('transaction_id', str), ('assets', dict),
-                          ('transferred', dict), ('timestamp', int)]
-
-        if not MarketBlock.is_valid_trader_id(tx['trader_id']) or not \
-                MarketBlock.is_valid_trader_id(tx['partner_trader_id']):
-            return False
-        if not MarketBlock.is_valid_asset_pair(tx['assets']):
-            return False
-        if not MarketBlock.is_valid_asset_pair(tx['transferred'], amount_positive=False):
-            return False
-        if not MarketBlock.has_required_types(required_types, tx):
-            return False
-
-        return True
+        return is_valid_tx(tx)
 
     @staticmethod
     def is_valid_payment(payment):
         """
         Verify whether a dictionary that contains a payment, is valid.
         """
-        required_fields = ['trader_id', 'transaction_id', 'transferred', 'payment_id', 'address_from',
-                           'address_to', 'timestamp']
-        if not MarketBlock.has_fields(required_fields, payment):
-            return False
-        if len(payment) != len(required_fields):
-            return False
-
-        required_types = [('trader_id', str), ('transaction_id', str), ('transferred', dict),
-                          ('payment_id', str), ('address_from', str), ('address_to', str), ('timestamp', int)]
-        if not MarketBlock.is_valid_trader_id(payment['trader_id']):
-            return False
-        if not MarketBlock.has_required_types(required_types, payment):
-            return False
-
-        return True
+        return is_valid_payment(payment)
 
+    @memoize_validation
     def is_valid_tick_block(self):
         """
         Verify whether an incoming block with the tick type is valid.
         """
-        if self.type != b"ask" and self.type != b"bid":
-            return False
-        if not MarketBlock.has_fields(['tick'], self.transaction):
-            return False
-        if not MarketBlock.is_valid_tick(self.transaction['tick']):
-            return False
-
-        return True
+        return (self.type == b"ask" or self.type == b"bid") and is_valid_tick_transaction(self.transaction)
 
+    @memoize_validation
     def is_valid_cancel_block(self):
         """
         Verify whether an incoming block with cancel type is valid.
         """
-        if self.type != b"cancel_order":
-            return False
-
-        if not MarketBlock.has_fields(['trader_id', 'order_number'], self.transaction):
-            return False
-
-        required_types = [('trader_id', str), ('order_number', int)]
-        if not MarketBlock.has_required_types(required_types, self.transaction):
-            return False
-
-        return True
+        return self.type == b"cancel_order" and is_valid_cancel_transaction(self.transaction)
 
+    @memoize_validation
     def is_valid_tx_init_done_block(self):
         """
         Verify whether an incoming block with tx_init/tx_done type is valid.
         """
-        if self.type != b"tx_init" and self.type != b"tx_done":
-            return False
-
-        if not MarketBlock.has_fields(['tx'], self.transaction):
-            return False
-
-        if self.type == b"tx_done" and not MarketBlock.has_fields(['ask', 'bid'], self.transaction):
-            return False
-
-        if self.type == b"tx_done" and not MarketBlock.is_valid_tick(self.transaction['ask']):
-            return False
-        if self.type == b"tx_done" and not MarketBlock.is_valid_tick(self.transaction['bid']):
-            return False
-
-        if self.type == b"tx_init" and not MarketBlock.is_valid_tx_init(self.transaction['tx']):
-            return False
-        elif self.type == b"tx_done" and not MarketBlock.is_valid_tx(self.transaction['tx']):
-            return False
-
-        return True
+        if self.type == b"tx_init":
+            return is_valid_tx_init_transaction(self.transaction)
+        if self.type == b"tx_done":
+            return is_valid_tx_done_transaction(self.transaction)
+        return False
 
+    @memoize_validation
     def is_valid_tx_payment_block(self):
         """
         Verify whether an incoming block with tx_payment type is valid.
         """
-        if self.type != b"tx_payment":
-            return False
-
-        if not MarketBlock.has_fields(['payment'], self.transaction):
-            return False
-        if not MarketBlock.is_valid_payment(self.transaction['payment']):
-            return False
-
-        return True
+        return self.type == b"tx_payment" and is_valid_payment_transaction(self.transaction)
@@ -0,0 +1,125 @@
+import logging
+from asyncio import Future, ensure_future, gather, get_event_loop
+from itertools import chain
+
+from ipv8.keyvault.crypto import default_eccrypto
+
+
+def verify_signatures(blocks):
+    """
+    Verify the signatures of a list of blocks. This function does not touch the event loop and can be called from
+    another thread.
+    :param blocks: The blocks to verify
+    :return: A list with a boolean for every block, indicating whether its signature is valid
+    :rtype: [bool]
+    """
+    results = []
+    for block in blocks:
+        try:
+            results.append(bool(default_eccrypto.is_valid_public_bin(block.public_key) and
+                                default_eccrypto.is_valid_signature(
+                                    default_eccrypto.key_from_public_bin(block.public_key),
+                                    block.pack(signature=False), block.signature)))
+        except Exception:
+            results.append(False)
+    return results
+
+
+class BlockVerifier(object):
+    """
+    Verifies the signatures of incoming blocks outside of the event loop.
+
+    Blocks that are submitted during the same iteration of the event loop are verified in batches in an executor.
+    The results are delivered in the order in which the blocks have been submitted. Blocks with a valid signature are
+    marked as verified, so the signature is not checked again when the block is validated.
+    """
+
+    def __init__(self, executor=None, batch_size=32):
+        """
+        :param executor: The executor to verify the signatures in, or None to verify them on the event loop
+        :param batch_size: The maximum number of blocks to verify in a single executor job
+        :type batch_size: int
+        """
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.executor = executor
+        self.batch_size = batch_size
+        self.queue = []  # List of (blocks, Future) that wait for the next batch
+        self.flush_scheduled = False
+        self.last_delivery = None  # The task that delivers the results of the last batch
+        self.num_verified = 0
+        self.num_invalid = 0
+
+    def verify(self, blocks):
+        """
+        Verify the signatures of a list of blocks.
+        :param blocks: The blocks to verify
+        :return: A future that fires with a list of booleans, indicating whether the signature of each block is valid
+        :rtype: Future
+        """
+        future = Future()
+        self.queue.append((blocks, future))
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            get_event_loop().call_soon(self.flush)
+        return future
+
+    def flush(self):
+        """
+        Start the verification of all blocks that have been submitted.
+        """
+        self.flush_scheduled = False
+        requests, self.queue = self.queue, []
+        if not requests:
+            return
+
+        blocks = [block for request_blocks, _ in requests for block in request_blocks]
+        if self.executor:
+            loop = get_event_loop()
+            verification = gather(*[loop.run_in_executor(self.executor, verify_signatures,
+                                                         blocks[index:index + self.batch_size])
+                                    for index in range(0, len(blocks), self.batch_size)])
+        else:
+            verification = Future()
+            verification.set_result([verify_signatures(blocks)])
+
+        self.last_delivery = ensure_future(self.deliver(self.last_delivery, verification, requests))
+
+    async def deliver(self, previous_delivery, verification, requests):
+        """
+        Deliver the results of a batch, after the results of the previous batch have been delivered.
+        """
+        try:
+            results = list(chain.from_iterable(await verification))
+        except Exception as e:
+            self._logger.error("Failed to verify block signatures: %s", e)
+            results = None
+
+        if previous_delivery and not previous_delivery.done():
+            await previous_delivery
+
+        offset = 0
+        for request_blocks, future in requests:
+            if results is not None:
+                request_results = results[offset:offset + len(request_blocks)]
+            else:
+                request_results = [False] * len(request_blocks)
+            offset += len(request_blocks)
+            if future.done():
+                continue
+
+            for block, valid in zip(request_blocks, request_results):
+                if valid:
+                    self.num_verified += 1
+                    block.mark_signature_verified()
+                else:
+                    self.num_invalid += 1
+            future.set_result(request_results)
+
+    async def shutdown(self):
+        for _, future in self.queue:
+            future.cancel()
+        self.queue = []
+        if self.last_delivery and not self.last_delivery.done():
+            self.last_delivery.cancel()
+        if self.executor:
+            self.executor.shutdown(wait=False)
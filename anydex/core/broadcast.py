@@ -0,0 +1,149 @@
+import time
+from collections import OrderedDict, deque
+
+from ipv8.attestation.trustchain.payload import HalfBlockBroadcastPayload, HalfBlockPairBroadcastPayload,\
+    HalfBlockPayload
+
+
+class BlockPacketCache(object):
+    """
+    Cache with the serialized payloads of blocks that we send to other peers.
+
+    The payload of a block is serialized once and reused when the block is sent again, for instance when it is sent to
+    multiple matchmakers or when it is included in order book sync responses to several peers. Only the block payload
+    is cached, the headers of a packet are created for every message.
+    """
+
+    def __init__(self, serializer, max_size=1000):
+        """
+        :param serializer: The serializer used to serialize the payloads
+        :param max_size: The maximum number of serialized payloads to keep
+        :type max_size: int
+        """
+        self.serializer = serializer
+        self.max_size = max_size
+        self.payloads = OrderedDict()  # Map: key -> serialized payload, ordered from least recently used
+        self.num_hits = 0
+        self.num_misses = 0
+
+    def get_payload(self, key, create_payload):
+        """
+        Return the serialized payload with a specific key, creating and serializing it if it is not cached.
+        :param key: The key of the payload
+        :param create_payload: Function that creates the payload to serialize
+        :rtype: bytes
+        """
+        serialized_payload = self.payloads.get(key)
+        if serialized_payload is not None:
+            self.num_hits += 1
+            self.payloads.move_to_end(key)
+            return serialized_payload
+
+        self.num_misses += 1
+        serialized_payload = self.serializer.pack_multiple(create_payload().to_pack_list())[0]
+        self.payloads[key] = serialized_payload
+        while len(self.payloads) > self.max_size:
+            self.payloads.popitem(last=False)
+        return serialized_payload
+
+    def get_block_payload(self, block):
+        return self.get_payload((b'block', block.hash), lambda: HalfBlockPayload.from_half_block(block))
+
+    def get_block_broadcast_payload(self, block, ttl):
+        return self.get_payload((b'broadcast', block.hash, ttl),
+                                lambda: HalfBlockBroadcastPayload.from_half_block(block, ttl))
+
+    def get_block_pair_broadcast_payload(self, block1, block2, ttl):
+        return self.get_payload((b'pair_broadcast', block1.hash, block2.hash, ttl),
+                                lambda: HalfBlockPairBroadcastPayload.from_half_blocks(block1, block2, ttl))
+
+    def clear(self):
+        self.payloads.clear()
+
+    def to_dictionary(self):
+        return {
+            "size": len(self.payloads),
+            "hits": self.num_hits,
+            "misses": self.num_misses
+        }
+
+
+class PacketSender(object):
+    """
+    Sends packets through an endpoint and keeps track of the number of packets and bytes that are sent.
+
+    A packet that is sent to multiple addresses is written to the endpoint in a single burst.
+    """
+
+    def __init__(self, endpoint, window=10, clock=time.time):
+        """
+        :param endpoint: The endpoint to send the packets with
+        :param window: The number of seconds over which the send rates are computed
+        :param clock: Function that returns the current time in seconds
+        :type window: int
+        """
+        self.endpoint = endpoint
+        self.window = window
+        self.clock = clock
+        self.num_packets = 0
+        self.num_bytes = 0
+        self.num_bursts = 0
+        self.intervals = deque()  # List of [second, packets, bytes] for the last seconds
+
+    def record(self, num_packets, num_bytes):
+        now = int(self.clock())
+        if self.intervals and self.intervals[-1][0] == now:
+            self.intervals[-1][1] += num_packets
+            self.intervals[-1][2] += num_bytes
+        else:
+            self.intervals.append([now, num_packets, num_bytes])
+        while self.intervals[0][0] <= now - self.window:
+            self.intervals.popleft()
+
+        self.num_packets += num_packets
+        self.num_bytes += num_bytes
+
+    def send(self, address, packet):
+        """
+        Send a packet to a single address.
+        """
+        self.endpoint.send(address, packet)
+        self.record(1, len(packet))
+
+    def send_burst(self, addresses, packet):
+        """
+        Send the same packet to multiple addresses.
+        :param addresses: The addresses to send the packet to
+        :param packet: The packet to send
+        :type packet: bytes
+        """
+        send = self.endpoint.send
+        num_packets = 0
+        for address in addresses:
+            send(address, packet)
+            num_packets += 1
+
+        if num_packets:
+            self.num_bursts += 1
+            self.record(num_packets, num_packets * len(packet))
+
+    def get_rates(self):
+        """
+        Return the average number of packets and bytes that are sent per second during the last seconds.
+        :rtype: tuple
+        """
+        now = int(self.clock())
+        recent_intervals = [interval for interval in self.intervals if interval[0] > now - self.window]
+        num_packets = sum(interval[1] for interval in recent_intervals)
+        num_bytes = sum(interval[2] for interval in recent_intervals)
+        return num_packets / self.window, num_bytes / self.window
+
+    def to_dictionary(self):
+        packets_per_second, bytes_per_second = self.get_rates()
+        return {
+            "packets": self.num_packets,
+            "bytes": self.num_bytes,
+            "bursts": self.num_bursts,
+            "packets_per_second": packets_per_second,
+            "bytes_per_second": bytes_per_second
+        }
@@ -1,9 +1,11 @@
 import abc
 import logging
-from binascii import hexlify, unhexlify
+from asyncio import Future, shield
 
 from ipv8.peer import Peer
 
+from anydex.core.expiring_set import ExpiringSet
+
 
 class ClearingPolicy(metaclass=abc.ABCMeta):
     """
@@ -19,26 +21,74 @@ class ClearingPolicy(metaclass=abc.ABCMeta):
         self.logger = logging.getLogger(self.__class__.__name__)
 
     @abc.abstractmethod
-    async def should_trade(self, trader_id):
+    async def should_trade(self, trader_id, trade_id):
         """
         :param trader_id: The ID of the trader.
+        :param trade_id: The ID of the trade with the trader, i.e. the trace id of the pair of orders.
         :type trader_id: TraderId
+        :type trade_id: str
         :return: A Deferred that fires with a boolean whether we should trade or not.
         """
         return True
 
+    def release(self, trader_id, trade_id):
+        """
+        Called when a trade that has been allowed by this policy has been initiated or will not happen.
+        :param trader_id: The ID of the trader.
+        :param trade_id: The ID of the trade that has been allowed.
+        :type trader_id: TraderId
+        :type trade_id: str
+        """
+        pass
+
 
 class SingleTradeClearingPolicy(ClearingPolicy):
     """
     This policy limits a trading partner to a single outstanding trade at once.
     This is achieved by a crawl/inspection of the TrustChain records of a counterparty.
+
+    A trade that is allowed does not show up in the chain until its tx_init block has been created, so the trader is
+    reserved until then. Other trades with the trader are refused while the reservation lasts. A reservation belongs
+    to the trade that it has been made for, and is only released for that trade.
     """
 
     def __init__(self, community):
         ClearingPolicy.__init__(self, community)
-        self.currently_crawling = set()
+        self.pending_crawls = {}  # Map: TraderId -> Future that fires when the crawl of the chain is done
+        self.recently_crawled = ExpiringSet(community.settings.chain_crawl_ttl, num_generations=4)
+        self.reserved_traders = ExpiringSet(community.settings.trade_reservation_ttl, num_generations=4)
+        self.reservations = {}  # Map: TraderId -> the id of the trade for which the trader has been reserved
+
+    async def crawl_chain(self, trader_id, peer):
+        """
+        Crawl the chain of a trader, unless it has been crawled recently. Concurrent calls for the same trader share
+        a single crawl.
+        """
+        if trader_id in self.recently_crawled:
+            return
+
+        if trader_id in self.pending_crawls:
+            self.logger.debug("Waiting for pending crawl of chain of trader %s", trader_id.as_hex())
+            await shield(self.pending_crawls[trader_id])
+            return
 
-    async def should_trade(self, trader_id):
+        self.logger.info("Starting crawl of chain of trader %s" % trader_id.as_hex())
+        future = Future()
+        self.pending_crawls[trader_id] = future
+        try:
+            await self.community.trustchain.crawl_chain(peer)
+            self.recently_crawled.add(trader_id)
+            future.set_result(None)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # The exception is raised to the caller, there might be no other waiters
+            raise
+        finally:
+            self.pending_crawls.pop(trader_id, None)
+            if not future.done():  # The crawl has been cancelled
+                future.cancel()
+
+    async def should_trade(self, trader_id, trade_id):
         """
         We first crawl the chain of the counterparty and then determine whether we can trade with this party.
         """
@@ -51,60 +101,34 @@ class SingleTradeClearingPolicy(ClearingPolicy):
         peer_pk = await self.community.send_trader_pk_request(trader_id)
         peer = Peer(peer_pk, address=address)
 
-        # If we are currently crawling this peer already, it means we got another propose trade for another of the
-        # traders orders. Refuse to trade for this one then.
-        if trader_id in self.currently_crawling:
-            self.logger.info("Clearing policy not accepting trade with trader %s - we are already crawling this peer",
-                             trader_id.as_hex())
+        # Crawl the chain, if we got another proposal of this trader in the meantime, we wait for the same crawl
+        await self.crawl_chain(trader_id, peer)
+
+        self.logger.debug("Crawl of trader %s done - validating trade status", trader_id.as_hex())
+        if trader_id in self.reserved_traders:
+            self.logger.info("Clearing policy not accepting trade with trader %s - we are already trading with this "
+                             "peer", trader_id.as_hex())
+            return False
+        if not self.community.trade_status_index.can_trade(peer.public_key.key_to_bin()):
             return False
 
-        # Crawl the chain and validate the blocks
-        self.logger.info("Starting crawl of chain of trader %s" % trader_id.as_hex())
-        self.currently_crawling.add(trader_id)
-        await self.community.trustchain.crawl_chain(peer)
+        self.reserve(trader_id, trade_id)
+        return True
 
-        self.logger.debug("Crawl of trader %s done - validating trade status", trader_id.as_hex())
-        self.currently_crawling.remove(trader_id)
-
-        blocks = self.community.trustchain.persistence.get_latest_blocks(peer.public_key.key_to_bin(), limit=1000)
-        blocks.sort(key=lambda block: block.sequence_number)
-
-        tx_status = {}  # Keep track of the status of each transaction
-
-        for block in blocks:
-            if block.type == b'tx_init':
-                if block.link_sequence_number != 0:
-                    # Get the original block
-                    tx_init_block = self.community.trustchain.persistence.get_linked(block)
-                else:
-                    tx_init_block = block
-
-                if not tx_init_block:
-                    continue
-
-                txid = tx_init_block.hash
-                # We allow trading with this partner if it counter-signed the tx_init block, which means that
-                # it should not go first during asset exchange.
-                tx_status[txid] = block.link_sequence_number != 0
-            elif block.type == b'tx_payment':
-                txid = unhexlify(block.transaction["payment"]["transaction_id"])
-                if txid not in tx_status:
-                    self.logger.warning("Found payment block without having tx_init block for transaction %s!",
-                                        hexlify(txid))
-                    continue
-
-                if block.link_sequence_number != 0:
-                    tx_status[txid] = False
-                else:
-                    tx_status[txid] = True
-            elif block.type == b'tx_done':
-                txid = unhexlify(block.transaction["tx"]["transaction_id"])
-                if txid not in tx_status:
-                    self.logger.warning("Found tx_done block without having tx_init block for transaction %s!",
-                                        hexlify(txid))
-                    continue
-
-                tx_status[txid] = True
-
-        # If there is any transaction for which this party currently holds the token, do not trade
-        return all(tx_status.values())
+    def reserve(self, trader_id, trade_id):
+        """
+        Reserve a trader for a trade and forget the reservations that have expired.
+        """
+        for reserved_trader_id in [reserved_trader_id for reserved_trader_id in self.reservations
+                                   if reserved_trader_id not in self.reserved_traders]:
+            del self.reservations[reserved_trader_id]
+
+        self.reserved_traders.add(trader_id)
+        self.reservations[trader_id] = trade_id
+
+    def release(self, trader_id, trade_id):
+        if self.reservations.get(trader_id) != trade_id:
+            return
+
+        del self.reservations[trader_id]
+        self.reserved_traders.discard(trader_id)
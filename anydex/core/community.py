@@ -1,13 +1,18 @@
+import os
 import random
+import time
 from asyncio import Future, ensure_future, gather, get_event_loop
 from base64 import b64decode
 from binascii import hexlify, unhexlify
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
+from weakref import WeakSet
 
 from ipv8.attestation.trustchain.listener import BlockListener
 from ipv8.attestation.trustchain.payload import HalfBlockBroadcastPayload, HalfBlockPairBroadcastPayload,\
-    HalfBlockPairPayload
-from ipv8.community import Community, lazy_wrapper
+    HalfBlockPairPayload, HalfBlockPayload
+from ipv8.community import Community, lazy_wrapper, lazy_wrapper_unsigned
 from ipv8.dht import DHTError
 from ipv8.messaging.payload_headers import BinMemberAuthenticationPayload
 from ipv8.messaging.payload_headers import GlobalTimeDistributionPayload
@@ -16,27 +21,39 @@ from ipv8.requestcache import NumberCache, RandomNumberCache, RequestCache
 from ipv8.util import succeed
 
 from anydex.core import DeclineMatchReason, DeclinedTradeReason, MAX_ORDER_TIMEOUT
+from anydex.core.address_resolver import AddressResolver
 from anydex.core.block import MarketBlock
+from anydex.core.block_verifier import BlockVerifier
 from anydex.core.bloomfilter import BloomFilter
+from anydex.core.broadcast import BlockPacketCache, PacketSender
 from anydex.core.clearing_policy import SingleTradeClearingPolicy
-from anydex.core.database import MarketDB
+from anydex.core.database import DATABASE_DIRECTORY, MarketDB
+from anydex.core.expiring_set import ExpiringSet
+from anydex.core.loop_monitor import LoopMonitor
 from anydex.core.match_queue import MatchPriorityQueue
 from anydex.core.matching_engine import MatchingEngine, PriceTimeStrategy
+from anydex.core.matching_shard import ShardedMatchingEngine
 from anydex.core.message import TraderId
-from anydex.core.order import OrderId, OrderNumber
+from anydex.core.message_statistics import MessageStatistics
+from anydex.core.order import Order, OrderId, OrderNumber
 from anydex.core.order_manager import OrderManager
 from anydex.core.order_repository import DatabaseOrderRepository, MemoryOrderRepository
 from anydex.core.orderbook import DatabaseOrderBook, OrderBook
-from anydex.core.payload import DeclineMatchPayload, DeclineTradePayload, InfoPayload, MatchPayload,\
-    OrderStatusRequestPayload, OrderStatusResponsePayload, OrderbookSyncPayload, PingPongPayload, PublicKeyPayload,\
-    TradePayload, WalletInfoPayload
+from anydex.core.orderbook_snapshot import SNAPSHOT_FILE_NAME
+from anydex.core.payload import DeclineMatchPayload, DeclineTradePayload, InfoPayload, MatchBatchPayload,\
+    MatchPayload, OrderStatusRequestPayload, OrderStatusResponsePayload, OrderbookSyncPayload, PingPongPayload,\
+    PublicKeyPayload, TradePayload, WalletInfoPayload, decode_fields, market_serializer
 from anydex.core.payment import Payment
 from anydex.core.payment_id import PaymentId
+from anydex.core.sampling_profiler import OUTPUT_FORMATS, SamplingProfiler
 from anydex.core.settings import MarketSettings
+from anydex.core.submission_pipeline import SubmissionPipeline
 from anydex.core.tick import Ask, Bid, Tick
 from anydex.core.timeout import Timeout
 from anydex.core.timestamp import Timestamp
 from anydex.core.trade import AcceptedTrade, CounterTrade, DeclinedTrade, ProposedTrade, Trade
+from anydex.core.trade_status_index import TradeStatusIndex
+from anydex.core.tracing import Tracer, get_trace_id
 from anydex.core.transaction import Transaction, TransactionId
 from anydex.core.transaction_manager import TransactionManager
 from anydex.core.transaction_repository import DatabaseTransactionRepository,\
@@ -48,6 +65,7 @@ from anydex.wallet.trustchain.tc_wallet import TrustchainWallet
 
 # Message definitions
 MSG_MATCH = 7
+MSG_MATCH_BATCH = 8
 MSG_MATCH_DECLINE = 9
 MSG_PROPOSED_TRADE = 10
 MSG_DECLINED_TRADE = 11
@@ -97,10 +115,45 @@ class MatchCache(NumberCache):
         """
         Add a match to the queue.
         """
+        self.add_matches([match_payload])
+
+    def add_matches(self, match_payloads):
+        """
+        Add multiple matches to the queue and process them at once.
+        """
         if self.order.status != "open":
             self._logger.info("Ignoring match payload, order %s not open anymore", self.order.order_id)
             return
 
+        for match_payload in match_payloads:
+            self.insert_match(match_payload)
+
+        if not self.schedule_task:
+            # Schedule a timer
+            self._logger.info("Scheduling batch match of order %s" % str(self.order.order_id))
+            self.schedule_task = call_later(self.community.settings.match_window,
+                                            self.start_process_matches, ignore_errors=True)
+        elif self.schedule_task_done and not self.outstanding_request:
+            # If we are currently not processing anything and the schedule task is done, process the matches
+            self.process_match()
+
+    def is_queued(self, other_order_id):
+        """
+        Return whether a match with the order is waiting in the queue or is being processed.
+        """
+        return self.queue.contains_order(other_order_id) or \
+            bool(self.outstanding_request and self.outstanding_request[2] == other_order_id)
+
+    def has_queued_match(self, other_order_id):
+        """
+        Return whether a match with the order has been stored and queued already, so another match is a duplicate.
+        """
+        return bool(self.matches.get(other_order_id)) and self.is_queued(other_order_id)
+
+    def insert_match(self, match_payload):
+        """
+        Store a match and add the matched order to the queue, if it is not in there yet.
+        """
         other_order_id = OrderId(match_payload.trader_id, match_payload.order_number)
         if other_order_id not in self.matches:
             self.matches[other_order_id] = []
@@ -116,20 +169,11 @@ class MatchCache(NumberCache):
         if not exists:
             self.matches[other_order_id].append(match_payload)
 
-        if not self.queue.contains_order(other_order_id) and not (self.outstanding_request and self.outstanding_request[2] == other_order_id):
+        if not self.is_queued(other_order_id):
             self._logger.debug("Adding match payload with own order id %s and other id %s to queue",
                                self.order.order_id, other_order_id)
             self.queue.insert(0, match_payload.assets.price, other_order_id)
 
-        if not self.schedule_task:
-            # Schedule a timer
-            self._logger.info("Scheduling batch match of order %s" % str(self.order.order_id))
-            self.schedule_task = call_later(self.community.settings.match_window,
-                                            self.start_process_matches, ignore_errors=True)
-        elif self.schedule_task_done and not self.outstanding_request:
-            # If we are currently not processing anything and the schedule task is done, process the matches
-            self.process_match()
-
     def start_process_matches(self):
         """
         Start processing the batch of matches.
@@ -264,6 +308,12 @@ class ProposedTradeRequestCache(NumberCache):
         self.proposed_trade = proposed_trade
 
     def on_timeout(self):
+        self.community.tracer.end(get_trace_id(self.proposed_trade.order_id, self.proposed_trade.recipient_order_id),
+                                  "proposal", result="timeout")
+        self.community.release_clearing_policies(self.proposed_trade.recipient_order_id.trader_id,
+                                                 get_trace_id(self.proposed_trade.order_id,
+                                                              self.proposed_trade.recipient_order_id))
+
         # Just remove the reserved quantity from the order
         order = self.community.order_manager.order_repository.find_by_id(self.proposed_trade.order_id)
         proposed_assets = self.proposed_trade.assets
@@ -324,6 +374,33 @@ class PingRequestCache(RandomNumberCache):
         self.request_future.set_result(False)
 
 
+class MarketRequestCache(RequestCache):
+    """
+    Request cache that also keeps track of the caches that have been added to it, so the outstanding requests can be
+    counted without relying on the internals of the request cache.
+    """
+
+    def __init__(self):
+        super(MarketRequestCache, self).__init__()
+        self.added_caches = WeakSet()
+
+    def add(self, cache):
+        added_cache = super(MarketRequestCache, self).add(cache)
+        if added_cache:
+            self.added_caches.add(added_cache)
+        return added_cache
+
+    def get_sizes(self):
+        """
+        Return the number of outstanding requests for every prefix.
+        """
+        sizes = {}
+        for cache in list(self.added_caches):
+            if self.get(cache.prefix, cache.number) is cache:
+                sizes[cache.prefix] = sizes.get(cache.prefix, 0) + 1
+        return sizes
+
+
 class MarketCommunity(Community, BlockListener):
     """
     Community for general asset trading.
@@ -339,34 +416,56 @@ class MarketCommunity(Community, BlockListener):
         self.wallets = kwargs.pop('wallets', {})
         self.trustchain = kwargs.pop('trustchain')
         self.record_transactions = kwargs.pop('record_transactions', False)
-        market_block_types = [b'ask', b'bid', b'cancel_order', b'tx_init', b'tx_payment', b'tx_done']
-        self.trustchain.settings.block_types_bc_disabled |= set(market_block_types)
-        self.trustchain.add_listener(self, market_block_types)
+        self.market_block_types = [b'ask', b'bid', b'cancel_order', b'tx_init', b'tx_payment', b'tx_done']
+        self.trustchain.settings.block_types_bc_disabled |= set(self.market_block_types)
+        self.trustchain.add_listener(self, self.market_block_types)
         self.dht = kwargs.pop('dht', None)
         self.use_database = kwargs.pop('use_database', True)
         self.settings = MarketSettings()
+        self.settings.matching_shards = kwargs.pop('matching_shards', self.settings.matching_shards)
+        self.settings.tick_journal_interval = kwargs.pop('tick_journal_interval', self.settings.tick_journal_interval)
+        self.settings.order_book_snapshot = kwargs.pop('order_book_snapshot', self.settings.order_book_snapshot)
         self.fixed_broadcast_set = []  # Optional list of fixed peers that will receive market messages
 
-        db_working_dir = kwargs.pop('working_directory', '')
+        self.db_working_dir = kwargs.pop('working_directory', '')
 
         Community.__init__(self, *args, **kwargs)
         BlockListener.__init__(self)
 
         self._use_main_thread = True  # Market community is unable to deal with thread pool message processing yet
         self.mid = self.my_peer.mid
-        self.mid_register = {}
+        self.address_resolver = AddressResolver(self.lookup_address_in_dht, ttl=self.settings.address_ttl,
+                                                negative_ttl=self.settings.address_negative_ttl,
+                                                max_size=self.settings.address_cache_size)
+        self.block_packet_cache = BlockPacketCache(self.serializer, max_size=self.settings.block_packet_cache_size)
+        self.packet_sender = PacketSender(self.endpoint)
+        self.tick_blocks = OrderedDict()  # Map: block hash -> tick block, ordered from least recently used
+        self.num_tick_block_hits = 0
+        self.num_tick_block_misses = 0
+        self.trade_status_index = TradeStatusIndex(self.trustchain.persistence)
+        self.block_verifier = BlockVerifier(ThreadPoolExecutor(self.settings.block_verification_workers)
+                                            if self.settings.block_verification_workers > 0 else None)
+        self.tick_pipeline = SubmissionPipeline(self.publish_ticks, max_queue_size=self.settings.tick_queue_size,
+                                                max_batch_size=self.settings.tick_batch_size,
+                                                discard_item=self.discard_tick)
+        self.loop_monitor = None
+        self.message_statistics = None
+        self.tracer = Tracer(max_spans=self.settings.trace_buffer_size)
+        self.profiler = SamplingProfiler(interval=self.settings.profiler_interval)
+        self.profile_directory = self.db_working_dir
         self.pk_register = {}
         self.order_book = None
-        self.market_database = MarketDB(db_working_dir, self.DB_NAME)
+        self.market_database = MarketDB(self.db_working_dir, self.DB_NAME)
         self.matching_engine = None
         self.transaction_manager = None
         self.use_local_address = False
         self.matching_enabled = True
         self.use_incremental_payments = False
         self.matchmakers = set()
-        self.request_cache = RequestCache()
-        self.cancelled_orders = set()  # Keep track of cancelled orders so we don't add them again to the orderbook.
-        self.sent_matches = set()
+        self.request_cache = MarketRequestCache()
+        # Keep track of cancelled orders so we don't add them again to the orderbook.
+        self.cancelled_orders = ExpiringSet(MAX_ORDER_TIMEOUT + Tick.TIME_TOLERANCE // 1000)
+        self.sent_matches = ExpiringSet(MAX_ORDER_TIMEOUT + Tick.TIME_TOLERANCE // 1000)
         self.clearing_policies = []
 
         if self.settings.single_trade:
@@ -388,6 +487,7 @@ class MarketCommunity(Community, BlockListener):
         # Register messages
         self.decode_map.update({
             chr(MSG_MATCH): self.received_match,
+            chr(MSG_MATCH_BATCH): self.received_match_batch,
             chr(MSG_MATCH_DECLINE): self.received_decline_match,
             chr(MSG_PROPOSED_TRADE): self.received_proposed_trade,
             chr(MSG_DECLINED_TRADE): self.received_decline_trade,
@@ -404,21 +504,39 @@ class MarketCommunity(Community, BlockListener):
             chr(MSG_PK_RESPONSE): self.received_trader_pk_response
         })
 
+        # Verify the signatures of the market blocks that TrustChain receives in the block verifier
+        trustchain_handlers = {
+            chr(1): self.received_trustchain_half_block,
+            chr(4): self.received_trustchain_half_block_pair,
+            chr(5): self.received_trustchain_half_block_broadcast,
+            chr(6): self.received_trustchain_half_block_pair_broadcast
+        }
+        self.trustchain_handlers = {msg_id: self.trustchain.decode_map[msg_id] for msg_id in trustchain_handlers}
+        self.trustchain.decode_map.update(trustchain_handlers)
+
         self.logger.info("Market community initialized with mid %s", hexlify(self.mid))
 
+    def get_serializer(self):
+        """
+        Use a serializer with precompiled codecs for the market payloads with a fixed layout.
+        """
+        return market_serializer
+
     async def get_address_for_trader(self, trader_id):
         """
         Fetch the address for a trader.
         If not available in the local storage, perform a DHT request to fetch the address of the peer with a
-        specified trader ID.
+        specified trader ID. Concurrent requests for the same trader share a single DHT request.
         Return a Deferred that fires either with the address or None if the peer could not be found in the DHT.
         """
         if bytes(trader_id) == self.mid:
             return self.get_ipv8_address()
-        address = self.lookup_ip(trader_id)
-        if address:
-            return address
+        return await self.address_resolver.resolve(trader_id)
 
+    async def lookup_address_in_dht(self, trader_id):
+        """
+        Perform a DHT request to fetch the address of the peer with a specified trader ID.
+        """
         self.logger.info("Address for trader %s not found locally, doing DHT request", trader_id.as_hex())
 
         if not self.dht:
@@ -431,7 +549,6 @@ class MarketCommunity(Community, BlockListener):
             return
 
         if peers:
-            self.update_ip(trader_id, peers[0].address)
             return peers[0].address
 
     async def should_sign(self, block):
@@ -453,13 +570,15 @@ class MarketCommunity(Community, BlockListener):
 
             wallet = self.wallets[asset_id]
             payment = Payment.from_block(block)
-            await wallet.monitor_transaction(payment.payment_id.payment_id)
+            with self.tracer.span(get_trace_id(transaction.order_id, transaction.partner_order_id),
+                                  "monitor_transaction", asset=asset_id, payment_id=str(payment.payment_id)):
+                await wallet.monitor_transaction(payment.payment_id.payment_id)
             transaction.add_payment(payment)
-            self.transaction_manager.transaction_repository.update(transaction)
+            self.transaction_manager.update(transaction)
 
             order = self.order_manager.order_repository.find_by_id(transaction.order_id)
             order.add_trade(transaction.partner_order_id, payment.transferred_assets)
-            self.order_manager.order_repository.update(order)
+            self.order_manager.update_order(order)
 
             if not transaction.is_payment_complete():
                 self.register_anonymous_task('send_payment_%s' % id(transaction), self.send_payment, transaction)
@@ -477,7 +596,9 @@ class MarketCommunity(Community, BlockListener):
                 transaction = Transaction.from_tx_init_block(block)
                 transaction.trading_peer = Peer(block.public_key,
                                                 address=self.lookup_ip(transaction.partner_order_id.trader_id))
-                self.transaction_manager.transaction_repository.add(transaction)
+                self.transaction_manager.add(transaction)
+                self.release_clearing_policies(transaction.partner_order_id.trader_id,
+                                               get_trace_id(transaction.order_id, transaction.partner_order_id))
 
             return True
         elif block.type == b"tx_done":
@@ -492,17 +613,29 @@ class MarketCommunity(Community, BlockListener):
         Enable this node to be a matchmaker
         """
         if self.use_database:
-            self.order_book = DatabaseOrderBook(self.market_database)
+            snapshot_path = None
+            if self.settings.order_book_snapshot and self.db_working_dir != u":memory:":
+                snapshot_path = os.path.join(self.db_working_dir, DATABASE_DIRECTORY, SNAPSHOT_FILE_NAME)
+            self.order_book = DatabaseOrderBook(self.market_database, snapshot_path=snapshot_path)
             self.order_book.restore_from_database()
+            if self.settings.tick_journal_interval > 0:
+                self.order_book.start_journal(self.settings.tick_journal_interval,
+                                              self.settings.tick_journal_compact_interval)
         else:
             self.order_book = OrderBook()
-        self.matching_engine = MatchingEngine(PriceTimeStrategy(self.order_book))
+        if self.settings.matching_shards > 0:
+            self.matching_engine = ShardedMatchingEngine(self.order_book, self.settings.matching_shards)
+            self.matching_engine.start()
+        else:
+            self.matching_engine = MatchingEngine(PriceTimeStrategy(self.order_book))
         self.is_matchmaker = True
 
     def disable_matchmaker(self):
         """
         Disable the matchmaker status of this node
         """
+        if isinstance(self.matching_engine, ShardedMatchingEngine):
+            self.register_anonymous_task("shutdown_matching_shards", self.matching_engine.shutdown)
         self.order_book = None
         self.matching_engine = None
         self.is_matchmaker = False
@@ -567,9 +700,17 @@ class MarketCommunity(Community, BlockListener):
                 match_cache.schedule_propose.cancel()
 
         self.request_cache.clear()
+        self.trustchain.decode_map.update(self.trustchain_handlers)
+        if self.loop_monitor:
+            self.loop_monitor.stop()
+        self.profiler.stop()
+        await self.tick_pipeline.shutdown()
+        await self.block_verifier.shutdown()
 
         # Save the ticks to the database
         if self.is_matchmaker:
+            if isinstance(self.matching_engine, ShardedMatchingEngine):
+                await self.matching_engine.shutdown()
             if self.use_database:
                 self.order_book.save_to_database()
             await self.order_book.shutdown_task_manager()
@@ -612,15 +753,153 @@ class MarketCommunity(Community, BlockListener):
         if not self.matching_enabled:
             return 0
 
+        if self.settings.match_batch_interval > 0:
+            # Defer the matching to the next batch of this asset pair
+            self.schedule_match_batch(tick.assets.second.asset_id, tick.assets.first.asset_id)
+            return 0
+
         order_tick_entry = self.order_book.get_tick(tick.order_id)
         if tick.assets.first.amount - tick.traded <= 0:
             self.logger.debug("Tick %s does not have any quantity to match!", tick.order_id)
             return 0
 
+        start_time = time.time()
+        if isinstance(self.matching_engine, ShardedMatchingEngine):
+            # The matches are computed in a worker process, we send the match messages when they arrive
+            def on_matched_ticks(future):
+                if not future.cancelled():
+                    self.send_match_messages(future.result(), tick.order_id)
+                    self.matching_engine.statistics.record_match(tick.assets.second.asset_id,
+                                                                 tick.assets.first.asset_id,
+                                                                 time.time() - start_time)
+
+            self.matching_engine.match(order_tick_entry).add_done_callback(on_matched_ticks)
+            return 0
+
         matched_ticks = self.matching_engine.match(order_tick_entry)
         self.send_match_messages(matched_ticks, tick.order_id)
+        self.matching_engine.statistics.record_match(tick.assets.second.asset_id, tick.assets.first.asset_id,
+                                                     time.time() - start_time)
         return len(matched_ticks)
 
+    def schedule_match_batch(self, price_wallet_id, quantity_wallet_id):
+        """
+        Schedule a batch matching round for a specific asset pair, if there is none scheduled yet.
+        All ticks of this asset pair that arrive in the meantime are matched in this round.
+        :param price_wallet_id: The price asset of the asset pair to match
+        :param quantity_wallet_id: The quantity asset of the asset pair to match
+        """
+        task_name = "match_batch_%s_%s" % (price_wallet_id, quantity_wallet_id)
+        if not self.is_pending_task_active(task_name):
+            self.register_task(task_name, self.match_batch, price_wallet_id, quantity_wallet_id,
+                               delay=self.settings.match_batch_interval)
+
+    def match_batch(self, price_wallet_id, quantity_wallet_id):
+        """
+        Find all matches between the bids and asks of a specific asset pair and send the match messages in bulk
+        :param price_wallet_id: The price asset of the asset pair to match
+        :param quantity_wallet_id: The quantity asset of the asset pair to match
+        :return The number of matches found
+        """
+        if not self.matching_enabled or not self.is_matchmaker:
+            return 0
+
+        if isinstance(self.matching_engine, ShardedMatchingEngine):
+            # The matches are computed in a worker process, we send the match messages when they arrive
+            def on_matches(future):
+                if not future.cancelled():
+                    self.send_batch_match_messages(future.result())
+
+            self.matching_engine.match_batch(price_wallet_id, quantity_wallet_id).add_done_callback(on_matches)
+            return 0
+
+        matches = self.matching_engine.match_batch(price_wallet_id, quantity_wallet_id)
+        self.send_batch_match_messages(matches)
+        return len(matches)
+
+    def send_batch_match_messages(self, matches):
+        matched_ticks = OrderedDict()  # Map: OrderId of the recipient -> list of matched ticks
+        for recipient_tick_entry, matched_tick_entry in matches:
+            matched_ticks.setdefault(recipient_tick_entry.order_id, []).append(matched_tick_entry.tick)
+
+        for recipient_order_id, ticks in matched_ticks.items():
+            self.send_matches(ticks, recipient_order_id)
+
+    def get_matching_statistics(self):
+        """
+        Return a list with the matching statistics and order book sizes of all asset pairs.
+        """
+        if not self.is_matchmaker:
+            return []
+        return self.matching_engine.statistics.to_dictionary(self.order_book)
+
+    def log_matching_statistics(self):
+        """
+        Write a summary of the matching statistics of every asset pair to the log.
+        """
+        for pair_dict in self.get_matching_statistics():
+            self.logger.info("Matching statistics %s/%s: %d asks, %d bids, %d engine matches, %d matched ticks, "
+                             "engine latency p50/p99 %d/%d us, ticks visited p50/p99 %d/%d",
+                             pair_dict["quantity_type"], pair_dict["price_type"], pair_dict["asks"],
+                             pair_dict["bids"], pair_dict["engine_matches"], pair_dict["matched_ticks"],
+                             pair_dict["engine_latency"]["p50"], pair_dict["engine_latency"]["p99"],
+                             pair_dict["ticks_visited"]["p50"], pair_dict["ticks_visited"]["p99"])
+
+    def start_statistics_logging(self, interval):
+        """
+        Periodically write the matching statistics to the log.
+        :param interval: The interval between two log lines, in seconds
+        """
+        self.register_task("log_matching_statistics", self.log_matching_statistics, interval=interval)
+
+    def start_message_statistics(self, log_interval=0):
+        """
+        Start counting and timing the incoming messages and blocks, per type.
+        :param log_interval: The interval between two log lines with the message statistics, 0 disables logging
+        """
+        if not self.message_statistics:
+            self.message_statistics = MessageStatistics()
+            for msg_id, handler in self.decode_map.items():
+                message_type = handler.__name__[len("received_"):] if handler.__name__.startswith("received_") \
+                    else handler.__name__
+                self.decode_map[msg_id] = self.message_statistics.wrap(message_type, handler)
+        if log_interval > 0:
+            self.register_task("log_message_statistics", self.log_message_statistics, interval=log_interval)
+
+    def log_message_statistics(self):
+        """
+        Write the count and latency of every type of incoming message and block to the log.
+        """
+        statistics = self.message_statistics.to_dictionary()
+        for kind in ("messages", "blocks"):
+            for message_type, type_dict in sorted(statistics[kind].items()):
+                self.logger.info("Message statistics %s: %d received, %d bytes, %d errors, %.1f/s, "
+                                 "latency p50/p99/max %d/%d/%d us", message_type, type_dict["count"],
+                                 type_dict["bytes"], type_dict["errors"], type_dict["messages_per_second"],
+                                 type_dict["latency"]["p50"], type_dict["latency"]["p99"],
+                                 type_dict["latency"]["max"])
+
+    def start_loop_monitor(self, slow_callback_threshold=0.1):
+        """
+        Start monitoring the lag of the event loop and the callbacks that block it.
+        :param slow_callback_threshold: The number of seconds after which a blocked event loop is reported
+        """
+        if not self.loop_monitor:
+            self.loop_monitor = LoopMonitor(interval=self.settings.loop_monitor_interval,
+                                            slow_callback_threshold=slow_callback_threshold)
+            self.loop_monitor.start()
+
+    def start_profiler(self, duration, output_format="collapsed"):
+        """
+        Sample the stack of the event loop for some time and write the profile to the profile directory.
+        :param duration: The number of seconds to sample
+        :param output_format: The format of the profile, either collapsed or speedscope
+        :return: A future that fires with the path of the profile, once it has been written
+        :rtype: Future
+        """
+        file_name = "profile-%s.%s" % (time.strftime("%Y%m%d-%H%M%S"), OUTPUT_FORMATS.get(output_format, ""))
+        return self.profiler.start(duration, os.path.join(self.profile_directory, file_name), output_format)
+
     def lookup_ip(self, trader_id):
         """
         Lookup the ip for the public key to send a message to a specific node
@@ -630,7 +909,7 @@ class MarketCommunity(Community, BlockListener):
         :return: The ip and port tuple: (<ip>, <port>)
         :rtype: tuple
         """
-        return self.mid_register.get(trader_id)
+        return self.address_resolver.get(trader_id)
 
     def update_ip(self, trader_id, ip):
         """
@@ -642,7 +921,7 @@ class MarketCommunity(Community, BlockListener):
         :type ip: tuple
         """
         self.logger.debug("Updating ip of trader %s to (%s, %s)", trader_id.as_hex(), ip[0], ip[1])
-        self.mid_register[trader_id] = ip
+        self.address_resolver.update(trader_id, ip)
 
     def on_ask_timeout(self, future_ask):
         pass
@@ -659,9 +938,41 @@ class MarketCommunity(Community, BlockListener):
             self._logger.warning("Invalid tick block received!")
             return
 
+        if self.is_matchmaker:
+            self.cache_tick_block(block)
+
         tick = Ask.from_block(block) if block.type == b'ask' else Bid.from_block(block)
         ensure_future(self.on_tick(tick))
 
+    def cache_tick_block(self, block):
+        """
+        Keep a tick block in memory, so we can send it in order book sync responses without querying the database.
+        :param block: The block containing the tick
+        """
+        self.tick_blocks[block.hash] = block
+        self.tick_blocks.move_to_end(block.hash)
+        while len(self.tick_blocks) > self.settings.tick_block_cache_size:
+            self.tick_blocks.popitem(last=False)
+
+    def get_tick_block(self, block_hash):
+        """
+        Return the tick block with a specific hash, from memory if possible and from the database otherwise.
+        :param block_hash: The hash of the tick block
+        :type block_hash: bytes
+        :return: The tick block, or None if we do not have it
+        """
+        block = self.tick_blocks.get(block_hash)
+        if block:
+            self.num_tick_block_hits += 1
+            self.tick_blocks.move_to_end(block_hash)
+            return block
+
+        self.num_tick_block_misses += 1
+        block = self.trustchain.persistence.get_block_with_hash(block_hash)
+        if block:
+            self.cache_tick_block(block)
+        return block
+
     def process_tx_init_block(self, block):
         """
         Process a TrustChain block containing a transaction initialisation
@@ -693,11 +1004,14 @@ class MarketCommunity(Community, BlockListener):
 
             if transaction.is_payment_complete():
                 order = self.order_manager.order_repository.find_by_id(transaction.order_id)
+                trace_id = get_trace_id(transaction.order_id, transaction.partner_order_id)
+                self.tracer.begin(trace_id, "tx_done")
 
                 def on_tx_done_signed(future):
                     """
                     We received the signed block from the counterparty, wrap everything up
                     """
+                    self.tracer.end(trace_id, "tx_done")
                     block = future.result()
                     self.send_matched_transaction_completed(transaction, block)
 
@@ -772,9 +1086,20 @@ class MarketCommunity(Community, BlockListener):
 
         for entry in random.sample(ticks, min(len(ticks), self.settings.num_order_sync)):
             # Send the block pair associated with this tick
-            tick_block = self.trustchain.persistence.get_block_with_hash(entry.tick.block_hash)
+            tick_block = self.get_tick_block(entry.tick.block_hash)
             if tick_block:
-                self.trustchain.send_block(tick_block, address=peer.address)
+                self.send_block(tick_block, peer.address)
+
+    def send_block(self, block, address):
+        """
+        Send a block to a specific address, reusing the serialized block if it has been sent before.
+        :param block: The block to send
+        :param address: The address to send the block to
+        """
+        dist = GlobalTimeDistributionPayload(self.trustchain.claim_global_time()).to_pack_list()
+        packet = self._ez_pack(self.trustchain._prefix, 1, [dist], False) + \
+            self.block_packet_cache.get_block_payload(block)
+        self.packet_sender.send(address, packet)
 
     def ping_peer(self, peer):
         """
@@ -865,19 +1190,12 @@ class MarketCommunity(Community, BlockListener):
         # Create the order
         order = self.order_manager.create_ask_order(assets, Timeout(timeout))
         order.set_verified()
-        self.order_manager.order_repository.update(order)
+        self.order_manager.update_order(order)
 
         # Create the tick
         tick = Tick.from_order(order)
 
-        blocks = await self.create_new_tick_block(tick)
-        block, _ = blocks
-        order.broadcast_peers = self.broadcast_block(block)
-        if self.is_matchmaker:
-            tick.block_hash = block.hash
-            # Search for matches
-            self.order_book.insert_ask(tick).add_done_callback(self.on_ask_timeout)
-            self.match(tick)
+        order.broadcast_peers = await self.tick_pipeline.submit(tick)
         return order
 
     async def create_bid(self, assets, timeout):
@@ -896,43 +1214,142 @@ class MarketCommunity(Community, BlockListener):
         # Create the order
         order = self.order_manager.create_bid_order(assets, Timeout(timeout))
         order.set_verified()
-        self.order_manager.order_repository.update(order)
+        self.order_manager.update_order(order)
 
         # Create the tick
         tick = Tick.from_order(order)
 
-        blocks = await self.create_new_tick_block(tick)
-        block, _ = blocks
+        order.broadcast_peers = await self.tick_pipeline.submit(tick)
         self.logger.info("Bid created with asset pair %s", assets)
-        order.broadcast_peers = self.broadcast_block(block)
-        if self.is_matchmaker:
-            tick.block_hash = block.hash
-            # Search for matches
-            self.order_book.insert_bid(tick).add_done_callback(self.on_bid_timeout)
-            self.match(tick)
         return order
 
+    async def create_orders(self, offers):
+        """
+        Create multiple ask and bid orders at once. The orders are submitted to the tick pipeline together, so their
+        tick blocks are created and broadcast to the same matchmakers in as few batches as possible.
+
+        :param offers: The orders to create, as (is_ask, assets, timeout) tuples
+        :type offers: [(bool, AssetPair, int)]
+        :return: For every offer, either the created order or the exception that prevented its creation
+        :rtype: list
+        """
+        results = []
+        for is_ask, assets, timeout in offers:
+            try:
+                self.verify_offer_creation(assets, timeout)
+            except RuntimeError as e:
+                results.append(e)
+                continue
+
+            create_order = self.order_manager.create_ask_order if is_ask else self.order_manager.create_bid_order
+            order = create_order(assets, Timeout(timeout))
+            order.set_verified()
+            self.order_manager.update_order(order)
+            results.append(order)
+
+        indices = [index for index, result in enumerate(results) if isinstance(result, Order)]
+        broadcast_results = await gather(*[self.tick_pipeline.submit(Tick.from_order(results[index]))
+                                           for index in indices], return_exceptions=True)
+        for index, broadcast_result in zip(indices, broadcast_results):
+            if isinstance(broadcast_result, Exception):
+                results[index] = broadcast_result
+            else:
+                results[index].broadcast_peers = broadcast_result
+
+        self.logger.info("Created %d orders in a batch of %d offers",
+                         len([result for result in results if isinstance(result, Order)]), len(offers))
+        return results
+
+    def publish_ticks(self, ticks):
+        """
+        Create the tick blocks of new orders, insert the ticks in our order book and broadcast the blocks. This is
+        the processing stage of the tick pipeline, the blocks are created in the order of the ticks.
+
+        :param ticks: The ticks of our new orders
+        :type ticks: [Tick]
+        :return: For every tick, the peers its block was sent to or the exception that prevented its creation
+        :rtype: list
+        """
+        results = []
+        created = []
+        for tick, future in zip(ticks, self.create_new_tick_blocks(ticks)):
+            # Source blocks are created synchronously, so the future is already done
+            try:
+                block, _ = future.result()
+            except Exception as e:
+                self.discard_tick(tick)
+                results.append(e)
+            else:
+                results.append(None)
+                created.append((tick, block))
+
+        broadcast_peers = self.broadcast_blocks([block for _, block in created])
+        for tick, block in created:
+            self.add_own_tick(tick, block)
+        return [result if isinstance(result, Exception) else broadcast_peers for result in results]
+
+    def discard_tick(self, tick):
+        """
+        Cancel the order of a tick that will not be published, so the order does not stay open without ever reaching
+        an order book.
+        """
+        self.logger.info("Cancelling order %s since its tick has not been published", tick.order_id)
+        self.order_manager.cancel_order(tick.order_id)
+
+    def add_own_tick(self, tick, block):
+        """
+        Insert the tick of one of our orders in the order book and search for matches, if we are a matchmaker.
+        """
+        if not self.is_matchmaker:
+            return
+
+        tick.block_hash = block.hash
+        self.cache_tick_block(block)
+        # Search for matches
+        if tick.is_ask():
+            self.order_book.insert_ask(tick).add_done_callback(self.on_ask_timeout)
+        else:
+            self.order_book.insert_bid(tick).add_done_callback(self.on_bid_timeout)
+        self.match(tick)
+
     def broadcast_block(self, block):
         """
         Broadcast a block with market information to matchmakers.
         :param block: The block to broadcast.
         :return The peers this block was sent to.
         """
-        global_time = self.claim_global_time()
-        dist = GlobalTimeDistributionPayload(global_time).to_pack_list()
-        payload = HalfBlockBroadcastPayload.from_half_block(block, self.settings.ttl).to_pack_list()
-        packet = self._ez_pack(self.trustchain._prefix, 5, [dist, payload], False)
+        return self.broadcast_blocks([block])
+
+    def broadcast_blocks(self, blocks):
+        """
+        Broadcast multiple blocks with market information to the same matchmakers.
+        :param blocks: The blocks to broadcast.
+        :return The peers these blocks were sent to.
+        """
         if self.fixed_broadcast_set:
             broadcast_peers = self.fixed_broadcast_set
         else:
             broadcast_peers = random.sample(self.matchmakers, min(len(self.matchmakers), self.settings.fanout))
 
-        for peer in broadcast_peers:
-            self.endpoint.send(peer.address, packet)
-        self.trustchain.relayed_broadcasts.add(block.block_id)
+        addresses = [peer.address for peer in broadcast_peers]
+        for block in blocks:
+            global_time = self.claim_global_time()
+            dist = GlobalTimeDistributionPayload(global_time).to_pack_list()
+            packet = self._ez_pack(self.trustchain._prefix, 5, [dist], False) + \
+                self.block_packet_cache.get_block_broadcast_payload(block, self.settings.ttl)
+            self.packet_sender.send_burst(addresses, packet)
+            self.add_broadcasted_block(block)
 
         return broadcast_peers
 
+    def add_broadcasted_block(self, block):
+        """
+        Let TrustChain know that a block has been broadcast, so it is not relayed again when it is received back.
+        A block that has been broadcast before is not added again, since TrustChain can only forget it once.
+        """
+        if block.block_id not in self.trustchain.relayed_broadcasts:
+            self.trustchain._add_broadcasted_blockid(block.block_id)
+
     def broadcast_block_pair(self, block1, block2):
         """
         Broadcast a block with market information to matchmakers.
@@ -942,24 +1359,106 @@ class MarketCommunity(Community, BlockListener):
         """
         global_time = self.claim_global_time()
         dist = GlobalTimeDistributionPayload(global_time).to_pack_list()
-        payload = HalfBlockPairBroadcastPayload.from_half_blocks(block1, block2, self.settings.ttl).to_pack_list()
-        packet = self._ez_pack(self.trustchain._prefix, 6, [dist, payload], False)
+        packet = self._ez_pack(self.trustchain._prefix, 6, [dist], False) + \
+            self.block_packet_cache.get_block_pair_broadcast_payload(block1, block2, self.settings.ttl)
         if self.fixed_broadcast_set:
             broadcast_peers = self.fixed_broadcast_set
         else:
             broadcast_peers = random.sample(self.matchmakers, min(len(self.matchmakers), self.settings.fanout))
 
-        for peer in broadcast_peers:
-            self.endpoint.send(peer.address, packet)
-        self.trustchain.relayed_broadcasts.add(block1.block_id)
+        self.packet_sender.send_burst([peer.address for peer in broadcast_peers], packet)
+        self.add_broadcasted_block(block1)
 
         return broadcast_peers
 
+    @lazy_wrapper_unsigned(GlobalTimeDistributionPayload, HalfBlockPayload)
+    def received_trustchain_half_block(self, source_address, _, payload):
+        return self.verify_trustchain_blocks(source_address, payload, self.process_verified_half_block)
+
+    @lazy_wrapper_unsigned(GlobalTimeDistributionPayload, HalfBlockBroadcastPayload)
+    def received_trustchain_half_block_broadcast(self, source_address, _, payload):
+        return self.verify_trustchain_blocks(source_address, payload, self.process_verified_half_block)
+
+    @lazy_wrapper_unsigned(GlobalTimeDistributionPayload, HalfBlockPairPayload)
+    def received_trustchain_half_block_pair(self, source_address, _, payload):
+        return self.verify_trustchain_blocks(source_address, payload, self.process_verified_block_pair)
+
+    @lazy_wrapper_unsigned(GlobalTimeDistributionPayload, HalfBlockPairBroadcastPayload)
+    def received_trustchain_half_block_pair_broadcast(self, source_address, _, payload):
+        return self.verify_trustchain_blocks(source_address, payload, self.process_verified_block_pair)
+
+    def verify_trustchain_blocks(self, source_address, payload, process):
+        """
+        Process the blocks of a message that TrustChain received. The signatures of market blocks are verified in the
+        block verifier instead of on the event loop, and the blocks are processed in the order in which they arrived
+        once their signatures have been verified. Other blocks are processed right away.
+        :param payload: The payload of the message
+        :param process: The method that processes the blocks of the message
+        :return: A coroutine that processes the blocks
+        """
+        if hasattr(payload, 'type'):
+            block_class = self.trustchain.get_block_class(payload.type)
+            blocks = [block_class.from_payload(payload, self.trustchain.serializer)]
+        else:
+            block_class = self.trustchain.get_block_class(payload.type1)
+            blocks = list(block_class.from_pair_payload(payload, self.trustchain.serializer))
+
+        if blocks[0].type not in self.market_block_types:
+            return process(source_address, payload, *blocks)
+        return self.process_verified_blocks(source_address, payload, blocks, self.block_verifier.verify(blocks),
+                                            process)
+
+    async def process_verified_blocks(self, source_address, payload, blocks, verification, process):
+        if not all(await verification):
+            self.logger.warning("Ignoring %s block with an invalid signature", blocks[0].type.decode('utf-8'))
+            return
+        await process(source_address, payload, *blocks)
+
+    async def process_verified_half_block(self, source_address, payload, block):
+        """
+        Process a half block that TrustChain received directly or as part of a broadcast, like TrustChain does.
+        """
+        if not hasattr(payload, 'ttl'):
+            try:
+                with self.trustchain.receive_block_lock:
+                    await self.trustchain.process_half_block(block, Peer(payload.public_key, source_address))
+            except RuntimeError as e:
+                self.logger.info("Failed to process half block (error %s)", e)
+            return
+
+        with self.trustchain.receive_block_lock:
+            self.trustchain.validate_persist_block(block)
+        if block.block_id not in self.trustchain.relayed_broadcasts and payload.ttl > 1:
+            self.trustchain.send_block(block, ttl=payload.ttl - 1)
+
+    async def process_verified_block_pair(self, source_address, payload, block1, block2):
+        """
+        Process a block pair that TrustChain received directly or as part of a broadcast, like TrustChain does.
+        """
+        with self.trustchain.receive_block_lock:
+            self.trustchain.validate_persist_block(block1)
+            self.trustchain.validate_persist_block(block2)
+        if getattr(payload, 'ttl', 0) > 1 and block1.block_id not in self.trustchain.relayed_broadcasts:
+            self.trustchain.send_block_pair(block1, block2, ttl=payload.ttl - 1)
+
     def received_block(self, block):
         """
         We received a block for the market community.
         Process it accordingly, after checking the version number first.
         """
+        if not self.message_statistics:
+            self.process_block(block)
+            return
+
+        start = time.perf_counter()
+        try:
+            self.process_block(block)
+        finally:
+            self.message_statistics.record_block(block.type, time.perf_counter() - start)
+
+    def process_block(self, block):
+        self.trade_status_index.add_block(block)
+
         if block.transaction.get("version") != self.PROTOCOL_VERSION:
             return
 
@@ -1000,6 +1499,18 @@ class MarketCommunity(Community, BlockListener):
         block_type = b'ask' if tick.is_ask() else b'bid'
         return self.trustchain.create_source_block(block_type=block_type, transaction=tx_dict)
 
+    @synchronized
+    def create_new_tick_blocks(self, ticks):
+        """
+        Create the blocks for multiple new ticks, while holding the block lock only once.
+
+        :param ticks: The ticks we want to persist to the TradeChain.
+        :type ticks: [Tick]
+        :return: A list with a future that fires with the created blocks, for every tick.
+        :rtype: [Future]
+        """
+        return [self.create_new_tick_block(tick) for tick in ticks]
+
     @synchronized
     def create_new_cancel_order_block(self, order):
         """
@@ -1017,6 +1528,18 @@ class MarketCommunity(Community, BlockListener):
         }
         return self.trustchain.create_source_block(block_type=b'cancel_order', transaction=tx_dict)
 
+    @synchronized
+    def create_new_cancel_order_blocks(self, orders):
+        """
+        Create the cancellation blocks for multiple orders, while holding the block lock only once.
+
+        :param orders: The orders to cancel
+        :type orders: [Order]
+        :return: A list with a future that fires with the created blocks, for every order.
+        :rtype: [Future]
+        """
+        return [self.create_new_cancel_order_block(order) for order in orders]
+
     @synchronized
     def create_new_tx_init_block(self, peer, accepted_trade):
         """
@@ -1049,7 +1572,9 @@ class MarketCommunity(Community, BlockListener):
             transaction_id = TransactionId(blocks[1].hash)
             transaction = Transaction.from_accepted_trade(accepted_trade, transaction_id)
             transaction.trading_peer = peer
-            self.transaction_manager.transaction_repository.add(transaction)
+            self.transaction_manager.add(transaction)
+            self.release_clearing_policies(accepted_trade.trader_id,
+                                           get_trace_id(accepted_trade.recipient_order_id, accepted_trade.order_id))
             transaction_future.set_result(transaction)
 
         block_future.add_done_callback(on_tx_init_signed)
@@ -1130,8 +1655,7 @@ class MarketCommunity(Community, BlockListener):
                     self.match(tick)
 
     def send_match_messages(self, matching_ticks, order_id):
-        for tick_entry in matching_ticks:
-            self.send_match_message(tick_entry.tick, order_id)
+        self.send_matches([tick_entry.tick for tick_entry in matching_ticks], order_id)
 
     def send_match_message(self, tick, recipient_order_id):
         """
@@ -1139,15 +1663,30 @@ class MarketCommunity(Community, BlockListener):
         :param tick: The matched tick
         :param recipient_order_id: The order id of the recipient, matching the tick
         """
-        if (recipient_order_id, tick.order_id) in self.sent_matches:
-            return
-        self.sent_matches.add((recipient_order_id, tick.order_id))
+        self.send_matches([tick], recipient_order_id)
+
+    def send_matches(self, ticks, recipient_order_id):
+        """
+        Send the matches for an order to its owner. The address of the owner is looked up once and multiple matches
+        are combined in batch messages.
+        :param ticks: The matched ticks
+        :param recipient_order_id: The order id of the recipient, matching the ticks
+        """
+        new_ticks = []
+        for tick in ticks:
+            if (recipient_order_id, tick.order_id) in self.sent_matches:
+                continue
+            self.sent_matches.add((recipient_order_id, tick.order_id))
+            new_ticks.append(tick)
 
-        payload_tup = tick.to_network()
+        if not new_ticks:
+            return
 
-        # Add recipient order number, matched quantity, trader ID of the matched person, our own trader ID and match ID
+        # Add recipient order number, trader ID of the matched person and our own trader ID
         my_id = TraderId(self.mid)
-        payload_tup += (recipient_order_id.order_number, tick.order_id.trader_id, my_id)
+        match_payloads = [MatchPayload(*(tick.to_network() + (recipient_order_id.order_number,
+                                                              tick.order_id.trader_id, my_id)))
+                          for tick in new_ticks]
 
         async def get_address():
             try:
@@ -1158,16 +1697,23 @@ class MarketCommunity(Community, BlockListener):
             if not address:
                 return
 
-            self.logger.info("Sending match message for order id %s and tick order id %s to trader %s",
-                             str(recipient_order_id), str(tick.order_id), recipient_order_id.trader_id.as_hex())
+            self.logger.info("Sending %d match message(s) for order id %s to trader %s", len(match_payloads),
+                             str(recipient_order_id), recipient_order_id.trader_id.as_hex())
 
             auth = BinMemberAuthenticationPayload(self.my_peer.public_key.key_to_bin()).to_pack_list()
-            payload = MatchPayload(*payload_tup).to_pack_list()
+            if len(match_payloads) == 1:
+                packet = self._ez_pack(self._prefix, MSG_MATCH, [auth, match_payloads[0].to_pack_list()])
+                self.endpoint.send(address, packet)
+                return
 
-            packet = self._ez_pack(self._prefix, MSG_MATCH, [auth, payload])
-            self.endpoint.send(address, packet)
+            batch_size = self.settings.max_matches_per_message
+            for index in range(0, len(match_payloads), batch_size):
+                payload = MatchBatchPayload(my_id, Timestamp.now(), recipient_order_id.order_number,
+                                            match_payloads[index:index + batch_size]).to_pack_list()
+                packet = self._ez_pack(self._prefix, MSG_MATCH_BATCH, [auth, payload])
+                self.endpoint.send(address, packet)
 
-        self.register_task('get_address_for_trader_%s-%s' % (recipient_order_id, tick.order_id), get_address,
+        self.register_task('get_address_for_trader_%s-%s' % (recipient_order_id, new_ticks[0].order_id), get_address,
                            delay=random.uniform(0, self.settings.match_send_interval))
 
     @lazy_wrapper(MatchPayload)
@@ -1185,37 +1731,87 @@ class MarketCommunity(Community, BlockListener):
 
         self.process_match_payload(payload)
 
+    @lazy_wrapper(MatchBatchPayload)
+    def received_match_batch(self, peer, payload):
+        """
+        We received a message with multiple matches for one of our orders from a matchmaker.
+        """
+        self.logger.info("We received %d matches from %s for order %s.%s", len(payload.matches),
+                         payload.trader_id.as_hex(), TraderId(self.mid).as_hex(), payload.recipient_order_number)
+
+        self.update_ip(payload.trader_id, peer.address)
+        self.add_matchmaker(peer)
+
+        match_payloads = [match_payload for match_payload in payload.matches
+                          if match_payload.recipient_order_number == payload.recipient_order_number
+                          and match_payload.matchmaker_trader_id == payload.trader_id]
+        if match_payloads:
+            self.process_match_payloads(match_payloads)
+
     def process_match_payload(self, payload):
         """
         Process a match payload.
         """
-        order_id = OrderId(TraderId(self.mid), payload.recipient_order_number)
+        self.process_match_payloads([payload])
+
+    def process_match_payloads(self, payloads):
+        """
+        Process match payloads that all concern the same order of ours.
+        """
+        recipient_order_number = payloads[0].recipient_order_number
+        order_id = OrderId(TraderId(self.mid), recipient_order_number)
         order = self.order_manager.order_repository.find_by_id(order_id)
         if not order:
             self.logger.warning("Cannot find order %s in order repository!", order_id)
             return
 
+        # The fields of received payloads are decoded lazily, so only the fields that are needed to reject a match
+        # are decoded before the match is validated completely.
         if order.status != "open":
             # Send a declined match back so the matchmaker removes the order from their book
             decline_reason = DeclineMatchReason.ORDER_COMPLETED if order.status != "open" \
                 else DeclineMatchReason.OTHER
 
-            other_order_id = OrderId(payload.match_trader_id, payload.recipient_order_number)
-            self.send_decline_match_message(order, other_order_id, payload.matchmaker_trader_id, decline_reason)
+            for payload in payloads:
+                if not decode_fields(payload, ('match_trader_id', 'matchmaker_trader_id')):
+                    continue
+                other_order_id = OrderId(payload.match_trader_id, payload.recipient_order_number)
+                self.send_decline_match_message(order, other_order_id, payload.matchmaker_trader_id, decline_reason)
+            return
+
+        cache = self.request_cache.get("match", int(recipient_order_number))
+        if cache:
+            # Matches with orders that have been queued already are duplicates
+            payloads = [payload for payload in payloads if not (decode_fields(payload, ('trader_id', 'order_number'))
+                        and cache.has_queued_match(OrderId(payload.trader_id, payload.order_number)))]
+
+        # Invalid matches are dropped before they change any state
+        valid_payloads = [payload for payload in payloads if payload.is_valid()]
+        if len(valid_payloads) < len(payloads):
+            self.logger.warning("Ignoring %d invalid match payloads for order %s", len(payloads) - len(valid_payloads),
+                                order_id)
+        payloads = valid_payloads
+        if not payloads:
             return
 
-        cache = self.request_cache.get("match", int(payload.recipient_order_number))
         if not cache:
             cache = MatchCache(self, order)
             self.request_cache.add(cache)
 
-        # Add the match to the cache and process it
-        cache.add_match(payload)
+        for payload in payloads:
+            self.tracer.begin(get_trace_id(order_id, OrderId(payload.trader_id, payload.order_number)), "match_window",
+                              matchmaker=payload.matchmaker_trader_id.as_hex())
+
+        # Add the matches to the cache and process them
+        cache.add_matches(payloads)
 
     async def accept_match_and_propose(self, order, other_order_id):
         """
         Accept an incoming match payload and propose a trade to the counterparty
         """
+        trace_id = get_trace_id(order.order_id, other_order_id)
+        self.tracer.end(trace_id, "match_window")
+
         if order.available_quantity == 0:
             self.logger.info("No available quantity for order %s - not sending outgoing proposal", order.order_id)
 
@@ -1230,8 +1826,9 @@ class MarketCommunity(Community, BlockListener):
         order.reserve_quantity_for_tick(other_order_id, propose_quantity)
         self.order_manager.order_repository.update(order)
 
-        futures = [policy.should_trade(other_order_id.trader_id) for policy in self.clearing_policies]
-        results = await gather(*futures, return_exceptions=True)
+        with self.tracer.span(trace_id, "clearing_policy", side="proposer"):
+            futures = [policy.should_trade(other_order_id.trader_id, trace_id) for policy in self.clearing_policies]
+            results = await gather(*futures, return_exceptions=True)
 
         should_trade = True
         decline_reason = DeclinedTradeReason.ALREADY_TRADING
@@ -1246,7 +1843,10 @@ class MarketCommunity(Community, BlockListener):
                 break
 
         if not should_trade:
-            # Release the quantity again
+            # Release the quantity again, and the reservations of the policies that did allow the trade
+            self.release_clearing_policies(other_order_id.trader_id, trace_id,
+                                           [policy for policy, result in zip(self.clearing_policies, results)
+                                            if result is True])
             order.release_quantity_for_tick(other_order_id, propose_quantity)
             self.order_manager.order_repository.update(order)
 
@@ -1273,7 +1873,8 @@ class MarketCommunity(Community, BlockListener):
         # Fetch the address of the target peer (we are not guaranteed to know it at this point since we might have
         # received the order indirectly)
         try:
-            address = await self.get_address_for_trader(propose_trade.recipient_order_id.trader_id)
+            with self.tracer.span(get_trace_id(order.order_id, other_order_id), "address_lookup"):
+                address = await self.get_address_for_trader(propose_trade.recipient_order_id.trader_id)
         except RuntimeError:
             address = None
 
@@ -1313,8 +1914,8 @@ class MarketCommunity(Community, BlockListener):
         matched_tick_entry = self.order_book.get_tick(matched_order_id)
 
         if tick_entry and matched_tick_entry:
-            tick_entry.block_for_matching(matched_tick_entry.order_id)
-            matched_tick_entry.block_for_matching(tick_entry.order_id)
+            self.order_book.block_for_matching(tick_entry.order_id, matched_tick_entry.order_id)
+            self.order_book.block_for_matching(matched_tick_entry.order_id, tick_entry.order_id)
 
         if matched_tick_entry and (payload.decline_reason == DeclineMatchReason.OTHER_ORDER_COMPLETED or
                                    payload.decline_reason == DeclineMatchReason.OTHER_ORDER_CANCELLED):
@@ -1342,6 +1943,36 @@ class MarketCommunity(Community, BlockListener):
                 if broadcast:
                     self.broadcast_block(blocks[0])
 
+    async def cancel_orders(self, order_ids):
+        """
+        Cancel multiple orders at once. The cancellation blocks of all orders are created in one go and are broadcast
+        to the same matchmakers.
+
+        :param order_ids: The ids of the orders to cancel
+        :type order_ids: [OrderId]
+        :return: For every order, whether it has been cancelled
+        :rtype: [bool]
+        """
+        results = []
+        verified_orders = []
+        for order_id in order_ids:
+            order = self.order_manager.order_repository.find_by_id(order_id)
+            if not order or order.cancelled or (order.status != "open" and order.status != "unverified"):
+                results.append(False)
+                continue
+
+            self.order_manager.cancel_order(order_id)
+            if self.is_matchmaker:
+                self.order_book.remove_tick(order_id)
+            if order.verified:
+                verified_orders.append(order)
+            results.append(True)
+
+        if verified_orders:
+            blocks = [(await future)[0] for future in self.create_new_cancel_order_blocks(verified_orders)]
+            self.broadcast_blocks(blocks)
+        return results
+
     def on_order_completed(self, order_id):
         """
         An order has been completed. Update the match caches accordingly
@@ -1354,6 +1985,8 @@ class MarketCommunity(Community, BlockListener):
         payload = proposed_trade.to_network()
 
         self.request_cache.add(ProposedTradeRequestCache(self, proposed_trade))
+        self.tracer.begin(get_trace_id(proposed_trade.order_id, proposed_trade.recipient_order_id), "proposal",
+                          proposal_id=proposed_trade.proposal_id)
 
         auth = BinMemberAuthenticationPayload(self.my_peer.public_key.key_to_bin()).to_pack_list()
         payload = TradePayload(*payload).to_pack_list()
@@ -1367,6 +2000,9 @@ class MarketCommunity(Community, BlockListener):
         self.endpoint.send(address, packet)
 
     def check_trade_payload_validity(self, payload):
+        if not decode_fields(payload, ('recipient_order_id',)):
+            return False, "invalid recipient order id"
+
         if bytes(payload.recipient_order_id.trader_id) != self.mid:
             return False, "this payload is not meant for this node"
 
@@ -1381,6 +2017,20 @@ class MarketCommunity(Community, BlockListener):
                 and cache.proposed_trade.order_id == order_id
                 and cache.proposed_trade.recipient_order_id == partner_order_id]
 
+    def get_request_cache_sizes(self):
+        """
+        Return the number of outstanding requests for every type of request.
+        """
+        return self.request_cache.get_sizes()
+
+    def release_clearing_policies(self, trader_id, trade_id, policies=None):
+        """
+        Let the clearing policies know that a trade with a trader has been initiated or will not happen.
+        :param policies: The policies that allowed the trade, all clearing policies by default
+        """
+        for policy in self.clearing_policies if policies is None else policies:
+            policy.release(trader_id, trade_id)
+
     def get_match_caches(self):
         """
         Return all match caches.
@@ -1394,6 +2044,10 @@ class MarketCommunity(Community, BlockListener):
             self.logger.warning("Validation of proposed trade payload failed: %s", validation[1])
             return
 
+        if not payload.is_valid():
+            self.logger.warning("Ignoring invalid proposed trade payload for order %s", payload.recipient_order_id)
+            return
+
         proposed_trade = ProposedTrade.from_network(payload)
 
         self.logger.debug("Proposed trade received from trader %s for order %s",
@@ -1475,9 +2129,16 @@ class MarketCommunity(Community, BlockListener):
             return False, decline_reason
 
         # Invoke the clearing policies.
-        futures = [policy.should_trade(proposed_trade.trader_id) for policy in self.clearing_policies]
-        results = await gather(*futures, return_exceptions=True)
+        trace_id = get_trace_id(my_order.order_id, proposed_trade.order_id)
+        with self.tracer.span(trace_id, "clearing_policy", side="responder"):
+            futures = [policy.should_trade(proposed_trade.trader_id, trace_id) for policy in self.clearing_policies]
+            results = await gather(*futures, return_exceptions=True)
         should_trade = all([result and not isinstance(result, Exception) for result in results])
+        if not should_trade:
+            # Only release the reservations of the policies that did allow the trade
+            self.release_clearing_policies(proposed_trade.trader_id, trace_id,
+                                           [policy for policy, result in zip(self.clearing_policies, results)
+                                            if result is True])
         decline_reason = None if should_trade else DeclinedTradeReason.ALREADY_TRADING
         return should_trade, decline_reason
 
@@ -1504,6 +2165,10 @@ class MarketCommunity(Community, BlockListener):
             return
 
         request = self.request_cache.pop("proposed-trade", declined_trade.proposal_id)
+        self.tracer.end(get_trace_id(declined_trade.recipient_order_id, declined_trade.order_id), "proposal",
+                        result="declined", decline_reason=declined_trade.decline_reason)
+        self.release_clearing_policies(declined_trade.trader_id,
+                                       get_trace_id(declined_trade.recipient_order_id, declined_trade.order_id))
 
         order = self.order_manager.order_repository.find_by_id(declined_trade.recipient_order_id)
         proposed_assets = request.proposed_trade.assets
@@ -1532,6 +2197,8 @@ class MarketCommunity(Community, BlockListener):
         payload = counter_trade.to_network()
 
         self.request_cache.add(ProposedTradeRequestCache(self, counter_trade))
+        self.tracer.begin(get_trace_id(counter_trade.order_id, counter_trade.recipient_order_id), "proposal",
+                          proposal_id=counter_trade.proposal_id, counter=True)
 
         auth = BinMemberAuthenticationPayload(self.my_peer.public_key.key_to_bin()).to_pack_list()
         payload = TradePayload(*payload).to_pack_list()
@@ -1546,13 +2213,18 @@ class MarketCommunity(Community, BlockListener):
             self.logger.warning("Validation of counter trade payload failed: %s", validation[1])
             return
 
-        counter_trade = CounterTrade.from_network(payload)
+        if not self.request_cache.has("proposed-trade", payload.proposal_id):
+            self.logger.warning("proposed trade cache with id %s not found", payload.proposal_id)
+            return
 
-        if not self.request_cache.has("proposed-trade", counter_trade.proposal_id):
-            self.logger.warning("proposed trade cache with id %s not found", counter_trade.proposal_id)
+        if not payload.is_valid():
+            self.logger.warning("Ignoring invalid counter trade payload for proposal id %d", payload.proposal_id)
             return
 
+        counter_trade = CounterTrade.from_network(payload)
         request = self.request_cache.pop("proposed-trade", counter_trade.proposal_id)
+        self.tracer.end(get_trace_id(counter_trade.recipient_order_id, counter_trade.order_id), "proposal",
+                        result="countered")
 
         order = self.order_manager.order_repository.find_by_id(counter_trade.recipient_order_id)
         self.logger.info("Received counter trade for order %s (quantity: %d)", order.order_id,
@@ -1573,6 +2245,8 @@ class MarketCommunity(Community, BlockListener):
             self.logger.debug("Declined trade made for order id: %s and id: %s ",
                               str(declined_trade.order_id), str(declined_trade.recipient_order_id))
             self.send_decline_trade(declined_trade)
+            self.release_clearing_policies(counter_trade.trader_id,
+                                           get_trace_id(counter_trade.recipient_order_id, counter_trade.order_id))
 
             # Release the quantity from the tick
             proposed_assets = request.proposed_trade.assets
@@ -1603,22 +2277,29 @@ class MarketCommunity(Community, BlockListener):
 
     @lazy_wrapper(TradePayload)
     async def received_accept_trade(self, peer, payload):
-        accepted_trade = AcceptedTrade.from_network(payload)
+        if not self.request_cache.has("proposed-trade", payload.proposal_id):
+            self.logger.warning("No proposed-trade cache found for proposal id %d", payload.proposal_id)
+            return
 
-        if not self.request_cache.has("proposed-trade", accepted_trade.proposal_id):
-            self.logger.warning("No proposed-trade cache found for proposal id %d", accepted_trade.proposal_id)
+        if not payload.is_valid():
+            self.logger.warning("Ignoring invalid accept trade payload for proposal id %d", payload.proposal_id)
             return
 
+        accepted_trade = AcceptedTrade.from_network(payload)
         self.request_cache.pop("proposed-trade", accepted_trade.proposal_id)
+        trace_id = get_trace_id(accepted_trade.recipient_order_id, accepted_trade.order_id)
+        self.tracer.end(trace_id, "proposal", result="accepted")
 
         order = self.order_manager.order_repository.find_by_id(accepted_trade.recipient_order_id)
         if not order:
             return
 
-        incoming_address, outgoing_address = await self.get_order_addresses(order)
+        with self.tracer.span(trace_id, "order_addresses"):
+            incoming_address, outgoing_address = await self.get_order_addresses(order)
 
         # Create a tx_init block to capture that we are going to initiate a transaction
-        transaction = await self.create_new_tx_init_block(peer, accepted_trade)
+        with self.tracer.span(trace_id, "tx_init"):
+            transaction = await self.create_new_tx_init_block(peer, accepted_trade)
         self.send_wallet_info(transaction, incoming_address, outgoing_address)
 
     def send_order_status_request(self, order_id):
@@ -1681,6 +2362,9 @@ class MarketCommunity(Community, BlockListener):
         packet = self._ez_pack(self._prefix, MSG_WALLET_INFO, [auth, new_payload])
         self.endpoint.send(self.lookup_ip(transaction.partner_order_id.trader_id), packet)
 
+        if not transaction.received_wallet_info:
+            self.tracer.begin(get_trace_id(transaction.order_id, transaction.partner_order_id), "wallet_info")
+
         transaction.sent_wallet_info = True
         self.transaction_manager.transaction_repository.update(transaction)
 
@@ -1701,6 +2385,7 @@ class MarketCommunity(Community, BlockListener):
         else:
             self.logger.info("Wallet info exchanged for transaction %s - starting payments",
                              transaction.transaction_id.as_hex())
+            self.tracer.end(get_trace_id(transaction.order_id, transaction.partner_order_id), "wallet_info")
             self.register_anonymous_task('send_payment_%s' % id(transaction), self.send_payment, transaction)
 
         self.transaction_manager.transaction_repository.update(transaction)
@@ -1724,8 +2409,10 @@ class MarketCommunity(Community, BlockListener):
         else:
             transfer_coro = wallet.transfer(transfer_amount.amount, str(transaction.partner_incoming_address))
 
+        trace_id = get_trace_id(transaction.order_id, transaction.partner_order_id)
         try:
-            txid = await transfer_coro
+            with self.tracer.span(trace_id, "send_payment", asset=asset_id, amount=transfer_amount.amount):
+                txid = await transfer_coro
         except Exception as e:
             # When a payment fails, log the error.
             self.logger.error("Payment of %s to %s failed: (%s) %s", transfer_amount,
@@ -1738,12 +2425,13 @@ class MarketCommunity(Community, BlockListener):
 
         # Add it to the transaction
         transaction.add_payment(payment)
-        self.transaction_manager.transaction_repository.update(transaction)
+        self.transaction_manager.update(transaction)
 
         order.add_trade(transaction.partner_order_id, payment.transferred_assets)
-        self.order_manager.order_repository.update(order)
+        self.order_manager.update_order(order)
 
-        await self.create_new_tx_payment_block(transaction.trading_peer, payment)
+        with self.tracer.span(trace_id, "tx_payment", payment_id=str(payment.payment_id)):
+            await self.create_new_tx_payment_block(transaction.trading_peer, payment)
         self.logger.info("Payment with id %s acknowledged by counterparty!", payment.payment_id)
 
     def send_matched_transaction_completed(self, transaction, block):
@@ -1766,6 +2454,16 @@ class MarketCommunity(Community, BlockListener):
 
         _, payload = self._ez_unpack_noauth(HalfBlockPairPayload, data)
         block1, block2 = self.trustchain.get_block_class(payload.type1).from_pair_payload(payload, self.serializer)
+        self.register_anonymous_task("process_matched_tx_complete", self.process_matched_tx_complete, block1, block2)
+
+    async def process_matched_tx_complete(self, block1, block2):
+        """
+        Process the block pair of a completed transaction, after the signatures of the blocks have been verified.
+        """
+        if not all(await self.block_verifier.verify([block1, block2])):
+            self.logger.warning("Ignoring transaction-completed message with an invalid block signature")
+            return
+
         self.trustchain.validate_persist_block(block1)
         self.trustchain.validate_persist_block(block2)
 
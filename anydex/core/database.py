@@ -1,11 +1,13 @@
 """
 This file contains everything related to persistence for the market community.
 """
+import time
 from os import path
 
 from ipv8.attestation.trustchain.database import TrustChainDB
 from ipv8.database import database_blob
 
+from anydex.core.histogram import Histogram
 from anydex.core.message import TraderId
 from anydex.core.order import Order, OrderId, OrderNumber
 from anydex.core.payment import Payment
@@ -17,7 +19,11 @@ DATABASE_DIRECTORY = path.join(u"sqlite")
 # Path to the database location + dispersy._workingdirectory
 DATABASE_PATH = path.join(DATABASE_DIRECTORY, u"market.db")
 # Version to keep track if the db schema needs to be updated.
-LATEST_DB_VERSION = 5
+LATEST_DB_VERSION = 6
+# Types of the events in the tick journal.
+TICK_JOURNAL_INSERT = 0
+TICK_JOURNAL_TRADED = 1
+TICK_JOURNAL_REMOVE = 2
 # Schema for the Market DB.
 schema = u"""
 CREATE TABLE IF NOT EXISTS orders(
@@ -91,6 +97,22 @@ CREATE TABLE IF NOT EXISTS orders(
   PRIMARY KEY (trader_id, order_number)
  );
 
+ CREATE TABLE IF NOT EXISTS ticks_journal(
+  id                   INTEGER PRIMARY KEY AUTOINCREMENT,
+  event                INTEGER NOT NULL,
+  trader_id            TEXT NOT NULL,
+  order_number         INTEGER NOT NULL,
+  asset1_amount        BIGINT,
+  asset1_type          TEXT,
+  asset2_amount        BIGINT,
+  asset2_type          TEXT,
+  timeout              INTEGER,
+  timestamp            BIGINT,
+  is_ask               INTEGER,
+  traded               BIGINT,
+  block_hash           TEXT
+ );
+
  CREATE TABLE IF NOT EXISTS orders_reserved_ticks(
   trader_id              TEXT NOT NULL,
   order_number           INTEGER NOT NULL,
@@ -113,6 +135,25 @@ class MarketDB(TrustChainDB):
     Ensures a proper DB schema on startup.
     """
 
+    def __init__(self, *args, **kwargs):
+        self.statement_latency = Histogram()  # The execution time of the statements, in microseconds
+        super(MarketDB, self).__init__(*args, **kwargs)
+
+    def execute(self, statement, bindings=(), get_lastrowid=False, fetch_all=True):
+        start = time.perf_counter()
+        try:
+            return super(MarketDB, self).execute(statement, bindings, get_lastrowid=get_lastrowid,
+                                                 fetch_all=fetch_all)
+        finally:
+            self.statement_latency.record_duration(time.perf_counter() - start)
+
+    def executemany(self, statement, sequenceofbindings, fetch_all=True):
+        start = time.perf_counter()
+        try:
+            return super(MarketDB, self).executemany(statement, sequenceofbindings, fetch_all=fetch_all)
+        finally:
+            self.statement_latency.record_duration(time.perf_counter() - start)
+
     def get_schema(self):
         """
         Return the schema for the database.
@@ -312,6 +353,78 @@ class MarketDB(TrustChainDB):
         """
         return [Tick.from_database(db_tick) for db_tick in self.execute(u"SELECT * FROM ticks")]
 
+    def get_order_book_snapshot_id(self):
+        """
+        Return the id of the order book snapshot that matches the ticks in the database, or None if there is none.
+        """
+        results = list(self.execute(u"SELECT value FROM option WHERE key = 'order_book_snapshot'"))
+        return bytes(results[0][0]) if results else None
+
+    def set_order_book_snapshot_id(self, snapshot_id):
+        """
+        Store the id of the order book snapshot that matches the ticks in the database. None invalidates all snapshots.
+        :type snapshot_id: bytes
+        """
+        if snapshot_id is None:
+            self.execute(u"DELETE FROM option WHERE key = 'order_book_snapshot'")
+        else:
+            self.execute(u"INSERT OR REPLACE INTO option(key, value) VALUES('order_book_snapshot', ?)",
+                         (database_blob(snapshot_id),))
+        self.commit()
+
+    def delete_expired_ticks(self):
+        """
+        Remove the ticks that have timed out, for instance while the node was offline.
+        :return: The number of ticks that have been removed
+        """
+        self.execute(u"DELETE FROM ticks WHERE timestamp + timeout * 1000 <= ?", (int(time.time() * 1000),))
+        return next(self.execute(u"SELECT changes()"))[0]
+
+    def add_tick_journal_entries(self, entries):
+        """
+        Append events to the tick journal and commit them.
+        :param entries: Tuples with the event type, followed by the columns of the ticks table. The columns that are
+                        not relevant for the event are None.
+        """
+        self.executemany(
+            u"INSERT INTO ticks_journal (event, trader_id, order_number, asset1_amount, asset1_type, asset2_amount,"
+            u"asset2_type, timeout, timestamp, is_ask, traded, block_hash) "
+            u"VALUES(?,?,?,?,?,?,?,?,?,?,?,?)", entries)
+        self.commit()
+
+    def get_tick_journal_size(self):
+        """
+        Return the number of events in the tick journal.
+        """
+        return next(self.execute(u"SELECT COUNT(*) FROM ticks_journal"))[0]
+
+    def compact_tick_journal(self):
+        """
+        Apply all events in the tick journal to the ticks table, in order, and clear the journal. Ticks that have
+        expired are removed from the ticks table, since the journal only records the removal of ticks while the node
+        runs.
+        :return: The number of events that have been applied
+        """
+        entries = list(self.execute(u"SELECT * FROM ticks_journal ORDER BY id"))
+        for entry in entries:
+            event, trader_id, order_number = entry[1:4]
+            if event == TICK_JOURNAL_INSERT:
+                self.execute(
+                    u"INSERT OR REPLACE INTO ticks (trader_id, order_number, asset1_amount, asset1_type, "
+                    u"asset2_amount, asset2_type, timeout, timestamp, is_ask, traded, block_hash) "
+                    u"VALUES(?,?,?,?,?,?,?,?,?,?,?)", entry[2:])
+            elif event == TICK_JOURNAL_TRADED:
+                self.execute(u"UPDATE ticks SET traded = ? WHERE trader_id = ? AND order_number = ?",
+                             (entry[11], trader_id, order_number))
+            elif event == TICK_JOURNAL_REMOVE:
+                self.execute(u"DELETE FROM ticks WHERE trader_id = ? AND order_number = ?", (trader_id, order_number))
+
+        if entries:
+            self.execute(u"DELETE FROM ticks_journal WHERE id <= ?", (entries[-1][0],))
+        if self.delete_expired_ticks() > 0 or entries:
+            self.commit()
+        return len(entries)
+
     def open(self, initial_statements=True, prepare_visioning=True):
         return super(MarketDB, self).open(initial_statements, prepare_visioning)
 
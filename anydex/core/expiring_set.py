@@ -0,0 +1,66 @@
+import time
+
+
+class ExpiringSet(object):
+    """
+    Set that forgets its items after a retention period, so its memory usage is bounded by the number of items added
+    during that period.
+
+    The items are stored in a number of generations that each cover an equal part of the retention period. When the
+    current generation is full, a new generation is started and the oldest generation is dropped. An item is therefore
+    remembered for at least the retention period and at most one generation longer.
+    """
+
+    def __init__(self, retention, num_generations=8, clock=time.time):
+        """
+        :param retention: The minimum time an item is remembered, in seconds
+        :param num_generations: The number of generations to keep, more generations forget items more accurately
+        :param clock: Function that returns the current time in seconds
+        :type retention: float
+        :type num_generations: int
+        """
+        if num_generations < 2:
+            raise ValueError("At least two generations are required")
+
+        self.generation_length = retention / (num_generations - 1)
+        self.num_generations = num_generations
+        self.clock = clock
+        self.generations = [set()]
+        self.generation_start = clock()
+
+    def rotate(self):
+        """
+        Start new generations for the time that has passed and drop the generations that are too old.
+        """
+        now = self.clock()
+        passed_generations = int((now - self.generation_start) // self.generation_length)
+        if passed_generations <= 0:
+            return
+
+        if passed_generations >= self.num_generations:
+            self.generations = [set()]
+        else:
+            self.generations.extend(set() for _ in range(passed_generations))
+            del self.generations[:-self.num_generations]
+        self.generation_start += passed_generations * self.generation_length
+
+    def add(self, item):
+        """
+        Add an item to the set. Adding an item that is already in the set restarts its retention period.
+        """
+        self.rotate()
+        for generation in self.generations[:-1]:
+            generation.discard(item)
+        self.generations[-1].add(item)
+
+    def discard(self, item):
+        for generation in self.generations:
+            generation.discard(item)
+
+    def __contains__(self, item):
+        self.rotate()
+        return any(item in generation for generation in self.generations)
+
+    def __len__(self):
+        self.rotate()
+        return sum(len(generation) for generation in self.generations)
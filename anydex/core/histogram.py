@@ -0,0 +1,104 @@
+SUB_BUCKET_BITS = 5
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF_COUNT = SUB_BUCKET_COUNT >> 1
+
+
+def get_bucket_index(value):
+    """
+    Return the index of the bucket for a non-negative integer value.
+    Values below SUB_BUCKET_COUNT have their own bucket. Larger values are grouped in buckets with a relative width of
+    at most 1 / SUB_BUCKET_HALF_COUNT, like a HDR histogram.
+    """
+    if value < SUB_BUCKET_COUNT:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return (shift << (SUB_BUCKET_BITS - 1)) + (value >> shift)
+
+
+def get_bucket_value(index):
+    """
+    Return the lowest value that is recorded in the bucket with a specific index.
+    """
+    if index < SUB_BUCKET_COUNT:
+        return index
+    shift = (index >> (SUB_BUCKET_BITS - 1)) - 1
+    return (index - (shift << (SUB_BUCKET_BITS - 1))) << shift
+
+
+class Histogram(object):
+    """
+    Histogram with logarithmic buckets to keep track of the distribution of integer values, such as latencies in
+    microseconds. Recording a value takes constant time and the memory usage only grows with the logarithm of the
+    largest value recorded.
+    """
+
+    def __init__(self):
+        self.buckets = {}  # Map: bucket index -> number of values recorded in that bucket
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        """
+        Record a value in the histogram.
+        :param value: The value to record, negative values are recorded as zero
+        :type value: int
+        """
+        value = max(int(value), 0)
+        index = get_bucket_index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def record_duration(self, duration):
+        """
+        Record a duration in seconds as a number of microseconds.
+        :type duration: float
+        """
+        self.record(duration * 1000000)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def percentile(self, percentile):
+        """
+        Return an estimate of the value at a specific percentile (between 0 and 100).
+        The estimate is the lowest value of the bucket that contains the percentile, capped by the largest value.
+        """
+        if not self.count:
+            return 0
+        if percentile >= 100:
+            return self.max
+
+        threshold = self.count * percentile / 100.0
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= threshold:
+                return min(max(get_bucket_value(index), self.min), self.max)
+        return self.max
+
+    def reset(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def to_dictionary(self):
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min or 0,
+            "max": self.max or 0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9)
+        }
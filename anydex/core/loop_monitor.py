@@ -0,0 +1,129 @@
+import logging
+import sys
+import time
+import traceback
+from asyncio import current_task, get_event_loop
+from collections import deque
+from threading import Event, Thread, get_ident
+
+from anydex.core.histogram import Histogram
+
+
+def get_task_name(task):
+    """
+    Return a readable name for an asyncio task, based on the coroutine that it runs.
+    """
+    if task is None:
+        return None
+    coro = task.get_coro() if hasattr(task, 'get_coro') else task._coro
+    coro_name = getattr(coro, '__qualname__', None) or repr(coro)
+    if hasattr(task, 'get_name'):
+        # Since Python 3.8, tasks have a name which is a generic Task-<n> unless it has been set explicitly
+        return "%s (%s)" % (task.get_name(), coro_name)
+    return coro_name
+
+
+class LoopMonitor(object):
+    """
+    Monitors the responsiveness of the event loop.
+
+    A heartbeat is scheduled on the event loop at a fixed interval and the delay with which it runs is recorded as the
+    lag of the loop. A watchdog thread checks whether the heartbeat is overdue. When the loop has been blocked for
+    longer than the threshold, the stack of the event loop thread and the running task are recorded, so the callback
+    that blocks the loop can be found.
+    """
+
+    def __init__(self, interval=0.05, slow_callback_threshold=0.1, max_slow_callbacks=100, loop=None):
+        """
+        :param interval: The interval between two heartbeats, in seconds
+        :param slow_callback_threshold: The number of seconds after which a blocked loop is reported
+        :param max_slow_callbacks: The number of slow callbacks that are kept
+        :type interval: float
+        :type slow_callback_threshold: float
+        :type max_slow_callbacks: int
+        """
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.loop = loop or get_event_loop()
+        self.interval = interval
+        self.slow_callback_threshold = slow_callback_threshold
+        self.lag = Histogram()  # The lag of the heartbeats, in microseconds
+        self.slow_callbacks = deque(maxlen=max_slow_callbacks)
+        self.num_slow_callbacks = 0
+        self.last_heartbeat = None
+        self.current_stall = None  # The slow callback that is blocking the loop right now
+        self.loop_thread_id = None
+        self.heartbeat_handle = None
+        self.watchdog = None
+        self.stopped = Event()
+
+    def start(self):
+        """
+        Start monitoring the loop. This method should be called from the thread that runs the event loop.
+        """
+        self.loop_thread_id = get_ident()
+        self.last_heartbeat = time.monotonic()
+        self.stopped.clear()
+        self.heartbeat_handle = self.loop.call_later(self.interval, self.heartbeat, self.loop.time() + self.interval)
+        self.watchdog = Thread(target=self.watch, name=self.__class__.__name__, daemon=True)
+        self.watchdog.start()
+
+    def stop(self):
+        if self.heartbeat_handle:
+            self.heartbeat_handle.cancel()
+            self.heartbeat_handle = None
+        if self.watchdog:
+            self.stopped.set()
+            self.watchdog.join()
+            self.watchdog = None
+
+    def heartbeat(self, expected_time):
+        now = self.loop.time()
+        lag = max(now - expected_time, 0)
+        self.lag.record_duration(lag)
+        self.last_heartbeat = time.monotonic()
+
+        stall = self.current_stall
+        if stall:
+            # The loop has been unblocked, we now know how long the slow callback took
+            stall["duration"] = lag
+            self.current_stall = None
+            self._logger.warning("Event loop was blocked for %.3f seconds by task %s", lag, stall["task"])
+
+        self.heartbeat_handle = self.loop.call_later(self.interval, self.heartbeat, now + self.interval)
+
+    def watch(self):
+        """
+        Check whether the event loop is blocked, until the monitor is stopped. Runs in the watchdog thread.
+        """
+        reported_heartbeat = None
+        while not self.stopped.wait(self.slow_callback_threshold / 2):
+            last_heartbeat = self.last_heartbeat
+            blocked = time.monotonic() - last_heartbeat - self.interval
+            if blocked > self.slow_callback_threshold and last_heartbeat != reported_heartbeat:
+                reported_heartbeat = last_heartbeat
+                self.record_slow_callback(blocked)
+
+    def record_slow_callback(self, blocked):
+        """
+        Record the stack of the event loop thread and the running task, while the loop is blocked.
+        :param blocked: The number of seconds the loop has been blocked so far
+        """
+        frame = sys._current_frames().get(self.loop_thread_id)
+        stall = {
+            "timestamp": time.time(),
+            "duration": blocked,
+            "task": get_task_name(current_task(self.loop)),
+            "stack": [line.rstrip() for line in traceback.format_stack(frame)] if frame else []
+        }
+        self.current_stall = stall
+        self.slow_callbacks.append(stall)
+        self.num_slow_callbacks += 1
+
+    def to_dictionary(self):
+        return {
+            "interval": self.interval,
+            "slow_callback_threshold": self.slow_callback_threshold,
+            "lag": self.lag.to_dictionary(),
+            "num_slow_callbacks": self.num_slow_callbacks,
+            "slow_callbacks": list(self.slow_callbacks)
+        }
@@ -2,6 +2,8 @@ import logging
 from abc import ABCMeta, abstractmethod
 from time import time
 
+from anydex.core.matching_statistics import MatchingStatistics
+
 
 class MatchingStrategy(object):
     """Matching strategy base class"""
@@ -16,6 +18,7 @@ class MatchingStrategy(object):
         self._logger = logging.getLogger(self.__class__.__name__)
 
         self.order_book = order_book
+        self.ticks_visited = 0  # The number of ticks visited during the last match
 
     @abstractmethod
     def match(self, order_id, price, quantity, is_ask):
@@ -33,6 +36,18 @@ class MatchingStrategy(object):
         """
         return
 
+    @abstractmethod
+    def match_batch(self, price_wallet_id, quantity_wallet_id):
+        """
+        :param price_wallet_id: The price asset of the asset pair to match
+        :param quantity_wallet_id: The quantity asset of the asset pair to match
+        :type price_wallet_id: str
+        :type quantity_wallet_id: str
+        :return: A list of tuples containing the tick to notify and the tick it has been matched with
+        :rtype: [(TickEntry, TickEntry)]
+        """
+        return
+
 
 class PriceTimeStrategy(MatchingStrategy):
     """Strategy that uses the price time method for picking ticks"""
@@ -52,6 +67,7 @@ class PriceTimeStrategy(MatchingStrategy):
         """
         matched_ticks = []
         quantity_to_match = quantity
+        self.ticks_visited = 0
 
         # First check whether we can match our order at all in the order book
         if is_ask:
@@ -74,20 +90,30 @@ class PriceTimeStrategy(MatchingStrategy):
 
         cur_tick_entry = price_level.first_tick
         cur_price_level_price = price_level.price
+        # The number of ticks in the current price level that we did not visit yet and that we are allowed to match
+        # with. Ticks of our own trader or ticks that are blocked for our order are not eligible, so when this number
+        # drops to zero, we can skip the remainder of the price level without visiting each tick.
+        eligible_ticks = price_level.eligible_count(order_id)
+        ticks_visited = 0
 
         # We now start to iterate through price levels and tick entries and match on the fly
-        while cur_tick_entry and quantity_to_match > 0:
-            if cur_tick_entry.is_blocked_for_matching(order_id) or \
-                            order_id.trader_id == cur_tick_entry.order_id.trader_id:
+        while quantity_to_match > 0:
+            if eligible_ticks <= 0:
+                cur_tick_entry = None
+            elif cur_tick_entry.is_blocked_for_matching(order_id) or \
+                    order_id.trader_id == cur_tick_entry.order_id.trader_id:
+                ticks_visited += 1
                 cur_tick_entry = cur_tick_entry.next_tick
-                continue
+            else:
+                ticks_visited += 1
+                eligible_ticks -= 1
+                quantity_matched = min(quantity_to_match, cur_tick_entry.available_for_matching)
+                if quantity_matched > 0:
+                    matched_ticks.append(cur_tick_entry)
+                    quantity_to_match -= quantity_matched
 
-            quantity_matched = min(quantity_to_match, cur_tick_entry.available_for_matching)
-            if quantity_matched > 0:
-                matched_ticks.append(cur_tick_entry)
-                quantity_to_match -= quantity_matched
+                cur_tick_entry = cur_tick_entry.next_tick
 
-            cur_tick_entry = cur_tick_entry.next_tick
             if not cur_tick_entry:
                 # We probably reached the end of a price level, check whether we have a next price level
                 try:
@@ -107,9 +133,71 @@ class PriceTimeStrategy(MatchingStrategy):
                     break
 
                 cur_tick_entry = next_price_level.first_tick
+                eligible_ticks = next_price_level.eligible_count(order_id)
 
+        self.ticks_visited = ticks_visited
         return matched_ticks
 
+    def match_batch(self, price_wallet_id, quantity_wallet_id):
+        """
+        Compute all crossings between the bids and asks of an asset pair in a single sweep over both sides of the
+        order book. Bids are visited in price-time order and allocated against the asks in price-time order.
+        The most recent tick of every matched pair is notified about the other tick.
+
+        :param price_wallet_id: The price asset of the asset pair to match
+        :param quantity_wallet_id: The quantity asset of the asset pair to match
+        :type price_wallet_id: str
+        :type quantity_wallet_id: str
+        :return: A list of tuples containing the tick to notify and the tick it has been matched with
+        :rtype: [(TickEntry, TickEntry)]
+        """
+        self.ticks_visited = 0
+        bid_price = self.order_book.get_bid_price(price_wallet_id, quantity_wallet_id)
+        ask_price = self.order_book.get_ask_price(price_wallet_id, quantity_wallet_id)
+        if not bid_price or not ask_price or bid_price < ask_price:
+            return []
+
+        # Only the price levels in the crossing part of the order book are relevant
+        bids = [bid_entry for price_level in self.order_book.bids.get_price_level_list(
+                    price_wallet_id, quantity_wallet_id).items(reverse=True)
+                if price_level.price >= ask_price for bid_entry in price_level]
+        asks = [ask_entry for price_level in self.order_book.asks.get_price_level_list(
+                    price_wallet_id, quantity_wallet_id).items()
+                if price_level.price <= bid_price for ask_entry in price_level]
+
+        matches = []
+        ticks_visited = 0
+        remaining_ask_quantity = {}  # Map: OrderId -> quantity of an ask that has not been allocated in this batch
+        first_ask_index = 0  # Asks before this index do not have any quantity left
+        for bid_entry in bids:
+            bid_quantity = bid_entry.available_for_matching
+            ask_index = first_ask_index
+            while bid_quantity > 0 and ask_index < len(asks):
+                ask_entry = asks[ask_index]
+                if ask_entry.price > bid_entry.price:
+                    break
+                ticks_visited += 1
+
+                ask_quantity = remaining_ask_quantity.get(ask_entry.order_id, ask_entry.available_for_matching)
+                if ask_quantity > 0 and ask_entry.order_id.trader_id != bid_entry.order_id.trader_id and \
+                        not ask_entry.is_blocked_for_matching(bid_entry.order_id) and \
+                        not bid_entry.is_blocked_for_matching(ask_entry.order_id):
+                    quantity_matched = min(bid_quantity, ask_quantity)
+                    bid_quantity -= quantity_matched
+                    ask_quantity -= quantity_matched
+                    remaining_ask_quantity[ask_entry.order_id] = ask_quantity
+                    if bid_entry.tick.timestamp >= ask_entry.tick.timestamp:
+                        matches.append((bid_entry, ask_entry))
+                    else:
+                        matches.append((ask_entry, bid_entry))
+
+                if ask_quantity <= 0 and ask_index == first_ask_index:
+                    first_ask_index += 1
+                ask_index += 1
+
+        self.ticks_visited = ticks_visited
+        return matches
+
 
 class MatchingEngine(object):
     """Matches ticks and orders to the order book"""
@@ -123,6 +211,7 @@ class MatchingEngine(object):
         self._logger = logging.getLogger(self.__class__.__name__)
 
         self.matching_strategy = matching_strategy
+        self.statistics = MatchingStatistics()
 
     def match(self, tick_entry):
         """
@@ -139,5 +228,27 @@ class MatchingEngine(object):
                                                      tick_entry.tick.is_ask())
 
         diff = time() - now
+        price = tick_entry.price
+        self.statistics.record_engine_match(price.num_type, price.denom_type, diff,
+                                            self.matching_strategy.ticks_visited, len(matched_ticks))
         self._logger.debug("Matching engine completed in %.2f seconds", diff)
         return matched_ticks
+
+    def match_batch(self, price_wallet_id, quantity_wallet_id):
+        """
+        :param price_wallet_id: The price asset of the asset pair to match
+        :param quantity_wallet_id: The quantity asset of the asset pair to match
+        :type price_wallet_id: str
+        :type quantity_wallet_id: str
+        :return: A list of tuples containing the tick to notify and the tick it has been matched with
+        :rtype: [(TickEntry, TickEntry)]
+        """
+        now = time()
+
+        matches = self.matching_strategy.match_batch(price_wallet_id, quantity_wallet_id)
+
+        diff = time() - now
+        self.statistics.record_engine_match(price_wallet_id, quantity_wallet_id, diff,
+                                            self.matching_strategy.ticks_visited, len(matches))
+        self._logger.debug("Batch matching engine completed in %.2f seconds (%d matches)", diff, len(matches))
+        return matches
@@ -0,0 +1,273 @@
+import logging
+import multiprocessing
+from asyncio import Future, get_event_loop, new_event_loop, set_event_loop
+from itertools import count
+from time import time
+from zlib import crc32
+
+from anydex.core.matching_engine import MatchingEngine, PriceTimeStrategy
+from anydex.core.matching_statistics import MatchingStatistics
+from anydex.core.orderbook import OrderBook, OrderBookListener
+
+# Commands sent from the matchmaker to the shards
+CMD_INSERT = 0
+CMD_REMOVE = 1
+CMD_TRADED = 2
+CMD_BLOCK = 3
+CMD_MATCH = 4
+CMD_MATCH_BATCH = 5
+CMD_STOP = 6
+
+
+def ignore_result(future):
+    """
+    Retrieve the result of a future, so failed tick insertions in a shard are not reported as unhandled errors.
+    """
+    if not future.cancelled():
+        future.exception()
+
+
+class MatchingShard(object):
+    """
+    A shard runs in a worker process and owns the order book and matching engine of a subset of the asset pairs.
+    It mirrors the changes in the order book of the matchmaker and answers match requests.
+    """
+
+    def __init__(self, connection):
+        """
+        :param connection: The connection to the matchmaker process
+        :type connection: multiprocessing.connection.Connection
+        """
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.connection = connection
+        self.order_book = OrderBook()
+        self.matching_engine = MatchingEngine(PriceTimeStrategy(self.order_book))
+
+    def on_readable(self):
+        """
+        Process all commands that are waiting on the connection.
+        """
+        try:
+            while self.connection.poll():
+                self.process_command(*self.connection.recv())
+        except (EOFError, OSError):
+            self._logger.info("Connection to the matchmaker closed, stopping shard")
+            get_event_loop().stop()
+
+    def process_command(self, command, *args):
+        if command == CMD_INSERT:
+            tick = args[0]
+            insert_method = self.order_book.insert_ask if tick.is_ask() else self.order_book.insert_bid
+            insert_method(tick).add_done_callback(ignore_result)
+        elif command == CMD_REMOVE:
+            self.order_book.remove_tick(args[0])
+        elif command == CMD_TRADED:
+            order_id, traded = args
+            tick_entry = self.order_book.get_tick(order_id)
+            if tick_entry:
+                tick_entry.traded = traded
+        elif command == CMD_BLOCK:
+            self.order_book.block_for_matching(*args)
+        elif command == CMD_MATCH:
+            request_id, order_id = args
+            tick_entry = self.order_book.get_tick(order_id)
+            matched_ticks = self.matching_engine.match(tick_entry) if tick_entry else []
+            self.connection.send((request_id, [matched_tick.order_id for matched_tick in matched_ticks],
+                                  self.matching_engine.matching_strategy.ticks_visited if tick_entry else 0))
+        elif command == CMD_MATCH_BATCH:
+            request_id, price_wallet_id, quantity_wallet_id = args
+            matches = self.matching_engine.match_batch(price_wallet_id, quantity_wallet_id)
+            self.connection.send((request_id, [(recipient_tick.order_id, matched_tick.order_id)
+                                               for recipient_tick, matched_tick in matches],
+                                  self.matching_engine.matching_strategy.ticks_visited))
+        elif command == CMD_STOP:
+            get_event_loop().stop()
+
+
+def run_matching_shard(connection):
+    """
+    Entry point of a shard worker process.
+    """
+    loop = new_event_loop()
+    set_event_loop(loop)
+
+    shard = MatchingShard(connection)
+    loop.add_reader(connection.fileno(), shard.on_readable)
+    loop.run_forever()
+
+    loop.remove_reader(connection.fileno())
+    loop.run_until_complete(shard.order_book.shutdown_task_manager())
+    loop.close()
+    connection.close()
+
+
+class ShardedMatchingEngine(OrderBookListener):
+    """
+    Matching engine that partitions the asset pairs over a pool of worker processes.
+    Every worker owns the order books of its asset pairs and matches ticks in parallel with the other workers.
+    The order book of the matchmaker remains the authoritative copy; changes to it are forwarded to the shards.
+    """
+
+    def __init__(self, order_book, num_shards):
+        """
+        :param order_book: The order book of the matchmaker
+        :param num_shards: The number of worker processes to start
+        :type order_book: OrderBook
+        :type num_shards: int
+        """
+        super(ShardedMatchingEngine, self).__init__()
+        self._logger = logging.getLogger(self.__class__.__name__)
+
+        self.order_book = order_book
+        self.num_shards = num_shards
+        self.processes = []
+        self.connections = []
+        self.order_shards = {}  # Map: OrderId -> index of the shard that owns the tick
+        self.pending_requests = {}  # Map: request id -> (Future, function to convert the shard response, pair, time)
+        self.request_ids = count()
+        self.statistics = MatchingStatistics()
+
+    def start(self):
+        """
+        Start the worker processes and forward the ticks that are already in the order book.
+        """
+        context = multiprocessing.get_context('spawn')
+        for _ in range(self.num_shards):
+            parent_connection, child_connection = context.Pipe()
+            process = context.Process(target=run_matching_shard, args=(child_connection,), daemon=True)
+            process.start()
+            child_connection.close()
+            get_event_loop().add_reader(parent_connection.fileno(), self.on_shard_readable, parent_connection)
+            self.processes.append(process)
+            self.connections.append(parent_connection)
+
+        self.order_book.add_listener(self)
+        for order_id in self.order_book.get_order_ids():
+            self.on_tick_inserted(self.order_book.get_tick(order_id).tick)
+
+    async def shutdown(self):
+        """
+        Stop the worker processes.
+        """
+        if self in self.order_book.listeners:
+            self.order_book.remove_listener(self)
+
+        for connection in self.connections:
+            get_event_loop().remove_reader(connection.fileno())
+            try:
+                connection.send((CMD_STOP,))
+            except (BrokenPipeError, OSError):
+                pass
+
+        for process in self.processes:
+            await get_event_loop().run_in_executor(None, process.join, 5)
+            if process.is_alive():
+                process.terminate()
+
+        for connection in self.connections:
+            connection.close()
+
+        for future, _, _, _ in self.pending_requests.values():
+            if not future.done():
+                future.cancel()
+
+        self.processes = []
+        self.connections = []
+        self.pending_requests = {}
+
+    def get_shard_index(self, price_wallet_id, quantity_wallet_id):
+        """
+        Return the index of the shard that owns a specific asset pair.
+        """
+        return crc32(("%s/%s" % (price_wallet_id, quantity_wallet_id)).encode('utf-8')) % self.num_shards
+
+    def send_command(self, shard_index, *command):
+        self.connections[shard_index].send(command)
+
+    def send_request(self, shard_index, pair, command, convert_response, *args):
+        """
+        Send a request to a shard and return a future that fires with the converted response.
+        """
+        request_id = next(self.request_ids)
+        future = Future()
+        self.pending_requests[request_id] = (future, convert_response, pair, time())
+        self.send_command(shard_index, command, request_id, *args)
+        return future
+
+    def on_shard_readable(self, connection):
+        """
+        Process all responses that are waiting on the connection with a shard.
+        """
+        try:
+            while connection.poll():
+                request_id, response, ticks_visited = connection.recv()
+                if request_id not in self.pending_requests:
+                    continue
+
+                future, convert_response, pair, start_time = self.pending_requests.pop(request_id)
+                self.statistics.record_engine_match(pair[0], pair[1], time() - start_time, ticks_visited,
+                                                    len(response))
+                if not future.done():
+                    future.set_result(convert_response(response))
+        except (EOFError, OSError):
+            self._logger.error("Connection to a matching shard closed unexpectedly")
+            get_event_loop().remove_reader(connection.fileno())
+
+    def on_tick_inserted(self, tick):
+        shard_index = self.get_shard_index(tick.assets.second.asset_id, tick.assets.first.asset_id)
+        self.order_shards[tick.order_id] = shard_index
+        self.send_command(shard_index, CMD_INSERT, tick)
+
+    def on_tick_removed(self, order_id):
+        shard_index = self.order_shards.pop(order_id, None)
+        if shard_index is not None:
+            self.send_command(shard_index, CMD_REMOVE, order_id)
+
+    def on_tick_traded(self, order_id, traded):
+        shard_index = self.order_shards.get(order_id)
+        if shard_index is not None:
+            self.send_command(shard_index, CMD_TRADED, order_id, traded)
+
+    def on_tick_blocked(self, order_id, blocked_order_id):
+        shard_index = self.order_shards.get(order_id)
+        if shard_index is not None:
+            self.send_command(shard_index, CMD_BLOCK, order_id, blocked_order_id)
+
+    def get_tick_entries(self, order_ids):
+        """
+        Return the tick entries in the order book of the matchmaker with the given order ids.
+        Ticks that have been removed in the meantime are left out.
+        """
+        tick_entries = [self.order_book.get_tick(order_id) for order_id in order_ids]
+        return [tick_entry for tick_entry in tick_entries if tick_entry]
+
+    def match(self, tick_entry):
+        """
+        :param tick_entry: The TickEntry that should be matched
+        :type tick_entry: TickEntry
+        :return: A future that fires with a list of matched ticks
+        :rtype: Future
+        """
+        shard_index = self.order_shards.get(tick_entry.order_id)
+        if shard_index is None:
+            future = Future()
+            future.set_result([])
+            return future
+        pair = tick_entry.price.num_type, tick_entry.price.denom_type
+        return self.send_request(shard_index, pair, CMD_MATCH, self.get_tick_entries, tick_entry.order_id)
+
+    def match_batch(self, price_wallet_id, quantity_wallet_id):
+        """
+        :param price_wallet_id: The price asset of the asset pair to match
+        :param quantity_wallet_id: The quantity asset of the asset pair to match
+        :return: A future that fires with a list of tuples containing the tick to notify and the tick it has been
+                 matched with
+        :rtype: Future
+        """
+        def convert_response(matches):
+            tick_entries = [tuple(self.get_tick_entries(match)) for match in matches]
+            return [match for match in tick_entries if len(match) == 2]
+
+        shard_index = self.get_shard_index(price_wallet_id, quantity_wallet_id)
+        return self.send_request(shard_index, (price_wallet_id, quantity_wallet_id), CMD_MATCH_BATCH, convert_response,
+                                 price_wallet_id, quantity_wallet_id)
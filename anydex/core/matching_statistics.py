@@ -0,0 +1,82 @@
+from anydex.core.histogram import Histogram
+
+
+class PairMatchingStatistics(object):
+    """
+    Matching statistics of a single asset pair.
+    """
+
+    def __init__(self):
+        self.engine_latency = Histogram()  # Time spent in the matching engine, in microseconds
+        self.match_latency = Histogram()  # Time spent in a match of the community, including sending messages
+        self.ticks_visited = Histogram()  # Number of ticks visited by the matching engine per match
+        self.num_engine_matches = 0  # Number of times the matching engine has been invoked
+        self.num_matched_ticks = 0  # Number of matched ticks returned by the matching engine
+
+    def to_dictionary(self):
+        return {
+            "engine_latency": self.engine_latency.to_dictionary(),
+            "match_latency": self.match_latency.to_dictionary(),
+            "ticks_visited": self.ticks_visited.to_dictionary(),
+            "engine_matches": self.num_engine_matches,
+            "matched_ticks": self.num_matched_ticks
+        }
+
+
+class MatchingStatistics(object):
+    """
+    Keeps track of the performance of the matching engine, per asset pair.
+    """
+
+    def __init__(self):
+        self.pairs = {}  # Map: (price wallet id, quantity wallet id) -> PairMatchingStatistics
+
+    def get_pair_statistics(self, price_wallet_id, quantity_wallet_id):
+        """
+        :rtype: PairMatchingStatistics
+        """
+        key = price_wallet_id, quantity_wallet_id
+        if key not in self.pairs:
+            self.pairs[key] = PairMatchingStatistics()
+        return self.pairs[key]
+
+    def record_engine_match(self, price_wallet_id, quantity_wallet_id, duration, ticks_visited, num_matched_ticks):
+        """
+        Record an invocation of the matching engine.
+        :param duration: The time spent in the matching engine, in seconds
+        :param ticks_visited: The number of ticks in the order book that have been visited
+        :param num_matched_ticks: The number of ticks that have been matched
+        """
+        pair_statistics = self.get_pair_statistics(price_wallet_id, quantity_wallet_id)
+        pair_statistics.engine_latency.record_duration(duration)
+        pair_statistics.ticks_visited.record(ticks_visited)
+        pair_statistics.num_engine_matches += 1
+        pair_statistics.num_matched_ticks += num_matched_ticks
+
+    def record_match(self, price_wallet_id, quantity_wallet_id, duration):
+        """
+        Record a match in the community, which includes scheduling the match messages.
+        :param duration: The time spent in the match, in seconds
+        """
+        self.get_pair_statistics(price_wallet_id, quantity_wallet_id).match_latency.record_duration(duration)
+
+    def to_dictionary(self, order_book=None):
+        """
+        Return a dictionary with the statistics of all asset pairs.
+        When an order book is passed, the number of ticks on each side is included.
+        """
+        pairs = set(self.pairs)
+        if order_book:
+            pairs |= set(order_book.asks.get_price_level_list_wallets()) | \
+                     set(order_book.bids.get_price_level_list_wallets())
+
+        pairs_list = []
+        for price_wallet_id, quantity_wallet_id in sorted(pairs):
+            pair_dict = self.get_pair_statistics(price_wallet_id, quantity_wallet_id).to_dictionary()
+            pair_dict["price_type"] = price_wallet_id
+            pair_dict["quantity_type"] = quantity_wallet_id
+            if order_book:
+                pair_dict["asks"] = order_book.asks.get_tick_count(price_wallet_id, quantity_wallet_id)
+                pair_dict["bids"] = order_book.bids.get_tick_count(price_wallet_id, quantity_wallet_id)
+            pairs_list.append(pair_dict)
+        return pairs_list
@@ -0,0 +1,108 @@
+import time
+from asyncio import iscoroutine
+
+from anydex.core.histogram import Histogram
+
+
+class HandlerStatistics(object):
+    """
+    Keeps track of the number of messages handled by a handler, their size, the number of failures and the latency
+    of the handler.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.bytes = 0
+        self.errors = 0
+        self.latency = Histogram()  # The time it takes to handle a message, in microseconds
+
+    def record(self, num_bytes, duration, failed=False):
+        self.count += 1
+        self.bytes += num_bytes
+        self.latency.record_duration(duration)
+        if failed:
+            self.errors += 1
+
+    def to_dictionary(self, elapsed):
+        return {
+            "count": self.count,
+            "bytes": self.bytes,
+            "errors": self.errors,
+            "messages_per_second": self.count / elapsed if elapsed > 0 else 0,
+            "bytes_per_second": self.bytes / elapsed if elapsed > 0 else 0,
+            "latency": self.latency.to_dictionary()
+        }
+
+
+class MessageStatistics(object):
+    """
+    Keeps track of the time spent on every type of incoming message and block.
+
+    Message handlers are wrapped, so every message that is handled is counted together with its size. The latency of
+    a coroutine handler is the time until the coroutine has finished, including the time it has been waiting.
+    """
+
+    def __init__(self, clock=time.time):
+        """
+        :param clock: Function that returns the current time in seconds
+        """
+        self.clock = clock
+        self.start_time = clock()
+        self.messages = {}  # Map: message type -> HandlerStatistics
+        self.blocks = {}  # Map: block type -> HandlerStatistics
+
+    def wrap(self, message_type, handler):
+        """
+        Wrap a message handler from the decode map, so its messages are counted and timed.
+        :param message_type: The name of the message type
+        :param handler: The handler of the message, which is called with the source address and the data
+        :return: The wrapped handler
+        """
+        statistics = self.messages.setdefault(message_type, HandlerStatistics())
+
+        def wrapper(source_address, data):
+            start = time.perf_counter()
+            try:
+                result = handler(source_address, data)
+            except Exception:
+                statistics.record(len(data), time.perf_counter() - start, failed=True)
+                raise
+            if iscoroutine(result):
+                return self.time_coroutine(statistics, len(data), start, result)
+            statistics.record(len(data), time.perf_counter() - start)
+            return result
+
+        wrapper.__wrapped__ = handler
+        return wrapper
+
+    async def time_coroutine(self, statistics, num_bytes, start, coro):
+        try:
+            result = await coro
+        except BaseException:
+            statistics.record(num_bytes, time.perf_counter() - start, failed=True)
+            raise
+        statistics.record(num_bytes, time.perf_counter() - start)
+        return result
+
+    def record_block(self, block_type, duration):
+        """
+        Record the time it took to process an incoming block.
+        :param block_type: The type of the block
+        :param duration: The processing time, in seconds
+        :type block_type: bytes
+        :type duration: float
+        """
+        statistics = self.blocks.get(block_type)
+        if not statistics:
+            statistics = self.blocks[block_type] = HandlerStatistics()
+        statistics.record(0, duration)  # Blocks are not received as separate messages, so their size is not counted
+
+    def to_dictionary(self):
+        elapsed = self.clock() - self.start_time
+        return {
+            "elapsed": elapsed,
+            "messages": {message_type: statistics.to_dictionary(elapsed)
+                         for message_type, statistics in self.messages.items()},
+            "blocks": {block_type.decode('utf-8'): statistics.to_dictionary(elapsed)
+                       for block_type, statistics in self.blocks.items()}
+        }
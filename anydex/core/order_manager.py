@@ -17,6 +17,11 @@ class OrderManager(object):
         self._logger.info("Market order manager initialized")
 
         self.order_repository = order_repository
+        # Map: OrderId -> the time (in ms) at which the order expires, for the orders that are open. This is updated
+        # when the status of an order changes, so the open orders can be counted without querying the repository.
+        self.open_orders = {}
+        for order in order_repository.find_all():
+            self.update_open_orders(order)
 
     def create_ask_order(self, assets, timeout):
         """
@@ -64,6 +69,35 @@ class OrderManager(object):
 
         if order:
             order.cancel()
-            self.order_repository.update(order)
+            self.update_order(order)
 
         self._logger.info("Order cancelled with id: " + str(order_id))
+
+    def update_order(self, order):
+        """
+        Update an order of which the status might have changed, e.g. because it has been verified or traded.
+        :type order: Order
+        """
+        self.order_repository.update(order)
+        self.update_open_orders(order)
+
+    def update_open_orders(self, order):
+        """
+        Add the order to the open orders if its status is open, otherwise remove it.
+        :type order: Order
+        """
+        if order.status == "open":
+            self.open_orders[order.order_id] = int(order.timestamp) + int(order.timeout) * 1000
+        else:
+            self.open_orders.pop(order.order_id, None)
+
+    def get_num_open_orders(self):
+        """
+        Return the number of open orders. Orders that have expired in the meantime are forgotten.
+        :rtype: int
+        """
+        now = int(Timestamp.now())
+        for order_id, expiry_time in list(self.open_orders.items()):
+            if expiry_time <= now:
+                del self.open_orders[order_id]
+        return len(self.open_orders)
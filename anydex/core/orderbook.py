@@ -1,20 +1,64 @@
+import heapq
 import logging
+import os
 import time
 from binascii import unhexlify
+from itertools import count
 
+from ipv8.database import database_blob
 from ipv8.taskmanager import TaskManager
 from ipv8.util import fail
 
+from anydex.core import MAX_ORDER_TIMEOUT
 from anydex.core.assetpair import AssetPair
+from anydex.core.database import TICK_JOURNAL_INSERT, TICK_JOURNAL_REMOVE, TICK_JOURNAL_TRADED
+from anydex.core.expiring_set import ExpiringSet
 from anydex.core.message import TraderId
 from anydex.core.order import OrderId, OrderNumber
+from anydex.core.orderbook_snapshot import OrderBookSnapshot, SNAPSHOT_ID_LENGTH, SnapshotError, write_snapshot
 from anydex.core.price import Price
 from anydex.core.side import Side
-from anydex.core.tick import Ask, Bid
+from anydex.core.tick import Ask, Bid, Tick
 from anydex.core.timeout import Timeout
 from anydex.core.timestamp import Timestamp
 
 
+class OrderBookListener(object):
+    """
+    Base class for objects that want to be notified about changes in the order book.
+    """
+
+    def on_tick_inserted(self, tick):
+        """
+        A tick has been inserted in the order book.
+        :type tick: Tick
+        """
+        pass
+
+    def on_tick_removed(self, order_id):
+        """
+        A tick has been removed from the order book.
+        :type order_id: OrderId
+        """
+        pass
+
+    def on_tick_traded(self, order_id, traded):
+        """
+        The traded quantity of a tick in the order book has been updated.
+        :type order_id: OrderId
+        :type traded: int
+        """
+        pass
+
+    def on_tick_blocked(self, order_id, blocked_order_id):
+        """
+        A tick in the order book has been temporarily blocked for matching with another order.
+        :type order_id: OrderId
+        :type blocked_order_id: OrderId
+        """
+        pass
+
+
 class OrderBook(TaskManager):
     """
     OrderBook is used for searching through all the orders and giving an indication to the user of what other offers
@@ -27,7 +71,26 @@ class OrderBook(TaskManager):
         self._logger = logging.getLogger(self.__class__.__name__)
         self._bids = Side()
         self._asks = Side()
-        self.completed_orders = set()
+        # Ticks cannot live longer than the maximum order timeout, so we only have to remember them during that period
+        self.completed_orders = ExpiringSet(MAX_ORDER_TIMEOUT + Tick.TIME_TOLERANCE // 1000)
+        self.listeners = []
+        self._expiries = []  # Heap of (expiry time, sequence number, tick) of the ticks inserted in bulk
+        self._expiry_counter = count()
+        self._expiry_task_name = None
+        self._expiry_task_time = None
+
+    def add_listener(self, listener):
+        """
+        Add a listener that is notified about changes in the order book.
+        :type listener: OrderBookListener
+        """
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """
+        :type listener: OrderBookListener
+        """
+        self.listeners.remove(listener)
 
     def timeout_ask(self, order_id):
         ask = self.get_ask(order_id).tick
@@ -48,11 +111,77 @@ class OrderBook(TaskManager):
         """
         if not self._asks.tick_exists(ask.order_id) and ask.order_id not in self.completed_orders and ask.is_valid():
             self._asks.insert_tick(ask)
+            for listener in self.listeners:
+                listener.on_tick_inserted(ask)
             delay = int(ask.timestamp) + int(ask.timeout) * 1000 - int(time.time() * 1000)
             return self.register_task("ask_%s_timeout" % ask.order_id, self.timeout_ask, ask.order_id, delay=delay)
         self.on_invalid_tick_insert()
         return fail(RuntimeError("ask invalid"))
 
+    def insert_ticks(self, ticks):
+        """
+        Insert multiple ticks at once, for instance when restoring the order book.
+        Instead of registering a timeout task per tick, the expiries of the inserted ticks are scheduled in one batch.
+        Ticks that already exist, have been completed or are invalid are skipped.
+        :param ticks: The ticks to insert
+        :type ticks: iterable of Tick
+        :return: The ticks that have been inserted
+        :rtype: [Tick]
+        """
+        asks = []
+        bids = []
+        order_ids = set()
+        for tick in ticks:
+            if tick.order_id in order_ids or self.tick_exists(tick.order_id) \
+                    or tick.order_id in self.completed_orders or not tick.is_valid():
+                continue
+            order_ids.add(tick.order_id)
+            asks.append(tick) if tick.is_ask() else bids.append(tick)
+
+        self._asks.insert_ticks(asks)
+        self._bids.insert_ticks(bids)
+
+        inserted_ticks = asks + bids
+        for tick in inserted_ticks:
+            for listener in self.listeners:
+                listener.on_tick_inserted(tick)
+            expiry = (int(tick.timestamp) + int(tick.timeout) * 1000) / 1000.0
+            heapq.heappush(self._expiries, (expiry, next(self._expiry_counter), tick))
+        self.schedule_expiries()
+
+        self._logger.info("Inserted %d ticks in the order book", len(inserted_ticks))
+        return inserted_ticks
+
+    def schedule_expiries(self):
+        """
+        Make sure that the expiry task fires when the first tick inserted in bulk times out.
+        """
+        if not self._expiries:
+            return
+
+        expiry = self._expiries[0][0]
+        if self._expiry_task_name and self.is_pending_task_active(self._expiry_task_name):
+            if self._expiry_task_time <= expiry:
+                return
+            self.cancel_pending_task(self._expiry_task_name)
+
+        self._expiry_task_name = "expire_ticks_%d" % next(self._expiry_counter)
+        self._expiry_task_time = expiry
+        self.register_task(self._expiry_task_name, self.expire_ticks, delay=max(expiry - time.time(), 0))
+
+    def expire_ticks(self):
+        """
+        Remove all ticks inserted in bulk that have timed out and schedule the next expiry.
+        """
+        now = time.time()
+        while self._expiries and self._expiries[0][0] <= now:
+            _, _, tick = heapq.heappop(self._expiries)
+            tick_entry = self.get_tick(tick.order_id)
+            if tick_entry and tick_entry.tick is tick:
+                self.remove_tick(tick.order_id)
+        self._expiry_task_name = None
+        self.schedule_expiries()
+
     def remove_ask(self, order_id):
         """
         :type order_id: OrderId
@@ -60,6 +189,8 @@ class OrderBook(TaskManager):
         if self._asks.tick_exists(order_id):
             self.cancel_pending_task("ask_%s_timeout" % order_id)
             self._asks.remove_tick(order_id)
+            for listener in self.listeners:
+                listener.on_tick_removed(order_id)
 
     def insert_bid(self, bid):
         """
@@ -67,6 +198,8 @@ class OrderBook(TaskManager):
         """
         if not self._bids.tick_exists(bid.order_id) and bid.order_id not in self.completed_orders and bid.is_valid():
             self._bids.insert_tick(bid)
+            for listener in self.listeners:
+                listener.on_tick_inserted(bid)
             delay = int(bid.timestamp) + int(bid.timeout) * 1000 - int(time.time() * 1000)
             return self.register_task("bid_%s_timeout" % bid.order_id, self.timeout_bid, bid.order_id, delay=delay)
         self.on_invalid_tick_insert()
@@ -79,6 +212,8 @@ class OrderBook(TaskManager):
         if self._bids.tick_exists(order_id):
             self.cancel_pending_task("bid_%s_timeout" % order_id)
             self._bids.remove_tick(order_id)
+            for listener in self.listeners:
+                listener.on_tick_removed(order_id)
 
     def update_ticks(self, ask_order_dict, bid_order_dict, traded_quantity):
         """
@@ -101,6 +236,8 @@ class OrderBook(TaskManager):
         if ask_exists and ask_order_dict["traded"] >= self.get_tick(ask_order_id).traded:
             tick = self.get_tick(ask_order_id)
             tick.traded = ask_order_dict["traded"]
+            for listener in self.listeners:
+                listener.on_tick_traded(tick.order_id, tick.traded)
             if tick.traded >= tick.assets.first.amount:
                 self.remove_tick(tick.order_id)
                 self.completed_orders.add(tick.order_id)
@@ -118,6 +255,8 @@ class OrderBook(TaskManager):
         if bid_exists and bid_order_dict["traded"] >= self.get_tick(bid_order_id).traded:
             tick = self.get_tick(bid_order_id)
             tick.traded = bid_order_dict["traded"]
+            for listener in self.listeners:
+                listener.on_tick_traded(tick.order_id, tick.traded)
             if tick.traded >= tick.assets.first.amount:
                 self.remove_tick(tick.order_id)
                 self.completed_orders.add(tick.order_id)
@@ -130,6 +269,20 @@ class OrderBook(TaskManager):
         elif not bid_exists and bid_order_dict["traded"] >= bid_order_dict["assets"]["first"]["amount"]:
             self.completed_orders.add(bid_order_id)
 
+    def block_for_matching(self, order_id, blocked_order_id):
+        """
+        Temporarily block a tick in the order book for matching with another order.
+        :type order_id: OrderId
+        :type blocked_order_id: OrderId
+        """
+        tick_entry = self.get_tick(order_id)
+        if not tick_entry:
+            return
+
+        tick_entry.block_for_matching(blocked_order_id)
+        for listener in self.listeners:
+            listener.on_tick_blocked(order_id, blocked_order_id)
+
     def tick_exists(self, order_id):
         """
         :param order_id: The order id to search for
@@ -341,29 +494,134 @@ class OrderBook(TaskManager):
         return tasks
 
 
+class TickJournal(OrderBookListener):
+    """
+    Keeps track of the changes to the order book that have not been appended to the tick journal in the database yet.
+    """
+
+    def __init__(self):
+        super(TickJournal, self).__init__()
+        self.entries = []
+
+    def on_tick_inserted(self, tick):
+        self.entries.append((TICK_JOURNAL_INSERT,) + tick.to_database())
+
+    def on_tick_removed(self, order_id):
+        self.entries.append((TICK_JOURNAL_REMOVE, database_blob(bytes(order_id.trader_id)), int(order_id.order_number))
+                            + (None,) * 9)
+
+    def on_tick_traded(self, order_id, traded):
+        self.entries.append((TICK_JOURNAL_TRADED, database_blob(bytes(order_id.trader_id)), int(order_id.order_number))
+                            + (None,) * 7 + (traded, None))
+
+
 class DatabaseOrderBook(OrderBook):
     """
     This class adds support for a persistency backend to store ticks.
     For now, it only provides methods to save all ticks to the database or to restore all ticks from the database.
     """
-    def __init__(self, database):
+    def __init__(self, database, snapshot_path=None):
+        """
+        :param database: The market database
+        :param snapshot_path: When set, a binary snapshot of the order book is written to this path on shutdown and
+                              used to restore the order book quickly on the next start
+        """
         super(DatabaseOrderBook, self).__init__()
         self.database = database
+        self.journal = None
+        self.snapshot_path = snapshot_path
+
+    def start_journal(self, flush_interval, compact_interval):
+        """
+        Persist the order book incrementally. The changes to the order book are appended to the tick journal in the
+        database and the journal is periodically compacted into the ticks table.
+        :param flush_interval: How often the changes are appended to the journal, in seconds
+        :param compact_interval: How often the journal is compacted, in seconds
+        """
+        self.journal = TickJournal()
+        self.add_listener(self.journal)
+        self.register_task("flush_tick_journal", self.flush_journal, interval=flush_interval)
+        self.register_task("compact_tick_journal", self.compact_journal, interval=compact_interval)
+
+    def flush_journal(self):
+        """
+        Append the pending changes to the tick journal in the database
+        """
+        if self.journal.entries:
+            self.database.add_tick_journal_entries(self.journal.entries)
+            self.journal.entries = []
+
+    def compact_journal(self):
+        """
+        Apply the tick journal to the ticks table in the database
+        """
+        self.flush_journal()
+        num_entries = self.database.compact_tick_journal()
+        self._logger.debug("Compacted %d entries of the tick journal", num_entries)
 
     def save_to_database(self):
         """
-        Write all ticks to the database
+        Write all ticks to the database. When the journal is used, only the pending changes are written.
         """
-        self.database.delete_all_ticks()
-        for order_id in self.get_order_ids():
-            tick = self.get_tick(order_id)
-            if tick.is_valid():
-                self.database.add_tick(tick.tick)
+        if self.journal:
+            self.flush_journal()
+        else:
+            self.database.delete_all_ticks()
+            for order_id in self.get_order_ids():
+                tick = self.get_tick(order_id)
+                if tick.is_valid():
+                    self.database.add_tick(tick.tick)
+
+        if self.snapshot_path:
+            self.save_snapshot()
+
+    def save_snapshot(self):
+        """
+        Write the valid ticks to the snapshot file. The id of the snapshot is stored in the database, so the snapshot is
+        only used as long as the database has not been changed without writing a new snapshot.
+        """
+        ticks = [self.get_tick(order_id).tick for order_id in self.get_order_ids()]
+        snapshot_id = os.urandom(SNAPSHOT_ID_LENGTH)
+        num_ticks = write_snapshot(self.snapshot_path, [tick for tick in ticks if tick.is_valid()], snapshot_id)
+        self.database.set_order_book_snapshot_id(snapshot_id)
+        self._logger.info("Wrote %d ticks to the order book snapshot", num_ticks)
+
+    def restore_from_snapshot(self, snapshot_id):
+        """
+        Restore ticks from the snapshot file, if there is one. The snapshot is removed afterwards, since it no longer
+        reflects the order book once the order book changes.
+        :param snapshot_id: The id of the snapshot that matches the ticks in the database
+        :return: True if the ticks have been restored from the snapshot, False otherwise
+        :rtype: bool
+        """
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+
+        try:
+            snapshot = OrderBookSnapshot(self.snapshot_path)
+        except (SnapshotError, OSError) as e:
+            self._logger.warning("Unable to read the order book snapshot: %s", e)
+            os.remove(self.snapshot_path)
+            return False
+
+        try:
+            if snapshot.snapshot_id != snapshot_id:
+                self._logger.warning("Ignoring order book snapshot, since it is older than the database")
+                return False
+            self.insert_ticks(snapshot.get_active_ticks())
+        finally:
+            snapshot.close()
+            os.remove(self.snapshot_path)
+        return True
 
     def restore_from_database(self):
         """
-        Restore ticks from the database
+        Restore ticks from the snapshot or, if there is none, from the database. The tick journal of a previous run is
+        replayed first. Any snapshot is invalidated, since the database is changed from now on.
         """
-        for tick in self.database.get_ticks():
-            if not self.tick_exists(tick.order_id) and tick.is_valid():
-                self.insert_ask(tick) if tick.is_ask() else self.insert_bid(tick)
+        self.database.compact_tick_journal()
+        snapshot_id = self.database.get_order_book_snapshot_id()
+        if snapshot_id is not None:
+            self.database.set_order_book_snapshot_id(None)
+        if not self.restore_from_snapshot(snapshot_id):
+            self.insert_ticks(self.database.get_ticks())
@@ -0,0 +1,158 @@
+"""
+This file contains a compact binary snapshot format of the order book, used to quickly restore the order book of a
+matchmaker after a restart.
+
+A snapshot consists of a header, a table with the asset types and a list of fixed-width tick records. The asset types
+of a tick are stored as an index in the asset type table. The header contains a random snapshot id, which is also
+stored in the database, so a snapshot that is older than the ticks in the database can be recognized.
+"""
+import mmap
+import os
+import struct
+import time
+
+from anydex.core.assetamount import AssetAmount
+from anydex.core.assetpair import AssetPair
+from anydex.core.message import TraderId
+from anydex.core.order import OrderId, OrderNumber
+from anydex.core.tick import Ask, Bid
+from anydex.core.timeout import Timeout
+from anydex.core.timestamp import Timestamp
+
+SNAPSHOT_FILE_NAME = u"orderbook.snapshot"
+SNAPSHOT_MAGIC = b'ADXOBSNP'
+SNAPSHOT_VERSION = 2
+
+# Magic, version, number of asset types, number of ticks, snapshot id
+HEADER_FORMAT = struct.Struct('>8sHHI16s')
+SNAPSHOT_ID_LENGTH = 16
+ASSET_TYPE_LENGTH_FORMAT = struct.Struct('>B')
+# Trader id, order number, first amount, first type, second amount, second type, timeout, timestamp, is ask, traded,
+# block hash
+TICK_FORMAT = struct.Struct('>20sQQHQHIQ?Q32s')
+
+
+class SnapshotError(Exception):
+    """
+    Raised when a snapshot file cannot be read.
+    """
+    pass
+
+
+def write_snapshot(path, ticks, snapshot_id=b'\x00' * SNAPSHOT_ID_LENGTH):
+    """
+    Write a snapshot with the given ticks to a file. The snapshot is written to a temporary file first, which then
+    replaces the file at the given path, so readers never see a partially written snapshot.
+    :param path: The path of the snapshot file
+    :param ticks: The ticks to write
+    :param snapshot_id: The id of the snapshot
+    :type ticks: [Tick]
+    :type snapshot_id: bytes
+    :return: The number of ticks written
+    :rtype: int
+    """
+    asset_types = {}
+    records = []
+    for tick in ticks:
+        first_type = asset_types.setdefault(tick.assets.first.asset_id, len(asset_types))
+        second_type = asset_types.setdefault(tick.assets.second.asset_id, len(asset_types))
+        records.append(TICK_FORMAT.pack(bytes(tick.order_id.trader_id), int(tick.order_id.order_number),
+                                        tick.assets.first.amount, first_type, tick.assets.second.amount, second_type,
+                                        int(tick.timeout), int(tick.timestamp), tick.is_ask(), tick.traded,
+                                        tick.block_hash))
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as snapshot_file:
+        snapshot_file.write(HEADER_FORMAT.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(asset_types), len(records),
+                                              snapshot_id))
+        for asset_type in sorted(asset_types, key=asset_types.get):
+            encoded_asset_type = asset_type.encode('utf-8')
+            snapshot_file.write(ASSET_TYPE_LENGTH_FORMAT.pack(len(encoded_asset_type)) + encoded_asset_type)
+        snapshot_file.write(b''.join(records))
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(tmp_path, path)
+    return len(records)
+
+
+class OrderBookSnapshot(object):
+    """
+    Read-only view on a snapshot file. The file is memory-mapped and Tick objects are only created when a record is
+    accessed.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: The path of the snapshot file
+        :raises SnapshotError: Thrown when the file is not a valid snapshot
+        """
+        with open(path, 'rb') as snapshot_file:
+            try:
+                self._buffer = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise SnapshotError("Snapshot is empty")
+
+        try:
+            magic, version, num_asset_types, self._num_ticks, self.snapshot_id = \
+                HEADER_FORMAT.unpack_from(self._buffer, 0)
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                raise SnapshotError("Unknown snapshot format")
+
+            offset = HEADER_FORMAT.size
+            self._asset_types = []
+            for _ in range(num_asset_types):
+                length, = ASSET_TYPE_LENGTH_FORMAT.unpack_from(self._buffer, offset)
+                offset += ASSET_TYPE_LENGTH_FORMAT.size
+                self._asset_types.append(self._buffer[offset:offset + length].decode('utf-8'))
+                offset += length
+            self._records_offset = offset
+
+            if len(self._buffer) != self._records_offset + self._num_ticks * TICK_FORMAT.size:
+                raise SnapshotError("Snapshot is truncated")
+        except (struct.error, UnicodeDecodeError) as e:
+            self.close()
+            raise SnapshotError("Invalid snapshot: %s" % e)
+        except SnapshotError:
+            self.close()
+            raise
+
+    def __len__(self):
+        return self._num_ticks
+
+    def _get_record(self, index):
+        return TICK_FORMAT.unpack_from(self._buffer, self._records_offset + index * TICK_FORMAT.size)
+
+    def _create_tick(self, record):
+        trader_id, order_number, first_amount, first_type, second_amount, second_type, timeout, timestamp, is_ask, \
+            traded, block_hash = record
+        tick_cls = Ask if is_ask else Bid
+        assets = AssetPair(AssetAmount(first_amount, self._asset_types[first_type]),
+                           AssetAmount(second_amount, self._asset_types[second_type]))
+        return tick_cls(OrderId(TraderId(trader_id), OrderNumber(order_number)), assets, Timeout(timeout),
+                        Timestamp(timestamp), traded=traded, block_hash=block_hash)
+
+    def __getitem__(self, index):
+        """
+        Return the tick with a specific index in the snapshot.
+        :rtype: Tick
+        """
+        if not 0 <= index < self._num_ticks:
+            raise IndexError("Snapshot index out of range")
+        return self._create_tick(self._get_record(index))
+
+    def __iter__(self):
+        for index in range(self._num_ticks):
+            yield self._create_tick(self._get_record(index))
+
+    def get_active_ticks(self):
+        """
+        Iterate over the ticks that have not timed out yet. Timed out records are skipped before a Tick is created.
+        """
+        now = int(time.time() * 1000)
+        for index in range(self._num_ticks):
+            record = self._get_record(index)
+            if record[7] + record[6] * 1000 > now and record[9] < record[2]:
+                yield self._create_tick(record)
+
+    def close(self):
+        self._buffer.close()
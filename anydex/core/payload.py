@@ -1,4 +1,7 @@
+from struct import Struct, error as StructError
+
 from ipv8.messaging.payload import Payload
+from ipv8.messaging.serialization import PackError, Serializer
 
 from anydex.core.assetamount import AssetAmount
 from anydex.core.assetpair import AssetPair
@@ -11,6 +14,35 @@ from anydex.core.transaction import TransactionId
 from anydex.core.wallet_address import WalletAddress
 
 
+class lazy_property(object):
+    """
+    Property that is computed when it is first accessed, after which the value is stored in the instance.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = instance.__dict__[self.name] = self.func(instance)
+        return value
+
+
+def decode_fields(payload, names):
+    """
+    Decode the lazily decoded fields of a payload and return whether all of them are valid.
+    """
+    try:
+        for name in names:
+            getattr(payload, name)
+    except ValueError:
+        return False
+    return True
+
+
 class MessagePayload(Payload):
     """
     Payload for a generic message in the market community.
@@ -29,6 +61,12 @@ class MessagePayload(Payload):
 
         return data
 
+    def is_valid(self):
+        """
+        Return whether all fields of the payload are valid. This should be checked before a received payload is used.
+        """
+        return True
+
 
 class InfoPayload(MessagePayload):
     """
@@ -99,13 +137,91 @@ class MatchPayload(OrderPayload):
         return data
 
     @classmethod
-    def from_unpack_list(cls, trader_id, timestamp, order_number, asset1_amount, asset1_type, asset2_amount,
-                         asset2_type, timeout, traded, recipient_order_number, match_trader_id, matchmaker_trader_id):
-        return MatchPayload(TraderId(trader_id), Timestamp(timestamp), OrderNumber(order_number),
-                            AssetPair(AssetAmount(asset1_amount, asset1_type.decode('utf-8')),
-                                      AssetAmount(asset2_amount, asset2_type.decode('utf-8'))),
-                            Timeout(timeout), traded, OrderNumber(recipient_order_number),
-                            TraderId(match_trader_id), TraderId(matchmaker_trader_id))
+    def from_unpack_list(cls, *args):
+        return LazyMatchPayload(*args)
+
+
+class LazyMatchPayload(MatchPayload):
+    """
+    Match payload that has been received from the network. The unpacked fields are only converted to domain objects
+    when they are first accessed, so matches that are rejected early are not decoded completely.
+    """
+
+    def __init__(self, trader_id, timestamp, order_number, asset1_amount, asset1_type, asset2_amount, asset2_type,
+                 timeout, traded, recipient_order_number, match_trader_id, matchmaker_trader_id):
+        self._trader_id = trader_id
+        self._timestamp = timestamp
+        self._order_number = order_number
+        self._assets = (asset1_amount, asset1_type, asset2_amount, asset2_type)
+        self._timeout = timeout
+        self.traded = traded
+        self.recipient_order_number = OrderNumber(recipient_order_number)
+        self._match_trader_id = match_trader_id
+        self._matchmaker_trader_id = matchmaker_trader_id
+
+    @lazy_property
+    def trader_id(self):
+        return TraderId(self._trader_id)
+
+    @lazy_property
+    def timestamp(self):
+        return Timestamp(self._timestamp)
+
+    @lazy_property
+    def order_number(self):
+        return OrderNumber(self._order_number)
+
+    @lazy_property
+    def assets(self):
+        asset1_amount, asset1_type, asset2_amount, asset2_type = self._assets
+        return AssetPair(AssetAmount(asset1_amount, asset1_type.decode('utf-8')),
+                         AssetAmount(asset2_amount, asset2_type.decode('utf-8')))
+
+    @lazy_property
+    def timeout(self):
+        return Timeout(self._timeout)
+
+    @lazy_property
+    def match_trader_id(self):
+        return TraderId(self._match_trader_id)
+
+    @lazy_property
+    def matchmaker_trader_id(self):
+        return TraderId(self._matchmaker_trader_id)
+
+    def is_valid(self):
+        return decode_fields(self, ('trader_id', 'timestamp', 'order_number', 'assets', 'timeout', 'match_trader_id',
+                                    'matchmaker_trader_id'))
+
+
+class MatchBatchPayload(MessagePayload):
+    """
+    Payload with multiple matches for the same order of the recipient in the market community.
+    The matches are serialized match payloads that are stored back to back.
+    """
+
+    format_list = MessagePayload.format_list + ['I', 'varlenI']
+
+    def __init__(self, trader_id, timestamp, recipient_order_number, matches):
+        super(MatchBatchPayload, self).__init__(trader_id, timestamp)
+        self.recipient_order_number = recipient_order_number
+        self.matches = matches
+
+    def to_pack_list(self):
+        data = super(MatchBatchPayload, self).to_pack_list()
+        data += [('I', int(self.recipient_order_number)),
+                 ('varlenI', b''.join(market_serializer.pack_multiple(match.to_pack_list())[0]
+                                      for match in self.matches))]
+        return data
+
+    @classmethod
+    def from_unpack_list(cls, trader_id, timestamp, recipient_order_number, serialized_matches):
+        matches = []
+        while serialized_matches:
+            match, serialized_matches = market_serializer.unpack_to_serializables([MatchPayload], serialized_matches)
+            matches.append(match)
+        return MatchBatchPayload(TraderId(trader_id), Timestamp(timestamp), OrderNumber(recipient_order_number),
+                                 matches)
 
 
 class DeclineMatchPayload(MessagePayload):
@@ -162,12 +278,50 @@ class TradePayload(MessagePayload):
         return data
 
     @classmethod
-    def from_unpack_list(cls, trader_id, timestamp, order_number, recipient_trader_id, recipient_order_number,
-                         proposal_id, asset1_amount, asset1_type, asset2_amount, asset2_type):
-        return TradePayload(TraderId(trader_id), Timestamp(timestamp), OrderNumber(order_number),
-                            OrderId(TraderId(recipient_trader_id), OrderNumber(recipient_order_number)), proposal_id,
-                            AssetPair(AssetAmount(asset1_amount, asset1_type.decode('utf-8')),
-                                      AssetAmount(asset2_amount, asset2_type.decode('utf-8'))))
+    def from_unpack_list(cls, *args):
+        return LazyTradePayload(*args)
+
+
+class LazyTradePayload(TradePayload):
+    """
+    Trade payload that has been received from the network. The unpacked fields are only converted to domain objects
+    when they are first accessed, so trades that are rejected early are not decoded completely.
+    """
+
+    def __init__(self, trader_id, timestamp, order_number, recipient_trader_id, recipient_order_number, proposal_id,
+                 asset1_amount, asset1_type, asset2_amount, asset2_type):
+        self._trader_id = trader_id
+        self._timestamp = timestamp
+        self._order_number = order_number
+        self._recipient_order_id = (recipient_trader_id, recipient_order_number)
+        self.proposal_id = proposal_id
+        self._assets = (asset1_amount, asset1_type, asset2_amount, asset2_type)
+
+    @lazy_property
+    def trader_id(self):
+        return TraderId(self._trader_id)
+
+    @lazy_property
+    def timestamp(self):
+        return Timestamp(self._timestamp)
+
+    @lazy_property
+    def order_number(self):
+        return OrderNumber(self._order_number)
+
+    @lazy_property
+    def recipient_order_id(self):
+        recipient_trader_id, recipient_order_number = self._recipient_order_id
+        return OrderId(TraderId(recipient_trader_id), OrderNumber(recipient_order_number))
+
+    @lazy_property
+    def assets(self):
+        asset1_amount, asset1_type, asset2_amount, asset2_type = self._assets
+        return AssetPair(AssetAmount(asset1_amount, asset1_type.decode('utf-8')),
+                         AssetAmount(asset2_amount, asset2_type.decode('utf-8')))
+
+    def is_valid(self):
+        return decode_fields(self, ('trader_id', 'timestamp', 'order_number', 'recipient_order_id', 'assets'))
 
 
 class DeclineTradePayload(MessagePayload):
@@ -356,3 +510,133 @@ class PublicKeyPayload(MessagePayload):
     @classmethod
     def from_unpack_list(cls, trader_id, timestamp, identifier):
         return PublicKeyPayload(TraderId(trader_id), timestamp, identifier)
+
+
+FIXED_SIZE_FORMATS = {'?', 'B', 'c', 'H', 'I', 'Q', '32s'}
+VARLEN_SIZE = Struct('>I')
+
+
+class PayloadCodec(object):
+    """
+    Packs and unpacks all fields of a payload format list at once. Every run of fixed-size fields is handled by a
+    single precompiled struct, variable-length fields are appended with their length. The result is the same as
+    serializing the fields one by one with the ipv8 serializer.
+    """
+
+    def __init__(self, format_list):
+        """
+        :param format_list: The formats of the fields, consisting of fixed-size formats and varlenI
+        """
+        self.format_list = tuple(format_list)
+        self.segments = []  # List of (struct, number of fields), the struct is None for a varlenI field
+
+        fixed_formats = []
+        for field_format in format_list:
+            if field_format in FIXED_SIZE_FORMATS:
+                fixed_formats.append(field_format)
+                continue
+            if field_format != 'varlenI':
+                raise ValueError("Format %s cannot be precompiled" % field_format)
+            if fixed_formats:
+                self.segments.append((Struct('>' + ''.join(fixed_formats)), len(fixed_formats)))
+                fixed_formats = []
+            self.segments.append((None, 1))
+        if fixed_formats:
+            self.segments.append((Struct('>' + ''.join(fixed_formats)), len(fixed_formats)))
+
+    def pack(self, values):
+        """
+        Pack the values of the fields.
+        :param values: The values, in the order of the format list
+        :return: The serialized fields
+        :rtype: bytes
+        """
+        parts = []
+        index = 0
+        for struct, num_fields in self.segments:
+            if struct:
+                parts.append(struct.pack(*values[index:index + num_fields]))
+            else:
+                parts.append(VARLEN_SIZE.pack(len(values[index])))
+                parts.append(values[index])
+            index += num_fields
+        return b''.join(parts)
+
+    def unpack_from(self, data, offset=0):
+        """
+        Unpack the values of the fields.
+        :param data: The data to unpack from
+        :param offset: The offset of the first field in the data
+        :return: A tuple with the list of values and the offset after the last field
+        """
+        values = []
+        for struct, num_fields in self.segments:
+            if struct:
+                values.extend(struct.unpack_from(data, offset))
+                offset += struct.size
+            else:
+                length, = VARLEN_SIZE.unpack_from(data, offset)
+                offset += VARLEN_SIZE.size
+                if offset + length > len(data):
+                    raise StructError("varlenI field of %d bytes exceeds the data" % length)
+                values.append(data[offset:offset + length])
+                offset += length
+        return values, offset
+
+
+class MarketSerializer(Serializer):
+    """
+    Serializer that packs and unpacks registered payloads with a precompiled codec, instead of field by field.
+    Everything else is handled like the default serializer does.
+    """
+
+    def __init__(self, payload_classes=()):
+        """
+        :param payload_classes: The payload classes with a fixed format list to precompile codecs for
+        """
+        super(MarketSerializer, self).__init__()
+        self.pack_codecs = {}  # Map: tuple of formats -> PayloadCodec
+        self.unpack_codecs = {}  # Map: payload class -> PayloadCodec
+        for payload_class in payload_classes:
+            self.register_payload(payload_class)
+
+    def register_payload(self, payload_class):
+        """
+        Precompile the codec of a payload class with a fixed format list.
+        :param payload_class: The payload class to register
+        """
+        codec = PayloadCodec(payload_class.format_list)
+        self.pack_codecs[codec.format_list] = codec
+        self.unpack_codecs[payload_class] = codec
+
+    def pack_multiple(self, pack_list):
+        codec = self.pack_codecs.get(tuple(packable[0] for packable in pack_list))
+        if not codec:
+            return super(MarketSerializer, self).pack_multiple(pack_list)
+
+        try:
+            packed = codec.pack([packable[1] for packable in pack_list])
+        except Exception as e:
+            raise PackError("Could not pack %s\n%s: %s" % (repr(pack_list), type(e).__name__, str(e))) from e
+        return packed, len(packed)
+
+    def unpack_to_serializables(self, serializables, data):
+        offset = 0
+        out = []
+        for index, serializable in enumerate(serializables):
+            codec = self.unpack_codecs.get(serializable)
+            if not codec:
+                return out + super(MarketSerializer, self).unpack_to_serializables(serializables[index:],
+                                                                                   data[offset:])
+            try:
+                unpack_list, offset = codec.unpack_from(data, offset)
+            except Exception as e:
+                raise PackError("Failed to unserialize %s\n%s: %s" % (serializable.__name__,
+                                                                      type(e).__name__, str(e))) from e
+            out.append(serializable.from_unpack_list(*unpack_list))
+        out.append(data[offset:])
+        return out
+
+
+market_serializer = MarketSerializer([InfoPayload, MatchPayload, DeclineMatchPayload, TradePayload,
+                                      DeclineTradePayload, PingPongPayload])
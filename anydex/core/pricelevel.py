@@ -8,6 +8,8 @@ class PriceLevel(object):
         self._depth = 0  # Total amount of quantity contained in this price level
         self._last = None  # The current tick of the iterator
         self._price = price  # The price of this price level
+        self._trader_counts = {}  # Map: TraderId -> number of ticks of that trader in this price level
+        self._blocked_counts = {}  # Map: OrderId -> number of ticks in this price level blocked for that order
 
     @property
     def price(self):
@@ -47,6 +49,44 @@ class PriceLevel(object):
         """
         self._depth = new_depth
 
+    def trader_count(self, trader_id):
+        """
+        Return the number of ticks in this price level that belong to a specific trader
+        :rtype: int
+        """
+        return self._trader_counts.get(trader_id, 0)
+
+    def blocked_count(self, order_id):
+        """
+        Return the number of ticks in this price level that are blocked for matching with a specific order
+        :rtype: int
+        """
+        return self._blocked_counts.get(order_id, 0)
+
+    def eligible_count(self, order_id):
+        """
+        Return the number of ticks in this price level that a specific order is allowed to match with.
+        Ticks of the same trader and ticks that are blocked for the order are not eligible.
+        :rtype: int
+        """
+        return self._length - self.trader_count(order_id.trader_id) - self.blocked_count(order_id)
+
+    def block_tick(self, order_id):
+        """
+        Register that a tick in this price level has been blocked for matching with a specific order
+        """
+        self._blocked_counts[order_id] = self._blocked_counts.get(order_id, 0) + 1
+
+    def unblock_tick(self, order_id):
+        """
+        Register that a tick in this price level is no longer blocked for matching with a specific order
+        """
+        count = self._blocked_counts.get(order_id, 0) - 1
+        if count > 0:
+            self._blocked_counts[order_id] = count
+        else:
+            self._blocked_counts.pop(order_id, None)
+
     def __len__(self):
         """
         Return the length of the amount of ticks contained in the price level
@@ -89,6 +129,10 @@ class PriceLevel(object):
         # Update the counters
         self._length += 1
         self._depth += tick.assets.first.amount
+        trader_id = tick.order_id.trader_id
+        self._trader_counts[trader_id] = self._trader_counts.get(trader_id, 0) + 1
+        for order_id in tick.blocked_order_ids():
+            self.block_tick(order_id)
 
     def remove_tick(self, tick):
         """
@@ -100,6 +144,14 @@ class PriceLevel(object):
         # Update the counters
         self._depth -= tick.assets.first.amount
         self._length -= 1
+        trader_id = tick.order_id.trader_id
+        trader_count = self._trader_counts.get(trader_id, 0) - 1
+        if trader_count > 0:
+            self._trader_counts[trader_id] = trader_count
+        else:
+            self._trader_counts.pop(trader_id, None)
+        for order_id in tick.blocked_order_ids():
+            self.unblock_tick(order_id)
 
         if self._length == 0:  # Was the only tick in this price level
             return
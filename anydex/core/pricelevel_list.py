@@ -22,6 +22,17 @@ class PriceLevelList(object):
         self._price_list.sort()
         self._price_level_dictionary[price_level.price] = price_level
 
+    def insert_many(self, price_levels):  # type: (List[PriceLevel]) -> None
+        """
+        Insert multiple price levels at once, sorting the price list only once.
+
+        :type price_levels: List[PriceLevel]
+        """
+        for price_level in price_levels:
+            self._price_list.append(price_level.price)
+            self._price_level_dictionary[price_level.price] = price_level
+        self._price_list.sort()
+
     def remove(self, price):  # type: (Price) -> None
         """
         :type price: Price
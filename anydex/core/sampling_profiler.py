@@ -0,0 +1,179 @@
+import json
+import logging
+import os
+import sys
+import time
+from asyncio import Future, get_event_loop
+from collections import Counter
+from threading import Event, Thread, get_ident
+
+OUTPUT_FORMATS = {"collapsed": "txt", "speedscope": "speedscope.json"}
+
+
+def get_frame_name(code):
+    return "%s (%s:%d)" % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+
+class SamplingProfiler(object):
+    """
+    Statistical profiler that periodically samples the stack of the event loop thread.
+
+    The samples are taken by a separate thread, so the profiled code is not instrumented and the overhead is limited
+    to the time it takes to copy the stack at every interval. The profile is written as collapsed stacks, which can be
+    turned into a flame graph, or in the speedscope format.
+    """
+
+    def __init__(self, interval=0.005):
+        """
+        :param interval: The time between two samples, in seconds
+        :type interval: float
+        """
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.interval = interval
+        self.samples = Counter()  # Map: stack (tuple of code objects, from the outermost frame) -> number of samples
+        self.num_samples = 0
+        self.start_time = None
+        self.end_time = None
+        self.thread_id = None
+        self.path = None
+        self.sampler = None
+        self.stopped = Event()
+
+    @property
+    def running(self):
+        return self.sampler is not None and self.sampler.is_alive()
+
+    def start(self, duration, path, output_format="collapsed"):
+        """
+        Start sampling the current thread, which should run the event loop, and write the profile when done.
+        :param duration: The number of seconds to sample
+        :param path: The file to write the profile to
+        :param output_format: The format of the profile, either collapsed or speedscope
+        :return: A future that fires with the path of the profile, once it has been written
+        :rtype: Future
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError("Unknown profile format %s" % output_format)
+        if self.running:
+            raise RuntimeError("The profiler is already running")
+
+        loop = get_event_loop()
+        future = Future()
+
+        def on_done(result):
+            if future.done():
+                return
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+        def run():
+            self.sample(duration)
+            try:
+                self.write(path, output_format)
+                self._logger.info("Wrote profile with %d samples to %s", self.num_samples, path)
+                result = path
+            except Exception as e:
+                self._logger.error("Failed to write profile to %s: %s", path, e)
+                result = e
+            loop.call_soon_threadsafe(on_done, result)
+
+        self.samples.clear()
+        self.num_samples = 0
+        self.start_time = self.end_time = None
+        self.path = path
+        self.thread_id = get_ident()
+        self.stopped.clear()
+        self.sampler = Thread(target=run, name=self.__class__.__name__, daemon=True)
+        self.sampler.start()
+        return future
+
+    def stop(self):
+        """
+        Stop sampling before the duration has passed and wait until the profile has been written.
+        """
+        self.stopped.set()
+        if self.sampler:
+            self.sampler.join()
+
+    def sample(self, duration):
+        """
+        Take samples until the duration has passed or the profiler is stopped. Runs in the sampler thread.
+        """
+        self.start_time = time.time()
+        deadline = time.monotonic() + duration
+        while not self.stopped.wait(self.interval) and time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            stack.reverse()
+            self.samples[tuple(stack)] += 1
+            self.num_samples += 1
+        self.end_time = time.time()
+
+    def to_collapsed(self):
+        """
+        Return the samples as collapsed stacks: one line per unique stack with the frames separated by semicolons,
+        followed by the number of samples.
+        """
+        lines = ["%s %d" % (";".join(get_frame_name(code) for code in stack), count)
+                 for stack, count in self.samples.most_common()]
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self):
+        """
+        Return the samples as a sampled profile in the speedscope file format.
+        """
+        frame_indices = {}
+        frames = []
+        samples = []
+        weights = []
+        for stack, count in self.samples.most_common():
+            indices = []
+            for code in stack:
+                index = frame_indices.get(code)
+                if index is None:
+                    index = frame_indices[code] = len(frames)
+                    frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+                indices.append(index)
+            samples.append(indices)
+            weights.append(count * self.interval)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": "Event loop thread",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights
+            }],
+            "name": "AnyDex profile %s" % time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.start_time)),
+            "exporter": "anydex"
+        }
+
+    def write(self, path, output_format="collapsed"):
+        with open(path, "w") as profile_file:
+            if output_format == "speedscope":
+                json.dump(self.to_speedscope(), profile_file)
+            else:
+                profile_file.write(self.to_collapsed())
+
+    def to_dictionary(self):
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "samples": self.num_samples,
+            "path": self.path,
+            "start_time": self.start_time,
+            "end_time": self.end_time
+        }
@@ -7,5 +7,24 @@ class MarketSettings(object):
         self.fanout = 20
         self.match_window = 0         # How much time we wait before accepting a specific match
         self.match_send_interval = 0  # How long we should wait with sending a match message (to avoid overloading a peer)
+        self.max_matches_per_message = 8  # How many matches for the same order are sent in a single message
+        self.match_batch_interval = 0  # When positive, ticks of an asset pair are matched in batches at this interval
+        self.matching_shards = 0      # When positive, asset pairs are matched in this many worker processes
+        self.tick_journal_interval = 0  # When positive, order book changes are written to a journal at this interval
+        self.tick_journal_compact_interval = 300  # How often the tick journal is compacted into the ticks table
+        self.order_book_snapshot = False  # Whether to write a binary snapshot of the order book on shutdown
         self.num_order_sync = 10      # How many orders to sync at most
+        self.address_ttl = 3600       # How long the address of a trader is cached
+        self.address_negative_ttl = 30  # How long a failed address lookup is cached
+        self.address_cache_size = 10000  # How many trader addresses are cached at most
+        self.block_packet_cache_size = 1000  # How many serialized blocks are kept for sending them again
+        self.tick_block_cache_size = 10000  # How many tick blocks are kept in memory for order book sync responses
+        self.tick_queue_size = 100    # How many new orders can wait for the creation of their tick block
+        self.tick_batch_size = 50     # How many tick blocks are created and broadcast at once
+        self.block_verification_workers = 2  # Threads verifying block signatures, 0 to verify them on the event loop
+        self.trace_buffer_size = 10000  # How many spans of the trade lifecycle traces are kept, 0 disables tracing
+        self.loop_monitor_interval = 0.05  # How often the lag of the event loop is measured, when monitored
+        self.profiler_interval = 0.005  # How often the stack of the event loop is sampled, when profiling
         self.single_trade = True      # Whether we can only trade with a single counterparty at once
+        self.chain_crawl_ttl = 5      # How long the chain of a counterparty is not crawled again after a crawl
+        self.trade_reservation_ttl = 30  # How long an accepted trade blocks other trades with the counterparty at most
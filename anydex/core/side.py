@@ -11,6 +11,7 @@ class Side(object):
         self._price_map = {}  # Map: Price -> PriceLevel
         self._tick_map = {}  # Map: MessageId -> TickEntry
         self._depth = {}  # Dict of (price_type, asset_type) -> Int
+        self._tick_counts = {}  # Dict of (price_type, asset_type) -> number of ticks
 
     def __len__(self):
         """
@@ -90,6 +91,44 @@ class Side(object):
         tick_entry = TickEntry(tick, self._price_map[tick.price])
         self.get_price_level(tick.price).append_tick(tick_entry)
         self._tick_map[tick.order_id] = tick_entry
+        key = tick.assets.second.asset_id, tick.assets.first.asset_id
+        self._tick_counts[key] = self._tick_counts.get(key, 0) + 1
+
+    def insert_ticks(self, ticks):
+        """
+        Insert multiple ticks at once. The ticks are grouped by price and the new price levels of each asset pair are
+        added to the price level list in one go, so the price list is sorted only once per asset pair.
+        :param ticks: The ticks to insert, ticks with the same price are queued in the order of this list
+        :type ticks: [Tick]
+        :return: The tick entries of the inserted ticks
+        :rtype: [TickEntry]
+        """
+        new_price_levels = {}  # Dict of (price_type, asset_type) -> [PriceLevel]
+        tick_entries = []
+        for tick in ticks:
+            key = tick.assets.second.asset_id, tick.assets.first.asset_id
+            if key not in self._price_level_list_map:
+                self._price_level_list_map[key] = PriceLevelList()
+                self._depth[key] = 0
+
+            price = tick.price
+            price_level = self._price_map.get(price)
+            if price_level is None:  # First tick for that price
+                price_level = PriceLevel(price)
+                self._price_map[price] = price_level
+                self._depth[key] += 1
+                new_price_levels.setdefault(key, []).append(price_level)
+
+            tick_entry = TickEntry(tick, price_level)
+            price_level.append_tick(tick_entry)
+            self._tick_map[tick.order_id] = tick_entry
+            self._tick_counts[key] = self._tick_counts.get(key, 0) + 1
+            tick_entries.append(tick_entry)
+
+        for key, price_levels in new_price_levels.items():
+            self._price_level_list_map[key].insert_many(price_levels)
+
+        return tick_entries
 
     def remove_tick(self, order_id):
         """
@@ -103,6 +142,7 @@ class Side(object):
             if len(tick.price_level()) == 0:  # Last tick for that price
                 self._remove_price_level(tick.price)
             del self._tick_map[order_id]
+            self._tick_counts[(tick.price.num_type, tick.price.denom_type)] -= 1
 
     def get_price_level_list(self, price_wallet_id, quantity_wallet_id):
         """
@@ -110,6 +150,20 @@ class Side(object):
         """
         return self._price_level_list_map[(price_wallet_id, quantity_wallet_id)]
 
+    def get_tick_count(self, price_wallet_id, quantity_wallet_id):
+        """
+        Return the number of ticks on this side for a specific asset pair
+        :rtype: int
+        """
+        return self._tick_counts.get((price_wallet_id, quantity_wallet_id), 0)
+
+    def get_tick_counts(self):
+        """
+        Return the number of ticks on this side for every asset pair
+        :rtype: {(str, str): int}
+        """
+        return self._tick_counts
+
     def get_price_level_list_wallets(self):
         """
         Returns the combinations (price wallet id, quantity wallet id) available in the side.
@@ -0,0 +1,93 @@
+import logging
+from asyncio import CancelledError, Future, Queue, ensure_future
+
+
+class SubmissionPipeline(object):
+    """
+    Processes submitted items in batches, in the order in which they have been submitted.
+
+    Items are put in a bounded queue, so submitters wait when the pipeline falls behind. A single worker takes all
+    queued items, up to the batch size, and processes them at once. Since there is only one worker, the items are
+    processed strictly in submission order, while many submissions can be in flight.
+    """
+
+    def __init__(self, process_batch, max_queue_size=100, max_batch_size=50, discard_item=None):
+        """
+        :param process_batch: Function that processes a list of items and returns a result or an exception per item
+        :param max_queue_size: The maximum number of items that wait to be processed
+        :param max_batch_size: The maximum number of items that are processed at once
+        :param discard_item: Function that is called with every item that is not processed, because its submitter
+                             has been cancelled
+        :type max_queue_size: int
+        :type max_batch_size: int
+        """
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.process_batch = process_batch
+        self.discard_item = discard_item
+        self.max_batch_size = max_batch_size
+        self.queue = Queue(max_queue_size)
+        self.worker = None
+        self.num_processed = 0
+        self.num_batches = 0
+
+    async def submit(self, item):
+        """
+        Submit an item and wait until it has been processed.
+        :param item: The item to process
+        :return: The result of processing the item
+        :raises: The exception that prevented the item from being processed
+        """
+        if not self.worker:
+            self.worker = ensure_future(self.run())
+
+        future = Future()
+        await self.queue.put((item, future))
+        return await future
+
+    async def run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while not self.queue.empty() and len(batch) < self.max_batch_size:
+                batch.append(self.queue.get_nowait())
+
+            # Items of submitters that have been cancelled while waiting are not processed at all
+            for item, future in batch:
+                if future.cancelled() and self.discard_item:
+                    self.discard_item(item)
+            batch = [(item, future) for item, future in batch if not future.cancelled()]
+            if not batch:
+                continue
+
+            try:
+                results = self.process_batch([item for item, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError("Expected %d results, got %d" % (len(batch), len(results)))
+            except Exception as e:
+                self._logger.exception("Failed to process a batch of %d items", len(batch))
+                results = [e] * len(batch)
+
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+            self.num_processed += len(batch)
+            self.num_batches += 1
+
+    async def shutdown(self):
+        if self.worker:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except CancelledError:
+                pass
+            self.worker = None
+
+        while not self.queue.empty():
+            item, future = self.queue.get_nowait()
+            future.cancel()
+            if self.discard_item:
+                self.discard_item(item)
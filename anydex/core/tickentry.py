@@ -76,9 +76,14 @@ class TickEntry(TaskManager):
         def unblock_order_id(unblock_id):
             self._logger.debug("Unblocking order id %s", unblock_id)
             self._blocked_for_matching.remove(unblock_id)
+            if unblock_id.trader_id != self.order_id.trader_id:
+                self._price_level.unblock_tick(unblock_id)
 
         self._logger.debug("Blocking %s for tick %s", order_id, self.order_id)
         self._blocked_for_matching.add(order_id)
+        if order_id.trader_id != self.order_id.trader_id:
+            # Ticks of the same trader are already excluded from matching by the price level trader counts
+            self._price_level.block_tick(order_id)
         self.register_task("unblock_%s" % order_id, unblock_order_id, order_id, delay=10)
 
     def is_blocked_for_matching(self, order_id):
@@ -87,6 +92,12 @@ class TickEntry(TaskManager):
         """
         return order_id in self._blocked_for_matching
 
+    def blocked_order_ids(self):
+        """
+        Return the order ids of other traders this tick is currently blocked for
+        """
+        return [order_id for order_id in self._blocked_for_matching if order_id.trader_id != self.order_id.trader_id]
+
     def is_valid(self):
         """
         Return if the tick is still valid
@@ -0,0 +1,145 @@
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+
+def get_trace_id(order_id, other_order_id):
+    """
+    Return the identifier of the trace of a trade between two orders. Both parties of the trade use the same trace id,
+    so the traces of multiple nodes can be combined.
+    :type order_id: OrderId
+    :type other_order_id: OrderId
+    :rtype: str
+    """
+    return "|".join(sorted((str(order_id), str(other_order_id))))
+
+
+class Span(object):
+    """
+    A timed step in the lifecycle of a trade.
+    """
+
+    __slots__ = ('trace_id', 'name', 'start', 'duration', 'attributes')
+
+    def __init__(self, trace_id, name, start, attributes):
+        self.trace_id = trace_id
+        self.name = name
+        self.start = start
+        self.duration = None
+        self.attributes = attributes
+
+    def to_dictionary(self):
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "attributes": self.attributes
+        }
+
+
+class Tracer(object):
+    """
+    Records the duration of the steps of a trade as spans in a ring buffer.
+
+    A span is either timed with the span context manager, or it is started and finished in different places with begin
+    and end, such as when a message is sent and the response is received. Spans that are never finished are dropped
+    when too many spans are open.
+    """
+
+    def __init__(self, max_spans=10000, clock=time.time):
+        """
+        :param max_spans: The maximum number of finished spans that are kept, and of open spans
+        :param clock: Function that returns the current time in seconds
+        :type max_spans: int
+        """
+        self.max_spans = max_spans
+        self.clock = clock
+        self.spans = deque(maxlen=max_spans)
+        self.open_spans = OrderedDict()  # Map: (trace id, span name) -> Span
+
+    def begin(self, trace_id, name, **attributes):
+        """
+        Start a span, which is finished by calling end with the same trace id and name. If such a span has already
+        been started, the earliest start is kept.
+        """
+        key = (trace_id, name)
+        if not self.max_spans or key in self.open_spans:
+            return
+        self.open_spans[key] = Span(trace_id, name, self.clock(), attributes)
+        if len(self.open_spans) > self.max_spans:
+            self.open_spans.popitem(last=False)
+
+    def end(self, trace_id, name, **attributes):
+        """
+        Finish a span that has been started with begin.
+        :return: The finished span, or None if there is no open span with this trace id and name
+        """
+        span = self.open_spans.pop((trace_id, name), None)
+        if span:
+            self.finish(span, attributes)
+        return span
+
+    def finish(self, span, attributes=None):
+        span.duration = self.clock() - span.start
+        if attributes:
+            span.attributes.update(attributes)
+        self.spans.append(span)
+
+    @contextmanager
+    def span(self, trace_id, name, **attributes):
+        """
+        Time the enclosed code as a span. The span is also recorded when the code raises an exception.
+        """
+        if not self.max_spans:
+            yield None
+            return
+
+        span = Span(trace_id, name, self.clock(), attributes)
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes["error"] = str(e) or type(e).__name__
+            raise
+        finally:
+            self.finish(span)
+
+    def get_spans(self, trace_id=None):
+        """
+        Return the finished spans, optionally only those of a single trace.
+        :rtype: [Span]
+        """
+        return [span for span in self.spans if trace_id is None or span.trace_id == trace_id]
+
+    def to_dictionary(self, trace_id=None):
+        return {
+            "spans": [span.to_dictionary() for span in self.get_spans(trace_id)],
+            "open_spans": len(self.open_spans)
+        }
+
+    def to_chrome_trace(self, trace_id=None):
+        """
+        Export the finished spans in the Chrome trace event format, which can be loaded in chrome://tracing or
+        Perfetto. Every trade is shown as a separate thread.
+        """
+        pid = os.getpid()
+        thread_ids = {}
+        events = []
+        for span in self.get_spans(trace_id):
+            tid = thread_ids.get(span.trace_id)
+            if tid is None:
+                tid = thread_ids[span.trace_id] = len(thread_ids) + 1
+                events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                               "args": {"name": span.trace_id}})
+            events.append({
+                "name": span.name,
+                "cat": "trade",
+                "ph": "X",
+                "ts": int(span.start * 1000000),
+                "dur": int(span.duration * 1000000),
+                "pid": pid,
+                "tid": tid,
+                "args": span.attributes
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
@@ -0,0 +1,136 @@
+import logging
+from binascii import hexlify, unhexlify
+from collections import OrderedDict
+
+
+class ChainTradeStatus(object):
+    """
+    The status of the transactions in the chain of a single trader.
+    """
+
+    def __init__(self):
+        self.sequence_number = 0  # The sequence number of the last block that has been processed
+        self.tx_status = {}  # Map: transaction id -> whether the trader is not expected to make the next payment
+        self.open_transactions = set()  # The transactions in which the trader is expected to make the next payment
+        self.tx_init_sequence_numbers = OrderedDict()  # Map: transaction id -> sequence number of the tx_init block
+
+    def set_status(self, txid, status):
+        self.tx_status[txid] = status
+        if status:
+            self.open_transactions.discard(txid)
+        else:
+            self.open_transactions.add(txid)
+
+    def remove_transaction(self, txid):
+        self.open_transactions.discard(txid)
+        self.tx_status.pop(txid, None)
+        self.tx_init_sequence_numbers.pop(txid, None)
+
+    def expire_transactions(self, min_sequence_number):
+        """
+        Forget the transactions of which the tx_init block has a lower sequence number than the given one.
+        """
+        while self.tx_init_sequence_numbers:
+            txid, sequence_number = next(iter(self.tx_init_sequence_numbers.items()))
+            if sequence_number >= min_sequence_number:
+                break
+            self.remove_transaction(txid)
+
+
+class TradeStatusIndex(object):
+    """
+    Index with the status of the transactions of other traders, derived from the tx_init, tx_payment and tx_done
+    blocks in their chains.
+
+    The index of a trader is created when it is first requested and is then updated incrementally, with the blocks
+    that we receive and with the blocks that have been stored since the last update. Blocks are only processed in
+    order, so a block that is missing is processed once it has been stored. Transactions that have been started more
+    than history_size blocks ago are not taken into account, so a transaction that has been abandoned without a
+    tx_done block does not block the trader forever.
+    """
+
+    def __init__(self, persistence, batch_size=1000, history_size=1000):
+        """
+        :param persistence: The TrustChain database
+        :param batch_size: The number of blocks that are read from the database at once
+        :param history_size: The number of most recent blocks of a trader in which transactions are taken into account
+        :type batch_size: int
+        :type history_size: int
+        """
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.persistence = persistence
+        self.batch_size = batch_size
+        self.history_size = history_size
+        self.chains = {}  # Map: public key -> ChainTradeStatus
+
+    def add_block(self, block):
+        """
+        Process a block we received. The block is only processed if it directly follows the blocks that have been
+        processed before, other blocks are read from the database during the next update.
+        """
+        chain = self.chains.get(block.public_key)
+        if chain and block.sequence_number == chain.sequence_number + 1:
+            self.process_block(chain, block)
+
+    def process_block(self, chain, block):
+        if block.type == b'tx_init':
+            if block.link_sequence_number != 0:
+                # Get the original block
+                tx_init_block = self.persistence.get_linked(block)
+            else:
+                tx_init_block = block
+
+            if tx_init_block:
+                # We allow trading with this partner if it counter-signed the tx_init block, which means that
+                # it should not go first during asset exchange.
+                chain.set_status(tx_init_block.hash, block.link_sequence_number != 0)
+                chain.tx_init_sequence_numbers[tx_init_block.hash] = block.sequence_number
+        elif block.type == b'tx_payment':
+            txid = unhexlify(block.transaction["payment"]["transaction_id"])
+            if txid in chain.tx_status:
+                chain.set_status(txid, block.link_sequence_number == 0)
+            else:
+                self._logger.warning("Found payment block without having tx_init block for transaction %s!",
+                                     hexlify(txid))
+        elif block.type == b'tx_done':
+            txid = unhexlify(block.transaction["tx"]["transaction_id"])
+            if txid in chain.tx_status:
+                # The transaction is finished, no later blocks will change its status
+                chain.remove_transaction(txid)
+            else:
+                self._logger.warning("Found tx_done block without having tx_init block for transaction %s!",
+                                     hexlify(txid))
+
+        chain.sequence_number = block.sequence_number
+        chain.expire_transactions(block.sequence_number - self.history_size + 1)
+
+    def update(self, public_key):
+        """
+        Process the blocks of a trader that have been stored in the database since the last update.
+        :param public_key: The public key of the trader
+        :type public_key: bytes
+        """
+        chain = self.chains.setdefault(public_key, ChainTradeStatus())
+        while True:
+            start_seq_num = chain.sequence_number + 1
+            blocks = [block for block in self.persistence.crawl(public_key, start_seq_num,
+                                                                start_seq_num + self.batch_size - 1,
+                                                                limit=self.batch_size)
+                      if block.public_key == public_key]
+            if not blocks:
+                return chain
+
+            for block in sorted(blocks, key=lambda block: block.sequence_number):
+                if block.sequence_number != chain.sequence_number + 1:
+                    # A block is missing, it is processed during a later update once it has been stored
+                    return chain
+                self.process_block(chain, block)
+
+    def can_trade(self, public_key):
+        """
+        Return whether a trader is not expected to make a payment in any of its transactions.
+        :param public_key: The public key of the trader
+        :type public_key: bytes
+        :rtype: bool
+        """
+        return not self.update(public_key).open_transactions
@@ -19,6 +19,27 @@ class TransactionManager(object):
         self._logger.info("Transaction manager initialized")
 
         self.transaction_repository = transaction_repository
+        # The transactions that might still be open, so they can be counted without going over all transactions
+        self.open_transaction_ids = {transaction.transaction_id for transaction in transaction_repository.find_all()
+                                     if not transaction.is_payment_complete()}
+
+    def add(self, transaction):
+        """
+        Add a new transaction to the repository.
+        :type transaction: Transaction
+        """
+        self.transaction_repository.add(transaction)
+        if not transaction.is_payment_complete():
+            self.open_transaction_ids.add(transaction.transaction_id)
+
+    def update(self, transaction):
+        """
+        Update a transaction of which the payments might have changed.
+        :type transaction: Transaction
+        """
+        self.transaction_repository.update(transaction)
+        if transaction.is_payment_complete():
+            self.open_transaction_ids.discard(transaction.transaction_id)
 
     def find_by_id(self, transaction_id):
         """
@@ -34,3 +55,10 @@ class TransactionManager(object):
         :rtype: [Transaction]
         """
         return self.transaction_repository.find_all()
+
+    def get_num_open_transactions(self):
+        """
+        Return the number of transactions of which the payments are not complete yet.
+        :rtype: int
+        """
+        return len(self.open_transaction_ids)
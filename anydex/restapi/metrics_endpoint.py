@@ -0,0 +1,159 @@
+from aiohttp import web
+
+from anydex.restapi.base_market_endpoint import BaseMarketEndpoint
+from anydex.wallet.provider import provider_statistics
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+SUMMARY_QUANTILES = (0.5, 0.9, 0.99)
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = ('%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+               for key, value in sorted(labels.items()))
+    return '{%s}' % ','.join(escaped)
+
+
+class MetricsWriter(object):
+    """
+    Writes metrics in the Prometheus text exposition format.
+    """
+
+    def __init__(self, prefix='anydex_'):
+        self.prefix = prefix
+        self.lines = []
+
+    def add(self, name, metric_type, help_text, samples):
+        """
+        Add a counter or gauge.
+        :param samples: A list of (labels, value) tuples, or a single value
+        """
+        name = self.prefix + name
+        self.lines.append('# HELP %s %s' % (name, help_text))
+        self.lines.append('# TYPE %s %s' % (name, metric_type))
+        if not isinstance(samples, list):
+            samples = [({}, samples)]
+        for labels, value in samples:
+            self.lines.append('%s%s %s' % (name, format_labels(labels), value))
+
+    def add_gauge(self, name, help_text, samples):
+        self.add(name, 'gauge', help_text, samples)
+
+    def add_counter(self, name, help_text, samples):
+        self.add(name, 'counter', help_text, samples)
+
+    def add_summary(self, name, help_text, samples):
+        """
+        Add a summary of durations, based on histograms that record microseconds.
+        :param samples: A list of (labels, Histogram) tuples, or a single histogram
+        """
+        name = self.prefix + name
+        self.lines.append('# HELP %s %s' % (name, help_text))
+        self.lines.append('# TYPE %s summary' % name)
+        if not isinstance(samples, list):
+            samples = [({}, samples)]
+        for labels, histogram in samples:
+            for quantile in SUMMARY_QUANTILES:
+                quantile_labels = dict(labels, quantile=quantile)
+                self.lines.append('%s%s %s' % (name, format_labels(quantile_labels),
+                                               histogram.percentile(quantile * 100) / 1000000.0))
+            self.lines.append('%s_sum%s %s' % (name, format_labels(labels), histogram.total / 1000000.0))
+            self.lines.append('%s_count%s %s' % (name, format_labels(labels), histogram.count))
+
+    def to_text(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+class MetricsEndpoint(BaseMarketEndpoint):
+    """
+    This class exposes the metrics of the dex in the Prometheus text exposition format.
+    """
+
+    def setup_routes(self):
+        self.app.add_routes([web.get('', self.get_metrics)])
+
+    def write_metrics(self, writer):
+        """
+        Write the metrics of the market community. All values are maintained while the dex runs, so collecting them
+        does not go over the order book, the orders or the transactions.
+        """
+        community = self.get_market_community()
+
+        if community.is_matchmaker:
+            book_sizes = []
+            for side_name, side in (("ask", community.order_book.asks), ("bid", community.order_book.bids)):
+                for (price_type, quantity_type), count in sorted(side.get_tick_counts().items()):
+                    book_sizes.append(({"price_type": price_type, "quantity_type": quantity_type,
+                                        "side": side_name}, count))
+            writer.add_gauge('order_book_ticks', 'Number of ticks in the order book', book_sizes)
+
+        writer.add_gauge('open_orders', 'Number of open orders of this trader',
+                         community.order_manager.get_num_open_orders())
+        writer.add_gauge('open_transactions', 'Number of transactions with outstanding payments',
+                         community.transaction_manager.get_num_open_transactions())
+
+        writer.add_gauge('request_cache_size', 'Number of outstanding requests',
+                         [({"prefix": prefix}, size)
+                          for prefix, size in sorted(community.get_request_cache_sizes().items())])
+
+        match_caches = community.get_match_caches()
+        writer.add_gauge('match_caches', 'Number of orders that are processing incoming matches', len(match_caches))
+        writer.add_gauge('match_queue_length', 'Number of matches that wait to be proposed',
+                         sum(len(cache.queue.queue) for cache in match_caches))
+
+        writer.add_counter('packets_sent_total', 'Number of packets sent', community.packet_sender.num_packets)
+        writer.add_counter('bytes_sent_total', 'Number of bytes sent', community.packet_sender.num_bytes)
+
+        writer.add_summary('db_statement_duration_seconds', 'Execution time of database statements',
+                           community.market_database.statement_latency)
+
+        provider_samples = sorted(provider_statistics.items())
+        writer.add_counter('wallet_provider_calls_total', 'Number of wallet provider calls',
+                           [({"provider": provider, "method": method}, statistics.count)
+                            for (provider, method), statistics in provider_samples])
+        writer.add_counter('wallet_provider_errors_total', 'Number of failed wallet provider calls',
+                           [({"provider": provider, "method": method}, statistics.errors)
+                            for (provider, method), statistics in provider_samples])
+        writer.add_counter('wallet_provider_call_duration_seconds_total', 'Time spent in wallet provider calls',
+                           [({"provider": provider, "method": method}, statistics.total_duration)
+                            for (provider, method), statistics in provider_samples])
+        writer.add_gauge('wallet_provider_call_duration_seconds_max', 'Latency of the slowest wallet provider call',
+                         [({"provider": provider, "method": method}, statistics.max_duration)
+                          for (provider, method), statistics in provider_samples])
+
+        if community.loop_monitor:
+            writer.add_summary('loop_lag_seconds', 'Lag of the event loop', community.loop_monitor.lag)
+            writer.add_counter('slow_callbacks_total', 'Number of callbacks that blocked the event loop',
+                               community.loop_monitor.num_slow_callbacks)
+
+    async def get_metrics(self, request):
+        """
+        .. http:get:: /metrics
+
+        A GET request to this endpoint returns the metrics of the dex in the Prometheus text exposition format,
+        including the order book size per asset pair and side, the open orders and transactions, the sizes of the
+        request caches and match queues, the latency of database statements and wallet provider calls and the lag
+        of the event loop.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/metrics
+
+            **Example response**:
+
+            .. sourcecode:: none
+
+                # HELP anydex_order_book_ticks Number of ticks in the order book
+                # TYPE anydex_order_book_ticks gauge
+                anydex_order_book_ticks{price_type="BTC",quantity_type="MB",side="ask"} 3
+                # HELP anydex_open_orders Number of open orders of this trader
+                # TYPE anydex_open_orders gauge
+                anydex_open_orders 1
+                ...
+        """
+        writer = MetricsWriter()
+        self.write_metrics(writer)
+        return web.Response(body=writer.to_text().encode('utf-8'), headers={'Content-Type': CONTENT_TYPE})
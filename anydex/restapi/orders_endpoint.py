@@ -4,6 +4,7 @@ from ipv8.REST.base_endpoint import HTTP_BAD_REQUEST, HTTP_NOT_FOUND, Response
 
 from anydex.core.message import TraderId
 from anydex.core.order import OrderId, OrderNumber
+from anydex.restapi.asks_bids_endpoint import BaseAsksBidsEndpoint
 from anydex.restapi.base_market_endpoint import BaseMarketEndpoint
 
 
@@ -14,6 +15,8 @@ class OrdersEndpoint(BaseMarketEndpoint):
 
     def setup_routes(self):
         self.app.add_routes([web.get('', self.get_orders),
+                             web.put('/batch', self.create_orders),
+                             web.post('/cancel-batch', self.cancel_orders),
                              web.post('/{order_number}/cancel', self.cancel_order)])
 
     async def get_orders(self, request):
@@ -93,3 +96,143 @@ class OrdersEndpoint(BaseMarketEndpoint):
 
         await market_community.cancel_order(order_id)
         return Response({"cancelled": True})
+
+    async def create_orders(self, request):
+        """
+        .. http:put:: /market/orders/batch
+
+        A request to this endpoint will create multiple ask and bid orders at once. The response contains the created
+        order, or an error, for every requested order.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X PUT http://localhost:8085/market/orders/batch --data
+                '{"orders": [{"type": "ask", "first_asset_amount": 10, "second_asset_amount": 10,
+                              "first_asset_type": "BTC", "second_asset_type": "MB", "timeout": 3600}]}'
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "orders": [{
+                        "assets": {
+                            "first": {
+                                "amount": 10,
+                                "type": "BTC"
+                            },
+                            "second": {
+                                "amount": 10,
+                                "type": "MB"
+                            }
+                        },
+                        "timestamp": 1547587907.887339,
+                        "trader_id": "9695c9e15201d08586e4230f4a8524799ebcb2d7",
+                        "order_number": 12,
+                        "timeout": 3600,
+                        "is_ask": true
+                    }]
+                }
+        """
+        try:
+            parameters = await request.json()
+            requested_orders = parameters['orders']
+        except (ValueError, KeyError, TypeError):
+            return Response({"error": "orders parameter missing"}, status=HTTP_BAD_REQUEST)
+        if not isinstance(requested_orders, list):
+            return Response({"error": "orders parameter should be a list"}, status=HTTP_BAD_REQUEST)
+
+        results = [None] * len(requested_orders)
+        offers = []
+        offer_indices = []
+        for index, order_parameters in enumerate(requested_orders):
+            try:
+                if order_parameters.get('type') not in ('ask', 'bid'):
+                    raise ValueError("order type should be ask or bid")
+                assets, timeout = BaseAsksBidsEndpoint.create_ask_bid_from_params(order_parameters)
+            except KeyError as e:
+                results[index] = {"error": "parameter %s missing" % e}
+                continue
+            except (AttributeError, ValueError, TypeError) as e:
+                results[index] = {"error": str(e)}
+                continue
+            offers.append((order_parameters['type'] == 'ask', assets, timeout))
+            offer_indices.append(index)
+
+        created = await self.get_market_community().create_orders(offers)
+        for index, result in zip(offer_indices, created):
+            if isinstance(result, Exception):
+                results[index] = {"error": str(result)}
+            else:
+                results[index] = {
+                    'assets': result.assets.to_dictionary(),
+                    'timestamp': int(result.timestamp),
+                    'trader_id': result.order_id.trader_id.as_hex(),
+                    'order_number': int(result.order_id.order_number),
+                    'timeout': int(result.timeout),
+                    'is_ask': result.is_ask()
+                }
+        return Response({"orders": results})
+
+    async def cancel_orders(self, request):
+        """
+        .. http:post:: /market/orders/cancel-batch
+
+        A POST request to this endpoint will cancel multiple orders at once. The response indicates for every order
+        whether it has been cancelled.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X POST http://localhost:8085/market/orders/cancel-batch --data '{"order_numbers": [3, 4]}'
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "orders": [{
+                        "order_number": 3,
+                        "cancelled": true
+                    }, {
+                        "order_number": 4,
+                        "error": "order not found"
+                    }]
+                }
+        """
+        try:
+            parameters = await request.json()
+            order_numbers = parameters['order_numbers']
+        except (ValueError, KeyError, TypeError):
+            return Response({"error": "order_numbers parameter missing"}, status=HTTP_BAD_REQUEST)
+        try:
+            if not isinstance(order_numbers, list):
+                raise TypeError
+            order_numbers = [int(order_number) for order_number in order_numbers]
+        except (ValueError, TypeError):
+            return Response({"error": "order_numbers parameter should be a list of integers"},
+                            status=HTTP_BAD_REQUEST)
+
+        market_community = self.get_market_community()
+        results = []
+        order_ids = []
+        for order_number in order_numbers:
+            order_id = OrderId(TraderId(market_community.mid), OrderNumber(order_number))
+            if market_community.order_manager.order_repository.find_by_id(order_id):
+                order_ids.append(order_id)
+                results.append({"order_number": order_number})
+            else:
+                results.append({"order_number": order_number, "error": "order not found"})
+
+        cancelled = iter(await market_community.cancel_orders(order_ids))
+        for result in results:
+            if "error" in result:
+                continue
+            if next(cancelled):
+                result["cancelled"] = True
+            else:
+                result["error"] = "only open and unverified orders can be cancelled"
+        return Response({"orders": results})
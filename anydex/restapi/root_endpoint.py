@@ -7,8 +7,10 @@ from ipv8.REST.root_endpoint import RootEndpoint as IPv8RootEndpoint
 
 from anydex.restapi.asks_bids_endpoint import AsksEndpoint, BidsEndpoint
 from anydex.restapi.matchmakers_endpoint import MatchmakersEndpoint
+from anydex.restapi.metrics_endpoint import MetricsEndpoint
 from anydex.restapi.orders_endpoint import OrdersEndpoint
 from anydex.restapi.state_endpoint import StateEndpoint
+from anydex.restapi.statistics_endpoint import StatisticsEndpoint
 from anydex.restapi.transactions_endpoint import TransactionsEndpoint
 from anydex.restapi.wallets_endpoint import WalletsEndpoint
 
@@ -50,7 +52,9 @@ class RootEndpoint(BaseEndpoint):
                      '/transactions': TransactionsEndpoint,
                      '/orders': OrdersEndpoint,
                      '/matchmakers': MatchmakersEndpoint,
+                     '/metrics': MetricsEndpoint,
                      '/state': StateEndpoint,
+                     '/statistics': StatisticsEndpoint,
                      '/wallets': WalletsEndpoint}
         for path, ep_cls in endpoints.items():
             self.add_endpoint(path, ep_cls())
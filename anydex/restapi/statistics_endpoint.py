@@ -0,0 +1,371 @@
+from math import isfinite
+
+from aiohttp import web
+
+from ipv8.REST.base_endpoint import HTTP_BAD_REQUEST, HTTP_NOT_FOUND, Response
+
+from anydex.core.sampling_profiler import OUTPUT_FORMATS
+from anydex.restapi.base_market_endpoint import BaseMarketEndpoint
+
+
+class StatisticsEndpoint(BaseMarketEndpoint):
+    """
+    This class handles requests regarding the performance statistics of the dex.
+    """
+
+    def setup_routes(self):
+        self.app.add_routes([web.get('/matching', self.get_matching_statistics),
+                             web.get('/addresses', self.get_address_statistics),
+                             web.get('/network', self.get_network_statistics),
+                             web.get('/messages', self.get_message_statistics),
+                             web.get('/loop', self.get_loop_statistics),
+                             web.get('/traces', self.get_traces),
+                             web.get('/profile', self.get_profile),
+                             web.put('/profile', self.start_profile),
+                             web.delete('/profile', self.stop_profile)])
+
+    async def get_matching_statistics(self, request):
+        """
+        .. http:get:: /statistics/matching
+
+        A GET request to this endpoint will return the matching statistics of every asset pair, including latency
+        histograms of the matching engine, the number of ticks visited per match and the size of the order book.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/statistics/matching
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "matching": [{
+                        "price_type": "BTC",
+                        "quantity_type": "MB",
+                        "asks": 3,
+                        "bids": 1,
+                        "engine_matches": 4,
+                        "matched_ticks": 2,
+                        "engine_latency": {"count": 4, "mean": 31.5, "min": 12, "max": 64, "p50": 24, ...},
+                        "match_latency": {...},
+                        "ticks_visited": {...}
+                    }]
+                }
+        """
+        return Response({"matching": self.get_market_community().get_matching_statistics()})
+
+    async def get_address_statistics(self, request):
+        """
+        .. http:get:: /statistics/addresses
+
+        A GET request to this endpoint will return the statistics of the trader address cache, including the hit rate
+        and the latency of DHT lookups.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/statistics/addresses
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "addresses": {
+                        "size": 12,
+                        "hits": 140,
+                        "coalesced": 6,
+                        "lookups": 3,
+                        "hit_rate": 0.98,
+                        "lookup_latency": {"count": 3, "mean": 81231.3, ...},
+                        ...
+                    }
+                }
+        """
+        return Response({"addresses": self.get_market_community().address_resolver.to_dictionary()})
+
+    async def get_network_statistics(self, request):
+        """
+        .. http:get:: /statistics/network
+
+        A GET request to this endpoint will return the number of packets and bytes sent by the market community and
+        the statistics of the caches with serialized blocks and tick blocks.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/statistics/network
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "network": {
+                        "sent": {
+                            "packets": 320,
+                            "bytes": 182412,
+                            "bursts": 40,
+                            "packets_per_second": 3.2,
+                            "bytes_per_second": 1824.1
+                        },
+                        "block_packet_cache": {
+                            "size": 40,
+                            "hits": 12,
+                            "misses": 40
+                        },
+                        "tick_block_cache": {
+                            "size": 25,
+                            "hits": 130,
+                            "misses": 2
+                        }
+                    }
+                }
+        """
+        community = self.get_market_community()
+        return Response({"network": {
+            "sent": community.packet_sender.to_dictionary(),
+            "block_packet_cache": community.block_packet_cache.to_dictionary(),
+            "tick_block_cache": {
+                "size": len(community.tick_blocks),
+                "hits": community.num_tick_block_hits,
+                "misses": community.num_tick_block_misses
+            }
+        }})
+
+    async def get_message_statistics(self, request):
+        """
+        .. http:get:: /statistics/messages
+
+        A GET request to this endpoint will return the number of incoming messages and blocks per type, their size,
+        the number of handlers that failed and the latency histograms of the handlers. The message statistics are
+        enabled with the --message-statistics flag.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/statistics/messages
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "messages": {
+                        "elapsed": 120.5,
+                        "messages": {
+                            "match": {
+                                "count": 40,
+                                "bytes": 12040,
+                                "errors": 0,
+                                "messages_per_second": 0.33,
+                                "bytes_per_second": 99.9,
+                                "latency": {"count": 40, "mean": 312.1, "min": 121, "max": 1602, "p50": 264, ...}
+                            },
+                            ...
+                        },
+                        "blocks": {
+                            "ask": {...},
+                            "tx_init": {...}
+                        }
+                    }
+                }
+        """
+        message_statistics = self.get_market_community().message_statistics
+        if not message_statistics:
+            return Response({"error": "message statistics not enabled"}, status=HTTP_NOT_FOUND)
+        return Response({"messages": message_statistics.to_dictionary()})
+
+    async def get_loop_statistics(self, request):
+        """
+        .. http:get:: /statistics/loop
+
+        A GET request to this endpoint will return the lag of the event loop and the most recent callbacks that blocked
+        the event loop for longer than the slow callback threshold, including the stack of the event loop at that
+        moment. The loop monitor is enabled with the --loop-monitor flag.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/statistics/loop
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "loop": {
+                        "interval": 0.05,
+                        "slow_callback_threshold": 0.1,
+                        "lag": {"count": 1200, "mean": 412.3, "min": 35, "max": 251202, "p50": 210, ...},
+                        "num_slow_callbacks": 1,
+                        "slow_callbacks": [{
+                            "timestamp": 1581002233.1,
+                            "duration": 0.25,
+                            "task": "MarketCommunity.create_ask",
+                            "stack": ["  File \"main.py\", line 231, in <module>", ...]
+                        }]
+                    }
+                }
+        """
+        loop_monitor = self.get_market_community().loop_monitor
+        if not loop_monitor:
+            return Response({"error": "loop monitor not enabled"}, status=HTTP_NOT_FOUND)
+        return Response({"loop": loop_monitor.to_dictionary()})
+
+    async def get_traces(self, request):
+        """
+        .. http:get:: /statistics/traces
+
+        A GET request to this endpoint will return the most recent spans of the trade lifecycle traces. Every trade has
+        a trace id that is derived from the ids of both orders, so the traces of both parties can be combined. Spans
+        cover the steps of a trade, such as the match window, the clearing policies, the proposal, the tx_init block,
+        the wallet info exchange, the payments and the tx_done block.
+
+        The optional trace_id parameter returns the spans of a single trade. With format=chrome, the spans are
+        returned in the Chrome trace event format, which can be loaded in chrome://tracing or Perfetto.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/statistics/traces?format=chrome
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "traces": {
+                        "spans": [{
+                            "trace_id": "30c2...d0.1|98ab...1f.4",
+                            "name": "proposal",
+                            "start": 1581002233.1,
+                            "duration": 0.082,
+                            "attributes": {"proposal_id": 12, "result": "accepted"}
+                        }, ...],
+                        "open_spans": 2
+                    }
+                }
+        """
+        tracer = self.get_market_community().tracer
+        trace_id = request.query.get('trace_id')
+        if request.query.get('format') == 'chrome':
+            return Response(tracer.to_chrome_trace(trace_id))
+        return Response({"traces": tracer.to_dictionary(trace_id)})
+
+    async def get_profile(self, request):
+        """
+        .. http:get:: /statistics/profile
+
+        A GET request to this endpoint will return the status of the sampling profiler, including whether it is
+        running, the number of samples taken and the file that the profile is written to.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X GET http://localhost:8085/statistics/profile
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "profile": {
+                        "running": true,
+                        "interval": 0.005,
+                        "samples": 1204,
+                        "path": "/home/user/.anydex/profile-20200206-152713.txt",
+                        "start_time": 1581002833.1,
+                        "end_time": null
+                    }
+                }
+        """
+        return Response({"profile": self.get_market_community().profiler.to_dictionary()})
+
+    async def start_profile(self, request):
+        """
+        .. http:put:: /statistics/profile
+
+        A PUT request to this endpoint will start sampling the stack of the event loop for the given number of seconds
+        (30 by default). Afterwards, the profile is written to the state directory, either as collapsed stacks, which
+        can be turned into a flame graph, or with format=speedscope in the speedscope format.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X PUT http://localhost:8085/statistics/profile?duration=60&format=speedscope
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "profile": {
+                        "running": true,
+                        "samples": 0,
+                        "path": "/home/user/.anydex/profile-20200206-152713.speedscope.json",
+                        ...
+                    }
+                }
+        """
+        community = self.get_market_community()
+        if community.profiler.running:
+            return Response({"error": "profiler already running"}, status=HTTP_BAD_REQUEST)
+
+        output_format = request.query.get('format', 'collapsed')
+        if output_format not in OUTPUT_FORMATS:
+            return Response({"error": "unknown profile format"}, status=HTTP_BAD_REQUEST)
+        try:
+            duration = float(request.query.get('duration', 30))
+        except ValueError:
+            return Response({"error": "invalid duration"}, status=HTTP_BAD_REQUEST)
+        if not isfinite(duration) or duration <= 0:
+            return Response({"error": "duration should be a positive number of seconds"}, status=HTTP_BAD_REQUEST)
+
+        community.start_profiler(duration, output_format).add_done_callback(self.on_profile_written)
+        return Response({"profile": community.profiler.to_dictionary()})
+
+    def on_profile_written(self, future):
+        if future.cancelled():
+            return
+        if future.exception():
+            self._logger.error("Failed to write profile: %s", future.exception())
+        else:
+            self._logger.info("Profile written to %s", future.result())
+
+    async def stop_profile(self, request):
+        """
+        .. http:delete:: /statistics/profile
+
+        A DELETE request to this endpoint will stop the sampling profiler before its duration has passed. The profile
+        of the samples taken so far is written to the state directory.
+
+            **Example request**:
+
+            .. sourcecode:: none
+
+                curl -X DELETE http://localhost:8085/statistics/profile
+
+            **Example response**:
+
+            .. sourcecode:: javascript
+
+                {
+                    "stopped": true
+                }
+        """
+        profiler = self.get_market_community().profiler
+        if not profiler.running:
+            return Response({"error": "profiler not running"}, status=HTTP_NOT_FOUND)
+        profiler.stop()
+        return Response({"stopped": True})
@@ -0,0 +1,108 @@
+from asyncio import gather, sleep
+
+from anydex.core.address_resolver import AddressResolver
+from anydex.core.message import TraderId
+from anydex.test.base import AbstractServer
+from anydex.test.util import timeout
+
+
+class TestAddressResolver(AbstractServer):
+    """
+    Tests for the trader address resolver.
+    """
+
+    async def setUp(self):
+        super(TestAddressResolver, self).setUp()
+        self.time = 1000
+        self.lookups = []
+        self.lookup_result = ("1.2.3.4", 1234)
+        self.resolver = AddressResolver(self.lookup, ttl=100, negative_ttl=10, max_size=2, clock=lambda: self.time)
+        self.trader_id = TraderId(b'0' * 20)
+
+    async def lookup(self, trader_id):
+        self.lookups.append(trader_id)
+        await sleep(0.01)
+        if isinstance(self.lookup_result, Exception):
+            raise self.lookup_result
+        return self.lookup_result
+
+    @timeout(10)
+    async def test_resolve_cached(self):
+        """
+        Test whether a resolved address is cached until it expires
+        """
+        self.assertEqual(("1.2.3.4", 1234), await self.resolver.resolve(self.trader_id))
+        self.assertEqual(("1.2.3.4", 1234), await self.resolver.resolve(self.trader_id))
+        self.assertEqual(1, len(self.lookups))
+        self.assertEqual(1, self.resolver.num_hits)
+
+        self.time += 100
+        self.assertIsNone(self.resolver.get(self.trader_id))
+        await self.resolver.resolve(self.trader_id)
+        self.assertEqual(2, len(self.lookups))
+
+    @timeout(10)
+    async def test_resolve_coalesced(self):
+        """
+        Test whether concurrent lookups of the same trader share a single lookup
+        """
+        addresses = await gather(*[self.resolver.resolve(self.trader_id) for _ in range(5)])
+        self.assertEqual([("1.2.3.4", 1234)] * 5, addresses)
+        self.assertEqual(1, len(self.lookups))
+        self.assertEqual(4, self.resolver.num_coalesced)
+        self.assertFalse(self.resolver.pending_lookups)
+
+    @timeout(10)
+    async def test_resolve_negative_cache(self):
+        """
+        Test whether failed lookups are cached for a short time
+        """
+        self.lookup_result = None
+        self.assertIsNone(await self.resolver.resolve(self.trader_id))
+        self.assertIsNone(await self.resolver.resolve(self.trader_id))
+        self.assertEqual(1, len(self.lookups))
+        self.assertEqual(1, self.resolver.num_negative_hits)
+
+        self.time += 10
+        self.lookup_result = ("1.2.3.4", 1234)
+        self.assertEqual(("1.2.3.4", 1234), await self.resolver.resolve(self.trader_id))
+
+    @timeout(10)
+    async def test_resolve_error(self):
+        """
+        Test whether an error during a lookup is raised to all waiting callers and not cached
+        """
+        self.lookup_result = RuntimeError("DHT not available")
+        results = await gather(self.resolver.resolve(self.trader_id), self.resolver.resolve(self.trader_id),
+                               return_exceptions=True)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertFalse(self.resolver.has_failed_recently(self.trader_id))
+
+    def test_update_lru(self):
+        """
+        Test whether the least recently used address is evicted when the cache is full
+        """
+        trader_id2 = TraderId(b'1' * 20)
+        trader_id3 = TraderId(b'2' * 20)
+        self.resolver.update(self.trader_id, ("1.1.1.1", 1))
+        self.resolver.update(trader_id2, ("2.2.2.2", 2))
+        self.resolver.get(self.trader_id)
+        self.resolver.update(trader_id3, ("3.3.3.3", 3))
+
+        self.assertEqual(("1.1.1.1", 1), self.resolver.get(self.trader_id))
+        self.assertIsNone(self.resolver.get(trader_id2))
+        self.assertEqual(("3.3.3.3", 3), self.resolver.pop(trader_id3))
+        self.assertIsNone(self.resolver.get(trader_id3))
+
+    @timeout(10)
+    async def test_to_dictionary(self):
+        """
+        Test the statistics of the resolver
+        """
+        await self.resolver.resolve(self.trader_id)
+        await self.resolver.resolve(self.trader_id)
+        statistics = self.resolver.to_dictionary()
+        self.assertEqual(1, statistics["size"])
+        self.assertEqual(1, statistics["lookups"])
+        self.assertEqual(0.5, statistics["hit_rate"])
+        self.assertEqual(1, statistics["lookup_latency"]["count"])
@@ -1,6 +1,6 @@
 from anydex.core.assetamount import AssetAmount
 from anydex.core.assetpair import AssetPair
-from anydex.core.block import MarketBlock
+from anydex.core.block import MarketBlock, compile_schema
 from anydex.core.message import TraderId
 from anydex.core.order import OrderId, OrderNumber
 from anydex.core.tick import Ask
@@ -207,3 +207,33 @@ class TestMarketBlock(BaseTestCase):
                                                           'second': {'amount': "3", 'type': 'DUM2'}}))
         self.assertFalse(MarketBlock.is_valid_asset_pair({'first': {'amount': -4, 'type': 'DUM1'},
                                                           'second': {'amount': 3, 'type': 'DUM2'}}))
+
+    def test_compile_schema(self):
+        """
+        Test whether a compiled schema checks the fields, their types and the field validators
+        """
+        validate = compile_schema({'a': int, 'b': lambda value: value > 0}, exact=True)
+        self.assertTrue(validate({'a': 1, 'b': 2}))
+        self.assertFalse(validate({'a': 1}))
+        self.assertFalse(validate({'a': '1', 'b': 2}))
+        self.assertFalse(validate({'a': 1, 'b': 0}))
+        self.assertFalse(validate({'a': 1, 'b': 2, 'c': 3}))
+        self.assertFalse(validate([]))
+
+    def test_validation_memo(self):
+        """
+        Test whether the validation result of a signed block is remembered by block hash
+        """
+        self.addCleanup(MarketBlock.validation_results.clear)
+        self.tick_block.signature = b'a' * 64
+        self.tick_block.hash = b'b' * 32
+        self.assertTrue(self.tick_block.is_valid_tick_block())
+
+        # A copy of the same block is not validated again
+        self.tick_block.transaction = {}
+        self.assertTrue(self.tick_block.is_valid_tick_block())
+        self.assertFalse(self.tick_block.is_valid_cancel_block())
+
+        # Unsigned blocks are always validated
+        self.cancel_block.transaction = {}
+        self.assertFalse(self.cancel_block.is_valid_cancel_block())
@@ -0,0 +1,87 @@
+from asyncio import gather
+from concurrent.futures import ThreadPoolExecutor
+
+from ipv8.keyvault.crypto import default_eccrypto
+
+from anydex.core.block import MarketBlock, VerifiedSignatureCrypto
+from anydex.core.block_verifier import BlockVerifier
+from anydex.test.base import AbstractServer
+from anydex.test.util import timeout
+
+
+class TestBlockVerifier(AbstractServer):
+    """
+    Tests for the verification of block signatures outside of the event loop.
+    """
+
+    async def setUp(self):
+        super(TestBlockVerifier, self).setUp()
+        self.key = default_eccrypto.generate_key(u"curve25519")
+        self.verifier = BlockVerifier(ThreadPoolExecutor(2), batch_size=2)
+
+    async def tearDown(self):
+        await self.verifier.shutdown()
+        await super(TestBlockVerifier, self).tearDown()
+
+    def create_block(self, sequence_number, valid=True):
+        block = MarketBlock()
+        block.type = b'ask'
+        block.public_key = self.key.pub().key_to_bin()
+        block.sequence_number = sequence_number
+        block.sign(self.key)
+        if not valid:
+            block.signature = b'0' * len(block.signature)
+        return block
+
+    @timeout(10)
+    async def test_verify(self):
+        """
+        Test whether valid and invalid signatures are detected and valid blocks are marked as verified
+        """
+        valid_block = self.create_block(1)
+        invalid_block = self.create_block(2, valid=False)
+        self.assertEqual([True, False], await self.verifier.verify([valid_block, invalid_block]))
+        self.assertIsInstance(valid_block.crypto, VerifiedSignatureCrypto)
+        self.assertNotIsInstance(invalid_block.crypto, VerifiedSignatureCrypto)
+        self.assertEqual(1, self.verifier.num_verified)
+        self.assertEqual(1, self.verifier.num_invalid)
+
+    @timeout(10)
+    async def test_verify_in_order(self):
+        """
+        Test whether the results of blocks that are verified in multiple batches are delivered in order
+        """
+        delivered = []
+
+        async def verify(index, blocks):
+            results = await self.verifier.verify(blocks)
+            delivered.append(index)
+            return results
+
+        requests = [[self.create_block(index * 3 + offset, valid=offset != 1) for offset in range(3)]
+                    for index in range(4)]
+        results = await gather(*[verify(index, blocks) for index, blocks in enumerate(requests)])
+        self.assertEqual([0, 1, 2, 3], delivered)
+        self.assertEqual([[True, False, True]] * 4, results)
+
+    @timeout(10)
+    async def test_verify_on_event_loop(self):
+        """
+        Test verifying signatures without an executor
+        """
+        self.verifier = BlockVerifier()
+        self.assertEqual([True], await self.verifier.verify([self.create_block(1)]))
+
+    def test_verified_signature_crypto(self):
+        """
+        Test whether a verified signature is only accepted for the public key and data that it has been verified for
+        """
+        block = self.create_block(1)
+        block.mark_signature_verified()
+        key = block.crypto.key_from_public_bin(block.public_key)
+        data = block.pack(signature=False)
+        self.assertTrue(block.crypto.is_valid_signature(key, data, block.signature))
+        self.assertFalse(block.crypto.is_valid_signature(key, b'', block.signature))
+        other_key = default_eccrypto.generate_key(u"curve25519").pub()
+        self.assertFalse(block.crypto.is_valid_signature(other_key, data, block.signature))
+        self.assertFalse(block.crypto.is_valid_signature(key, data, b'0' * len(block.signature)))
@@ -0,0 +1,104 @@
+import unittest
+
+from ipv8.attestation.trustchain.payload import HalfBlockBroadcastPayload
+from ipv8.messaging.serialization import default_serializer
+
+from anydex.core.assetamount import AssetAmount
+from anydex.core.assetpair import AssetPair
+from anydex.core.block import MarketBlock
+from anydex.core.broadcast import BlockPacketCache, PacketSender
+from anydex.core.message import TraderId
+from anydex.core.order import OrderId, OrderNumber
+from anydex.core.tick import Ask
+from anydex.core.timeout import Timeout
+from anydex.core.timestamp import Timestamp
+from anydex.test.util import MockObject
+
+
+class BlockPacketCacheTestSuite(unittest.TestCase):
+    """BlockPacketCache test cases."""
+
+    def setUp(self):
+        self.cache = BlockPacketCache(default_serializer, max_size=2)
+
+    def create_block(self, order_number):
+        ask = Ask(OrderId(TraderId(b'0' * 20), OrderNumber(order_number)),
+                  AssetPair(AssetAmount(30, 'BTC'), AssetAmount(30, 'MB')), Timeout(30), Timestamp(0))
+        block = MarketBlock()
+        block.type = b'ask'
+        block.transaction = {'tick': ask.to_block_dict()}
+        block.sequence_number = order_number
+        block.hash = block.calculate_hash()
+        return block
+
+    def test_serialize_once(self):
+        """
+        Test whether a block is serialized once and the serialized payload is correct
+        """
+        block = self.create_block(1)
+        serialized_payload = self.cache.get_block_broadcast_payload(block, 1)
+        self.assertIs(serialized_payload, self.cache.get_block_broadcast_payload(block, 1))
+        self.assertEqual(1, self.cache.num_misses)
+        self.assertEqual(1, self.cache.num_hits)
+
+        payload = default_serializer.ez_unpack_serializables([HalfBlockBroadcastPayload], serialized_payload)[0]
+        self.assertEqual(block.hash, MarketBlock.from_payload(payload, default_serializer).hash)
+
+    def test_ttl(self):
+        """
+        Test whether broadcasts with a different ttl are cached separately
+        """
+        block = self.create_block(1)
+        self.assertNotEqual(self.cache.get_block_broadcast_payload(block, 1),
+                            self.cache.get_block_broadcast_payload(block, 2))
+        self.assertEqual(2, self.cache.num_misses)
+
+    def test_evict(self):
+        """
+        Test whether the least recently used payload is evicted when the cache is full
+        """
+        blocks = [self.create_block(order_number) for order_number in range(1, 4)]
+        self.cache.get_block_payload(blocks[0])
+        self.cache.get_block_payload(blocks[1])
+        self.cache.get_block_payload(blocks[0])
+        self.cache.get_block_payload(blocks[2])
+        self.assertEqual(2, len(self.cache.payloads))
+        self.assertIn((b'block', blocks[0].hash), self.cache.payloads)
+        self.assertNotIn((b'block', blocks[1].hash), self.cache.payloads)
+
+
+class PacketSenderTestSuite(unittest.TestCase):
+    """PacketSender test cases."""
+
+    def setUp(self):
+        self.time = 1000
+        self.sent_packets = []
+        endpoint = MockObject()
+        endpoint.send = lambda address, packet: self.sent_packets.append((address, packet))
+        self.sender = PacketSender(endpoint, window=10, clock=lambda: self.time)
+
+    def test_send_burst(self):
+        """
+        Test sending a packet to multiple addresses
+        """
+        addresses = [("1.2.3.4", port) for port in range(5)]
+        self.sender.send_burst(addresses, b'a' * 100)
+        self.sender.send_burst([], b'a' * 100)
+        self.assertEqual(addresses, [address for address, _ in self.sent_packets])
+        self.assertEqual(5, self.sender.num_packets)
+        self.assertEqual(500, self.sender.num_bytes)
+        self.assertEqual(1, self.sender.num_bursts)
+
+    def test_rates(self):
+        """
+        Test whether the send rates only take the recent packets into account
+        """
+        self.sender.send(("1.2.3.4", 1), b'a' * 100)
+        self.time += 5
+        self.sender.send(("1.2.3.4", 1), b'a' * 100)
+        self.assertEqual((0.2, 20), self.sender.get_rates())
+        self.time += 6
+        self.assertEqual((0.1, 10), self.sender.get_rates())
+        self.time += 10
+        self.assertEqual((0, 0), self.sender.get_rates())
+        self.assertEqual(2, self.sender.to_dictionary()["packets"])
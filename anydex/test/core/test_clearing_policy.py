@@ -0,0 +1,107 @@
+from asyncio import gather, sleep
+
+from ipv8.keyvault.crypto import default_eccrypto
+
+from anydex.core.clearing_policy import SingleTradeClearingPolicy
+from anydex.core.message import TraderId
+from anydex.core.settings import MarketSettings
+from anydex.test.base import AbstractServer
+from anydex.test.util import MockObject, timeout
+
+
+class TestSingleTradeClearingPolicy(AbstractServer):
+    """
+    Tests for the single trade clearing policy.
+    """
+
+    async def setUp(self):
+        super(TestSingleTradeClearingPolicy, self).setUp()
+        self.crawls = []
+        self.can_trade = True
+        self.public_key = default_eccrypto.generate_key(u"curve25519").pub().key_to_bin()
+
+        async def get_address_for_trader(_):
+            return "1.2.3.4", 1234
+
+        async def send_trader_pk_request(_):
+            return self.public_key
+
+        async def crawl_chain(peer):
+            self.crawls.append(peer)
+            await sleep(0.01)
+
+        community = MockObject()
+        community.settings = MarketSettings()
+        community.get_address_for_trader = get_address_for_trader
+        community.send_trader_pk_request = send_trader_pk_request
+        community.trustchain = MockObject()
+        community.trustchain.crawl_chain = crawl_chain
+        community.trade_status_index = MockObject()
+        community.trade_status_index.can_trade = lambda _: self.can_trade
+
+        self.policy = SingleTradeClearingPolicy(community)
+        self.trader_id = TraderId(b'0' * 20)
+
+    @timeout(10)
+    async def test_concurrent_proposals(self):
+        """
+        Test whether concurrent checks for the same trader share a single crawl and only allow a single trade
+        """
+        results = await gather(*[self.policy.should_trade(self.trader_id, trade_id) for trade_id in "abc"])
+        self.assertEqual([False, False, True], sorted(results))
+        self.assertEqual(1, len(self.crawls))
+        self.assertFalse(self.policy.pending_crawls)
+
+    @timeout(10)
+    async def test_release_refused_proposals(self):
+        """
+        Test whether releasing the trades that have been refused does not release the trade that has been allowed
+        """
+        results = await gather(*[self.policy.should_trade(self.trader_id, trade_id) for trade_id in "abc"])
+        allowed_trade_id = "abc"[results.index(True)]
+        for trade_id in "abc":
+            if trade_id != allowed_trade_id:
+                self.policy.release(self.trader_id, trade_id)
+
+        self.assertFalse(await self.policy.should_trade(self.trader_id, "d"))
+        self.policy.release(self.trader_id, allowed_trade_id)
+        self.assertTrue(await self.policy.should_trade(self.trader_id, "d"))
+
+    @timeout(10)
+    async def test_recently_crawled(self):
+        """
+        Test whether a recently crawled chain is not crawled again, while the trade status is still checked
+        """
+        self.assertTrue(await self.policy.should_trade(self.trader_id, "a"))
+        self.policy.release(self.trader_id, "a")
+        self.can_trade = False
+        self.assertFalse(await self.policy.should_trade(self.trader_id, "b"))
+        self.assertEqual(1, len(self.crawls))
+
+    @timeout(10)
+    async def test_reservation(self):
+        """
+        Test whether other trades with a trader are refused until the allowed trade has been released
+        """
+        self.assertTrue(await self.policy.should_trade(self.trader_id, "a"))
+        self.assertFalse(await self.policy.should_trade(self.trader_id, "b"))
+        self.assertTrue(await self.policy.should_trade(TraderId(b'1' * 20), "c"))
+
+        self.policy.release(self.trader_id, "a")
+        self.assertTrue(await self.policy.should_trade(self.trader_id, "b"))
+        self.assertEqual({self.trader_id: "b", TraderId(b'1' * 20): "c"}, self.policy.reservations)
+
+    @timeout(10)
+    async def test_failed_crawl(self):
+        """
+        Test whether all waiting checks fail when the shared crawl fails
+        """
+        async def crawl_chain(_):
+            await sleep(0.01)
+            raise RuntimeError("Crawl failed")
+
+        self.policy.community.trustchain.crawl_chain = crawl_chain
+        results = await gather(*[self.policy.should_trade(self.trader_id, trade_id) for trade_id in "ab"],
+                               return_exceptions=True)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertNotIn(self.trader_id, self.policy.recently_crawled)
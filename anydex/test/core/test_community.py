@@ -1,4 +1,4 @@
-from asyncio import Future, sleep
+from asyncio import Future, ensure_future, gather, sleep
 
 from ipv8.dht import DHTError
 from ipv8.test.base import TestBase
@@ -8,12 +8,15 @@ from anydex.core.assetamount import AssetAmount
 from anydex.core.assetpair import AssetPair
 from anydex.core.block import MarketBlock
 from anydex.core.clearing_policy import SingleTradeClearingPolicy
-from anydex.core.community import MarketCommunity
+from anydex.core.community import MarketCommunity, PingRequestCache
 from anydex.core.message import TraderId
 from anydex.core.order import Order, OrderId, OrderNumber
+from anydex.core.payload import MatchPayload, TradePayload, market_serializer
 from anydex.core.tick import Ask, Bid
 from anydex.core.timeout import Timeout
 from anydex.core.timestamp import Timestamp
+from anydex.core.tracing import get_trace_id
+from anydex.core.trade import ProposedTrade
 from anydex.core.transaction import Transaction, TransactionId
 from anydex.test.util import MockObject, timeout
 from anydex.wallet.dummy.dummy_wallet import DummyWallet1, DummyWallet2
@@ -59,6 +62,42 @@ class TestMarketCommunity(TestMarketCommunityBase):
         self.nodes[0].overlay.disable_matchmaker()
         self.nodes[1].overlay.disable_matchmaker()
 
+    @timeout(2)
+    async def test_verify_trustchain_blocks(self):
+        """
+        Test whether the signatures of market blocks received by TrustChain are verified by the block verifier
+        """
+        await self.introduce_nodes()
+
+        await self.nodes[0].overlay.create_ask(AssetPair(AssetAmount(1, 'DUM1'), AssetAmount(2, 'DUM2')), 3600)
+        persistence = self.nodes[0].overlay.trustchain.persistence
+        public_key = self.nodes[0].overlay.trustchain.my_peer.public_key.key_to_bin()
+        block = persistence.get(public_key, 1)
+        self.assertEqual(b'ask', block.type)
+        await sleep(0.1)
+
+        # A copy of the block with an invalid signature is ignored
+        verifier = self.nodes[1].overlay.block_verifier
+        num_verified = verifier.num_verified
+        tampered_block = persistence.get(public_key, 1)
+        tampered_block.signature = b'\x00' * len(tampered_block.signature)
+        self.nodes[0].overlay.trustchain.send_block(tampered_block, address=self.nodes[1].endpoint.wan_address)
+        await sleep(0.1)
+        self.assertEqual(1, verifier.num_invalid)
+        self.assertEqual(num_verified, verifier.num_verified)
+
+        self.nodes[0].overlay.trustchain.send_block(block, address=self.nodes[1].endpoint.wan_address)
+        await sleep(0.1)
+        self.assertEqual(num_verified + 1, verifier.num_verified)
+        self.assertTrue(self.nodes[1].overlay.trustchain.persistence.contains(block))
+
+        # Other blocks are processed without the block verifier
+        other_block, _ = await self.nodes[0].overlay.trustchain.create_source_block(b'test', {b'id': 1})
+        self.nodes[0].overlay.trustchain.send_block(other_block, address=self.nodes[1].endpoint.wan_address)
+        await sleep(0.1)
+        self.assertEqual(num_verified + 1, verifier.num_verified)
+        self.assertTrue(self.nodes[1].overlay.trustchain.persistence.contains(other_block))
+
     @timeout(2)
     async def test_create_ask(self):
         """
@@ -253,6 +292,85 @@ class TestMarketCommunity(TestMarketCommunityBase):
         self.assertEqual(balance1['available'], 1050)
         self.assertEqual(balance2['available'], -50)
 
+    @timeout(3)
+    async def test_e2e_trade_tracing(self):
+        """
+        Test whether the steps of a trade are recorded as spans with the same trace id on both sides
+        """
+        await self.introduce_nodes()
+
+        ask_order = await self.nodes[0].overlay.create_ask(AssetPair(AssetAmount(50, 'DUM1'), AssetAmount(50, 'MB')),
+                                                           3600)
+        bid_order = await self.nodes[1].overlay.create_bid(AssetPair(AssetAmount(50, 'DUM1'), AssetAmount(50, 'MB')),
+                                                           3600)
+
+        await sleep(0.5)  # Give it some time to complete the trade
+
+        trace_id = get_trace_id(ask_order.order_id, bid_order.order_id)
+        span_names = {span.name for node in self.nodes[:2] for span in node.overlay.tracer.get_spans(trace_id)}
+        for name in ("match_window", "clearing_policy", "proposal", "tx_init", "wallet_info", "send_payment",
+                     "tx_payment", "monitor_transaction", "tx_done"):
+            self.assertIn(name, span_names)
+
+    @timeout(3)
+    async def test_e2e_trade_message_statistics(self):
+        """
+        Test whether the incoming messages and blocks of a trade are counted and timed per type
+        """
+        for node in self.nodes:
+            node.overlay.start_message_statistics()
+        await self.introduce_nodes()
+
+        await self.nodes[0].overlay.create_ask(AssetPair(AssetAmount(50, 'DUM1'), AssetAmount(50, 'MB')), 3600)
+        await self.nodes[1].overlay.create_bid(AssetPair(AssetAmount(50, 'DUM1'), AssetAmount(50, 'MB')), 3600)
+
+        await sleep(0.5)  # Give it some time to complete the trade
+
+        statistics = self.nodes[1].overlay.message_statistics.to_dictionary()
+        self.assertGreaterEqual(statistics["messages"]["match"]["count"], 1)
+        self.assertGreater(statistics["messages"]["match"]["bytes"], 0)
+        self.assertEqual(statistics["messages"]["match"]["latency"]["count"],
+                         statistics["messages"]["match"]["count"])
+        self.assertEqual(statistics["messages"]["proposed_trade"]["count"], 0)
+        self.assertGreaterEqual(self.nodes[0].overlay.message_statistics.messages["proposed_trade"].count, 1)
+        self.assertIn("bid", statistics["blocks"])
+        self.assertIn("tx_done", statistics["blocks"])
+
+    @timeout(3)
+    async def test_e2e_trade_batch_matching(self):
+        """
+        Test a full trade when the matchmaker matches ticks in batches
+        """
+        self.nodes[2].overlay.settings.match_batch_interval = 0.1
+        await self.introduce_nodes()
+
+        await self.nodes[0].overlay.create_ask(AssetPair(AssetAmount(50, 'DUM1'), AssetAmount(50, 'MB')), 3600)
+        await self.nodes[1].overlay.create_bid(AssetPair(AssetAmount(50, 'DUM1'), AssetAmount(50, 'MB')), 3600)
+
+        await sleep(0.7)  # Give it some time to complete the trade
+
+        # Verify that the trade has been made
+        self.assertTrue(list(self.nodes[0].overlay.transaction_manager.find_all()))
+        self.assertTrue(list(self.nodes[1].overlay.transaction_manager.find_all()))
+
+    @timeout(10)
+    async def test_e2e_trade_sharded_matching(self):
+        """
+        Test a full trade when the matchmaker matches ticks in a worker process
+        """
+        self.nodes[2].overlay.settings.matching_shards = 1
+        self.nodes[2].overlay.enable_matchmaker()
+        await self.introduce_nodes()
+
+        await self.nodes[0].overlay.create_ask(AssetPair(AssetAmount(50, 'DUM1'), AssetAmount(50, 'MB')), 3600)
+        await self.nodes[1].overlay.create_bid(AssetPair(AssetAmount(50, 'DUM1'), AssetAmount(50, 'MB')), 3600)
+
+        await sleep(1)  # Give it some time to complete the trade
+
+        # Verify that the trade has been made
+        self.assertTrue(list(self.nodes[0].overlay.transaction_manager.find_all()))
+        self.assertTrue(list(self.nodes[1].overlay.transaction_manager.find_all()))
+
     @timeout(2)
     async def test_e2e_trade_dht(self):
         """
@@ -267,8 +385,8 @@ class TestMarketCommunity(TestMarketCommunityBase):
         await self.deliver_messages()
 
         # Remove the address from the mid registry from the trading peers
-        self.nodes[0].overlay.mid_register.pop(TraderId(self.nodes[1].overlay.mid))
-        self.nodes[1].overlay.mid_register.pop(TraderId(self.nodes[0].overlay.mid))
+        self.nodes[0].overlay.address_resolver.pop(TraderId(self.nodes[1].overlay.mid))
+        self.nodes[1].overlay.address_resolver.pop(TraderId(self.nodes[0].overlay.mid))
 
         for node in self.nodes:
             await node.dht.store_peer()
@@ -298,6 +416,35 @@ class TestMarketCommunity(TestMarketCommunityBase):
 
         self.assertTrue(self.nodes[0].overlay.order_manager.order_repository.find_by_id(ask_order.order_id).cancelled)
 
+    @timeout(2)
+    async def test_create_cancel_orders(self):
+        """
+        Test creating and cancelling multiple orders at once
+        """
+        await self.introduce_nodes()
+
+        assets = AssetPair(AssetAmount(1, 'DUM1'), AssetAmount(2, 'DUM2'))
+        results = await self.nodes[0].overlay.create_orders([(True, assets, 3600), (False, assets, 3600),
+                                                             (True, assets, -1)])
+        self.assertTrue(results[0].is_ask())
+        self.assertFalse(results[1].is_ask())
+        self.assertIsInstance(results[2], RuntimeError)
+        self.assertEqual(results[0].broadcast_peers, results[1].broadcast_peers)
+
+        await sleep(0.5)
+
+        self.assertEqual(len(self.nodes[2].overlay.order_book.asks), 1)
+        self.assertEqual(len(self.nodes[2].overlay.order_book.bids), 1)
+
+        order_ids = [results[0].order_id, results[1].order_id]
+        self.assertEqual([True, True, False],
+                         await self.nodes[0].overlay.cancel_orders(order_ids + [results[0].order_id]))
+
+        await sleep(0.5)
+
+        self.assertFalse(self.nodes[2].overlay.order_book.asks)
+        self.assertFalse(self.nodes[2].overlay.order_book.bids)
+
     @timeout(3)
     async def test_proposed_trade_timeout(self):
         """
@@ -334,7 +481,7 @@ class TestMarketCommunity(TestMarketCommunityBase):
             raise DHTError()
 
         # Clean the mid register of node 1 and make sure DHT peer connection fails
-        self.nodes[1].overlay.mid_register = {}
+        self.nodes[1].overlay.address_resolver.clear()
         self.nodes[1].overlay.dht = MockObject()
         self.nodes[1].overlay.dht.connect_peer = mock_connect_peer
 
@@ -380,6 +527,32 @@ class TestMarketCommunity(TestMarketCommunityBase):
         self.assertTrue(self.nodes[4].overlay.order_book.get_tick(ask_order.order_id))
         self.assertTrue(self.nodes[4].overlay.order_book.get_tick(bid_order.order_id))
 
+    @timeout(4)
+    async def test_orderbook_sync_from_memory(self):
+        """
+        Test whether order book sync responses are served without querying the database for the tick blocks
+        """
+        await self.introduce_nodes()
+
+        ask_order = await self.nodes[0].overlay.create_ask(
+            AssetPair(AssetAmount(1, 'DUM1'), AssetAmount(2, 'DUM2')), 3600)
+        await self.deliver_messages(timeout=.5)
+
+        def get_block_with_hash(_):
+            raise RuntimeError("Tick block should be served from memory")
+
+        for node in self.nodes:
+            node.overlay.trustchain.persistence.get_block_with_hash = get_block_with_hash
+
+        self.add_node_to_experiment(self.create_node())
+        self.nodes[3].overlay.send_orderbook_sync(self.nodes[2].overlay.my_peer)
+        await self.deliver_messages(timeout=.5)
+        await sleep(0.2)  # For processing the tick blocks
+
+        self.assertTrue(self.nodes[3].overlay.order_book.get_tick(ask_order.order_id))
+        self.assertEqual(1, self.nodes[2].overlay.num_tick_block_hits)
+        self.assertEqual(0, self.nodes[2].overlay.num_tick_block_misses)
+
     @timeout(4)
     async def test_partial_trade(self):
         """
@@ -473,6 +646,10 @@ class TestMarketCommunityTwoNodes(TestMarketCommunityBase):
             self.assertEqual(len(self.nodes[node_nr].overlay.order_book.asks), 0)
             self.assertEqual(len(self.nodes[node_nr].overlay.order_book.bids), 0)
 
+        # The blocks of the completed transactions should have been verified outside of the message handler
+        self.assertTrue(any(node.overlay.block_verifier.num_verified for node in self.nodes))
+        self.assertFalse(any(node.overlay.block_verifier.num_invalid for node in self.nodes))
+
     async def test_ping_pong(self):
         """
         Test the ping/pong mechanism of the market
@@ -512,6 +689,37 @@ class TestMarketCommunityFiveNodes(TestMarketCommunityBase):
         self.assertEqual(len(list(self.nodes[1].overlay.transaction_manager.find_all())), 1)
         self.assertEqual(len(list(self.nodes[2].overlay.transaction_manager.find_all())), 2)
 
+    @timeout(2)
+    async def test_batched_match_messages(self):
+        """
+        Test whether multiple matches for the same order are sent to the owner in a single message
+        """
+        await self.introduce_nodes()
+
+        processed_matches = []
+        process_match_payloads = self.nodes[2].overlay.process_match_payloads
+
+        def mocked_process_match_payloads(payloads):
+            processed_matches.append(payloads)
+            process_match_payloads(payloads)
+
+        self.nodes[2].overlay.process_match_payloads = mocked_process_match_payloads
+
+        await self.nodes[0].overlay.create_ask(AssetPair(AssetAmount(5, 'DUM1'), AssetAmount(5, 'DUM2')), 3600)
+        await self.nodes[1].overlay.create_ask(AssetPair(AssetAmount(5, 'DUM1'), AssetAmount(5, 'DUM2')), 3600)
+
+        await sleep(0.5)
+
+        await self.nodes[2].overlay.create_bid(AssetPair(AssetAmount(10, 'DUM1'), AssetAmount(10, 'DUM2')), 3600)
+
+        await sleep(0.5)
+
+        # Every matchmaker should have sent both matches in one message
+        self.assertTrue(processed_matches)
+        for payloads in processed_matches:
+            self.assertEqual(len(payloads), 2)
+        self.assertEqual(len(list(self.nodes[2].overlay.transaction_manager.find_all())), 2)
+
     async def match_window_impl(self, test_ask):
         await self.introduce_nodes()
 
@@ -749,3 +957,153 @@ class TestMarketCommunitySingle(TestMarketCommunityBase):
         with self.assertRaises(RuntimeError):
             await self.nodes[0].overlay.create_ask(AssetPair(AssetAmount(10, 'DUM1'),
                                                              AssetAmount(10, 'DUM2')), 3600 * 1000)
+
+    async def test_invalid_match_payloads(self):
+        """
+        Test whether invalid match payloads in a batch are dropped before they are added to the match cache
+        """
+        order = await self.nodes[0].overlay.create_ask(AssetPair(AssetAmount(10, 'DUM1'), AssetAmount(10, 'DUM2')),
+                                                       3600)
+        payloads = []
+        for order_number in (1, 2):
+            match = MatchPayload(TraderId(b'1' * 20), Timestamp.now(), OrderNumber(order_number),
+                                 AssetPair(AssetAmount(10, 'DUM1'), AssetAmount(10, 'DUM2')), Timeout(3600), 0,
+                                 order.order_id.order_number, TraderId(self.nodes[0].overlay.mid),
+                                 TraderId(b'2' * 20))
+            payloads.append(match.to_pack_list())
+        payloads[0][4], payloads[0][6] = payloads[0][6], payloads[0][4]  # The assets of the first match are invalid
+        payloads = [market_serializer.ez_unpack_serializables([MatchPayload], market_serializer.pack_multiple(
+            pack_list)[0])[0] for pack_list in payloads]
+
+        self.nodes[0].overlay.process_match_payloads(payloads)
+
+        cache = self.nodes[0].overlay.request_cache.get("match", int(order.order_id.order_number))
+        self.assertEqual([OrderId(TraderId(b'1' * 20), OrderNumber(2))], list(cache.matches.keys()))
+
+    async def test_concurrent_proposals_clearing_policy(self):
+        """
+        Test whether refusing concurrent proposals of a trader does not release the trade that has been allowed
+        """
+        overlay = self.nodes[0].overlay
+        policy = SingleTradeClearingPolicy(overlay)
+        overlay.clearing_policies.append(policy)
+
+        async def get_address_for_trader(_):
+            return "1.2.3.4", 1234
+
+        async def send_trader_pk_request(_):
+            return overlay.my_peer.public_key.key_to_bin()
+
+        async def crawl_chain(*_):
+            await sleep(0.01)
+
+        overlay.get_address_for_trader = get_address_for_trader
+        overlay.send_trader_pk_request = send_trader_pk_request
+        policy.crawl_chain = crawl_chain
+        overlay.trade_status_index.can_trade = lambda _: True
+
+        pair = AssetPair(AssetAmount(10, 'DUM1'), AssetAmount(10, 'DUM2'))
+        order = await overlay.create_ask(pair, 3600)
+        trader_id = TraderId(b'1' * 20)
+        proposals = [ProposedTrade(trader_id, OrderId(trader_id, OrderNumber(order_number)), order.order_id,
+                                   order_number, pair, Timestamp.now()) for order_number in range(1, 5)]
+
+        results = await gather(*[overlay.should_accept_propose_trade(None, proposal, order)
+                                 for proposal in proposals[:3]])
+        self.assertEqual(1, [should_trade for should_trade, _ in results].count(True))
+        allowed_proposal = proposals[[should_trade for should_trade, _ in results].index(True)]
+        self.assertEqual(get_trace_id(order.order_id, allowed_proposal.order_id), policy.reservations[trader_id])
+
+        should_trade, _ = await overlay.should_accept_propose_trade(None, proposals[3], order)
+        self.assertFalse(should_trade)
+
+    async def test_rejected_payloads_not_decoded(self):
+        """
+        Test whether received payloads that are rejected early are not decoded completely
+        """
+        def receive(payload):
+            data = market_serializer.pack_multiple(payload.to_pack_list())[0]
+            return market_serializer.ez_unpack_serializables([payload.__class__], data)[0]
+
+        def assert_not_decoded(payload):
+            self.assertNotIn('assets', payload.__dict__)
+            self.assertNotIn('timestamp', payload.__dict__)
+
+        overlay = self.nodes[0].overlay
+        pair = AssetPair(AssetAmount(10, 'DUM1'), AssetAmount(10, 'DUM2'))
+        order = await overlay.create_ask(pair, 3600)
+        trader_id = TraderId(b'1' * 20)
+        match = MatchPayload(trader_id, Timestamp.now(), OrderNumber(1), pair, Timeout(3600), 0,
+                             order.order_id.order_number, TraderId(overlay.mid), TraderId(b'2' * 20))
+
+        # A duplicate of a match that has been queued already
+        overlay.process_match_payloads([receive(match)])
+        duplicate = receive(match)
+        overlay.process_match_payloads([duplicate])
+        assert_not_decoded(duplicate)
+
+        # A counter trade for an unknown proposal
+        trade = TradePayload(trader_id, Timestamp.now(), OrderNumber(1), order.order_id, 1234, pair)
+        counter_trade = receive(trade)
+        MarketCommunity.received_counter_trade.__wrapped__(overlay, None, counter_trade)
+        assert_not_decoded(counter_trade)
+
+        # A proposed trade for an unknown order
+        unknown_order_id = OrderId(TraderId(overlay.mid), OrderNumber(1234))
+        proposed_trade = receive(TradePayload(trader_id, Timestamp.now(), OrderNumber(1), unknown_order_id, 1, pair))
+        self.assertFalse(overlay.check_trade_payload_validity(proposed_trade)[0])
+        assert_not_decoded(proposed_trade)
+
+        # A match for an order that is not open anymore
+        overlay.update_ip(TraderId(b'2' * 20), self.nodes[0].endpoint.wan_address)
+        await overlay.cancel_order(order.order_id)
+        closed_match = receive(match)
+        overlay.process_match_payloads([closed_match])
+        assert_not_decoded(closed_match)
+
+    async def test_cancelled_order_creation(self):
+        """
+        Test whether an order is cancelled when its creation is cancelled before its tick has been published
+        """
+        overlay = self.nodes[0].overlay
+        pair = AssetPair(AssetAmount(10, 'DUM1'), AssetAmount(10, 'DUM2'))
+        overlay.tick_pipeline.worker = True  # Prevent the tick pipeline from starting
+        creation = ensure_future(overlay.create_ask(pair, 3600))
+        await sleep(0.01)
+        creation.cancel()
+        await sleep(0.01)
+        overlay.tick_pipeline.worker = None
+
+        order = await overlay.create_ask(pair, 3600)
+        orders = overlay.order_manager.order_repository.find_all()
+        self.assertEqual(["cancelled", "open"], sorted(stored_order.status for stored_order in orders))
+        self.assertEqual(1, overlay.order_manager.get_num_open_orders())
+        self.assertEqual(1, len(overlay.order_book.asks))
+        self.assertTrue(overlay.order_book.tick_exists(order.order_id))
+
+    async def test_request_cache_sizes(self):
+        """
+        Test whether the outstanding requests are counted per prefix, until they have been removed from the cache
+        """
+        overlay = self.nodes[0].overlay
+        cache = overlay.request_cache.add(PingRequestCache(overlay, Future()))
+        self.assertEqual({"ping": 1}, overlay.get_request_cache_sizes())
+        overlay.request_cache.pop(cache.prefix, cache.number)
+        self.assertEqual({}, overlay.get_request_cache_sizes())
+
+    async def test_broadcast_same_block(self):
+        """
+        Test whether broadcasting a block again does not corrupt the broadcast history of TrustChain
+        """
+        overlay = self.nodes[0].overlay
+        overlay.trustchain.settings.broadcast_history_size = 2
+        block1 = self.get_tx_done_block(10, 10, 10, 10, 10)
+        block2 = self.get_tx_done_block(20, 20, 10, 10, 10)
+        block2.sequence_number += 1
+        for _ in range(3):
+            overlay.broadcast_blocks([block1, block1])
+            overlay.broadcast_block_pair(block1, block2)
+            overlay.broadcast_block(block2)
+
+        self.assertEqual({block1.block_id, block2.block_id}, overlay.trustchain.relayed_broadcasts)
+        self.assertEqual(2, len(overlay.trustchain.relayed_broadcasts_order))
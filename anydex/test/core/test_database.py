@@ -1,8 +1,10 @@
 import os
+import time
 
 from anydex.core.assetamount import AssetAmount
 from anydex.core.assetpair import AssetPair
-from anydex.core.database import LATEST_DB_VERSION, MarketDB
+from anydex.core.database import LATEST_DB_VERSION, MarketDB, TICK_JOURNAL_INSERT, TICK_JOURNAL_REMOVE, \
+    TICK_JOURNAL_TRADED
 from anydex.core.message import TraderId
 from anydex.core.order import Order, OrderId, OrderNumber
 from anydex.core.payment import Payment
@@ -48,6 +50,16 @@ class TestDatabase(AbstractServer):
         self.database.close()
         await super(TestDatabase, self).tearDown()
 
+    def test_statement_latency(self):
+        """
+        Test whether the execution time of the statements is recorded
+        """
+        num_statements = self.database.statement_latency.count
+        self.database.get_all_orders()
+        self.assertEqual(num_statements + 1, self.database.statement_latency.count)
+        self.database.add_tick_journal_entries([])
+        self.assertEqual(num_statements + 2, self.database.statement_latency.count)
+
     def test_add_get_order(self):
         """
         Test the insertion and retrieval of an order in the database
@@ -166,6 +178,42 @@ class TestDatabase(AbstractServer):
         self.database.delete_all_ticks()
         self.assertEqual(len(self.database.get_ticks()), 0)
 
+    def test_compact_tick_journal(self):
+        """
+        Test whether the events in the tick journal are applied to the ticks table
+        """
+        ask = Tick.from_order(self.order1)
+        bid = Tick.from_order(self.order2)
+        self.database.add_tick(bid)
+        self.database.add_tick_journal_entries([
+            (TICK_JOURNAL_INSERT,) + ask.to_database(),
+            (TICK_JOURNAL_TRADED,) + ask.to_database()[:2] + (None,) * 7 + (3, None),
+            (TICK_JOURNAL_REMOVE,) + bid.to_database()[:2] + (None,) * 9
+        ])
+        self.assertEqual(self.database.get_tick_journal_size(), 3)
+
+        self.assertEqual(self.database.compact_tick_journal(), 3)
+        self.assertEqual(self.database.get_tick_journal_size(), 0)
+        ticks = self.database.get_ticks()
+        self.assertEqual(len(ticks), 1)
+        self.assertEqual(ticks[0].order_id, self.order_id1)
+        self.assertEqual(ticks[0].traded, 3)
+
+    def test_compact_expired_ticks(self):
+        """
+        Test whether ticks that expired while the node was offline are removed when compacting the tick journal
+        """
+        self.database.add_tick(Tick.from_order(self.order1))
+        expired_order = Order(self.order_id2, AssetPair(AssetAmount(5, 'BTC'), AssetAmount(6, 'EUR')),
+                              Timeout(60), Timestamp(int(time.time() * 1000) - 120000), False)
+        self.database.add_tick(Tick.from_order(expired_order))
+        self.assertEqual(len(self.database.get_ticks()), 2)
+
+        self.assertEqual(self.database.compact_tick_journal(), 0)
+        ticks = self.database.get_ticks()
+        self.assertEqual(len(ticks), 1)
+        self.assertEqual(ticks[0].order_id, self.order_id1)
+
     def test_check_database(self):
         """
         Test the check of the database
@@ -183,4 +231,14 @@ class TestDatabase(AbstractServer):
         self.database.execute(u"DROP TABLE ticks;")
         self.database.execute(u"CREATE TABLE orders(x INTEGER PRIMARY KEY ASC);")
         self.database.execute(u"CREATE TABLE ticks(x INTEGER PRIMARY KEY ASC);")
-        self.assertEqual(self.database.check_database(b"1"), 5)
+        self.assertEqual(self.database.check_database(b"1"), 6)
+
+    def test_db_upgrade_tick_journal(self):
+        """
+        Test whether the tick journal is added when upgrading from version 5, without dropping the ticks
+        """
+        self.database.add_tick(Tick.from_order(self.order1))
+        self.database.execute(u"DROP TABLE ticks_journal;")
+        self.assertEqual(self.database.check_database(b"5"), 6)
+        self.assertEqual(self.database.get_tick_journal_size(), 0)
+        self.assertEqual(len(self.database.get_ticks()), 1)
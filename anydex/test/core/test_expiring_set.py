@@ -0,0 +1,82 @@
+import unittest
+
+from anydex.core.expiring_set import ExpiringSet
+
+
+class ExpiringSetTestSuite(unittest.TestCase):
+    """ExpiringSet test cases."""
+
+    def setUp(self):
+        self.time = 1000
+        self.expiring_set = ExpiringSet(100, num_generations=5, clock=lambda: self.time)
+
+    def test_invalid_generations(self):
+        """
+        Test whether a set with less than two generations cannot be created
+        """
+        with self.assertRaises(ValueError):
+            ExpiringSet(100, num_generations=1)
+
+    def test_add_contains(self):
+        """
+        Test adding items to the set
+        """
+        self.assertNotIn('a', self.expiring_set)
+        self.expiring_set.add('a')
+        self.expiring_set.add('b')
+        self.assertIn('a', self.expiring_set)
+        self.assertEqual(2, len(self.expiring_set))
+
+    def test_retention_window(self):
+        """
+        Test whether items are remembered during the retention period and forgotten one generation after it
+        """
+        self.time = 1024.9  # Add the item at the end of the first generation
+        self.expiring_set.add('a')
+        self.time = 1124.8
+        self.assertIn('a', self.expiring_set)
+        self.time = 1125
+        self.assertNotIn('a', self.expiring_set)
+
+        self.time = 1125  # Add the item at the start of a generation
+        self.expiring_set.add('b')
+        self.time = 1249.9
+        self.assertIn('b', self.expiring_set)
+        self.time = 1250
+        self.assertNotIn('b', self.expiring_set)
+        self.assertEqual(0, len(self.expiring_set))
+
+    def test_add_again(self):
+        """
+        Test whether adding an item again restarts its retention period
+        """
+        self.expiring_set.add('a')
+        self.time = 1090
+        self.expiring_set.add('a')
+        self.assertEqual(1, len(self.expiring_set))
+        self.time = 1189
+        self.assertIn('a', self.expiring_set)
+
+    def test_discard(self):
+        """
+        Test removing an item from the set
+        """
+        self.expiring_set.add('a')
+        self.time = 1050
+        self.expiring_set.discard('a')
+        self.expiring_set.discard('b')
+        self.assertNotIn('a', self.expiring_set)
+
+    def test_bounded_generations(self):
+        """
+        Test whether the number of generations stays bounded, also after a long period without activity
+        """
+        for i in range(100):
+            self.time += 10
+            self.expiring_set.add(i)
+        self.assertLessEqual(len(self.expiring_set.generations), 5)
+        self.assertLessEqual(len(self.expiring_set), 13)
+
+        self.time += 10000
+        self.assertEqual(0, len(self.expiring_set))
+        self.assertEqual(1, len(self.expiring_set.generations))
@@ -0,0 +1,64 @@
+import unittest
+
+from anydex.core.histogram import Histogram, get_bucket_index, get_bucket_value
+
+
+class HistogramTestSuite(unittest.TestCase):
+    """Histogram test cases."""
+
+    def setUp(self):
+        self.histogram = Histogram()
+
+    def test_bucket_index(self):
+        """
+        Test whether small values have their own bucket and the buckets of larger values have a bounded width
+        """
+        for value in range(32):
+            self.assertEqual(value, get_bucket_value(get_bucket_index(value)))
+
+        for value in [100, 1000, 12345, 10 ** 9]:
+            bucket_value = get_bucket_value(get_bucket_index(value))
+            self.assertLessEqual(bucket_value, value)
+            self.assertLessEqual(value - bucket_value, value / 16)
+
+    def test_empty(self):
+        """
+        Test the representation of an empty histogram
+        """
+        dictionary = self.histogram.to_dictionary()
+        self.assertEqual(0, dictionary["count"])
+        self.assertEqual(0, dictionary["p99"])
+        self.assertEqual(0, self.histogram.mean)
+
+    def test_percentile(self):
+        """
+        Test the percentiles of a histogram
+        """
+        for value in range(1, 1001):
+            self.histogram.record(value)
+
+        self.assertEqual(1000, self.histogram.count)
+        self.assertEqual(1, self.histogram.min)
+        self.assertEqual(1000, self.histogram.max)
+        self.assertAlmostEqual(500.5, self.histogram.mean)
+        self.assertAlmostEqual(500, self.histogram.percentile(50), delta=500 / 16)
+        self.assertAlmostEqual(990, self.histogram.percentile(99), delta=990 / 16)
+        self.assertEqual(1000, self.histogram.percentile(100))
+
+    def test_record_duration(self):
+        """
+        Test whether durations are recorded in microseconds
+        """
+        self.histogram.record_duration(0.000025)
+        self.histogram.record_duration(-1)
+        self.assertEqual(25, self.histogram.max)
+        self.assertEqual(0, self.histogram.min)
+
+    def test_reset(self):
+        """
+        Test resetting a histogram
+        """
+        self.histogram.record(3)
+        self.histogram.reset()
+        self.assertEqual(0, self.histogram.count)
+        self.assertFalse(self.histogram.buckets)
@@ -0,0 +1,59 @@
+import time
+from asyncio import current_task, ensure_future, sleep
+
+from anydex.core.loop_monitor import LoopMonitor, get_task_name
+from anydex.test.base import AbstractServer
+from anydex.test.util import timeout
+
+
+class TestLoopMonitor(AbstractServer):
+    """
+    Tests for the monitor of the event loop lag.
+    """
+
+    async def setUp(self):
+        super(TestLoopMonitor, self).setUp()
+        self.monitor = LoopMonitor(interval=0.01, slow_callback_threshold=0.05)
+        self.monitor.start()
+
+    async def tearDown(self):
+        self.monitor.stop()
+        await super(TestLoopMonitor, self).tearDown()
+
+    def block_loop(self):
+        time.sleep(0.3)
+
+    @timeout(10)
+    async def test_lag(self):
+        """
+        Test whether the lag of the event loop is measured
+        """
+        await sleep(0.1)
+        self.assertGreater(self.monitor.lag.count, 0)
+        self.assertFalse(self.monitor.slow_callbacks)
+
+    @timeout(10)
+    async def test_slow_callback(self):
+        """
+        Test whether a callback that blocks the event loop is reported once, with its stack and duration
+        """
+        await sleep(0.02)
+        self.block_loop()
+        await sleep(0.05)
+
+        self.assertEqual(1, self.monitor.num_slow_callbacks)
+        slow_callback = self.monitor.slow_callbacks[0]
+        self.assertGreaterEqual(slow_callback["duration"], 0.2)
+        self.assertIn("test_slow_callback", slow_callback["task"])
+        self.assertTrue(any("block_loop" in line for line in slow_callback["stack"]))
+        self.assertGreaterEqual(self.monitor.lag.to_dictionary()["max"], 200000)
+
+    async def test_task_name(self):
+        """
+        Test whether the name of a task contains the name of the coroutine that it runs
+        """
+        async def named_coroutine():
+            return get_task_name(current_task())
+
+        self.assertIn("named_coroutine", await ensure_future(named_coroutine()))
+        self.assertIsNone(get_task_name(None))
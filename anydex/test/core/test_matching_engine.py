@@ -154,6 +154,69 @@ class PriceTimeStrategyTestSuite(AbstractServer):
                                                         self.bid_order.available_quantity, False)
         self.assertEqual(0, len(matching_ticks))
 
+    def test_skip_own_ticks_price_level(self):
+        """
+        Test whether a price level with only ticks of the same trader is skipped
+        """
+        self.order_book.insert_ask(self.ask)
+        self.order_book.insert_ask(self.ask3)
+        self.order_book.insert_ask(self.ask2)
+        matching_ticks = self.price_time_strategy.match(self.bid.order_id, self.bid.price,
+                                                        self.bid.assets.first.amount, False)
+        self.assertEqual([self.order_book.get_tick(self.ask2.order_id)], matching_ticks)
+
+    def test_skip_blocked_ticks_price_level(self):
+        """
+        Test whether the next price level is searched when the ticks in a price level are blocked
+        """
+        self.order_book.insert_ask(self.ask)
+        self.order_book.insert_ask(self.ask3)
+        self.order_book.get_tick(self.ask.order_id).block_for_matching(self.bid_order2.order_id)
+        self.order_book.get_tick(self.ask3.order_id).block_for_matching(self.bid_order2.order_id)
+        self.order_book.insert_ask(self.ask2)
+        matching_ticks = self.price_time_strategy.match(self.bid_order2.order_id, self.bid_order2.price,
+                                                        self.bid_order2.available_quantity, False)
+        self.assertEqual([self.order_book.get_tick(self.ask2.order_id)], matching_ticks)
+
+    def test_match_batch_empty(self):
+        """
+        Test batch matching when the bids and asks do not cross
+        """
+        self.order_book.insert_ask(self.ask)
+        self.assertEqual([], self.price_time_strategy.match_batch('MB', 'BTC'))
+        self.order_book.insert_bid(self.bid2)
+        self.assertEqual([], self.price_time_strategy.match_batch('MB', 'BTC'))
+
+    def test_match_batch(self):
+        """
+        Test batch matching of crossing bids and asks
+        """
+        self.order_book.insert_ask(self.ask)
+        self.order_book.insert_ask(self.ask2)
+        self.order_book.insert_ask(self.ask3)
+        bid = Bid(OrderId(TraderId(b'9' * 20), OrderNumber(7)),
+                  AssetPair(AssetAmount(43000, 'BTC'), AssetAmount(430, 'MB')), Timeout(100), Timestamp.now())
+        self.order_book.insert_bid(bid)
+
+        matches = self.price_time_strategy.match_batch('MB', 'BTC')
+        bid_entry = self.order_book.get_tick(bid.order_id)
+        matched_order_ids = [matched_entry.order_id for _, matched_entry in matches]
+        self.assertEqual(2, len(matches))
+        self.assertEqual([self.ask3.order_id, self.ask.order_id], matched_order_ids)
+        self.assertTrue(all(recipient == bid_entry for recipient, _ in matches))
+
+    def test_match_batch_own_ticks(self):
+        """
+        Test whether ticks of the same trader are not matched with each other in a batch
+        """
+        self.order_book.insert_ask(self.ask3)
+        self.order_book.insert_ask(self.ask2)
+        self.order_book.insert_bid(self.bid)
+
+        matches = self.price_time_strategy.match_batch('MB', 'BTC')
+        self.assertEqual(1, len(matches))
+        self.assertEqual(self.order_book.get_tick(self.ask2.order_id), matches[0][1])
+
 
 class MatchingEngineTestSuite(AbstractServer):
     """Matching engine test cases."""
@@ -223,6 +286,25 @@ class MatchingEngineTestSuite(AbstractServer):
         matching_ticks = self.matching_engine.match(self.order_book.get_ask(self.ask.order_id))
         self.assertEqual(1, len(matching_ticks))
 
+    def test_match_statistics(self):
+        """
+        Test whether the matching engine keeps track of its statistics
+        """
+        self.order_book.insert_ask(self.ask)
+        self.order_book.insert_bid(self.bid)
+        self.matching_engine.match(self.order_book.get_bid(self.bid.order_id))
+
+        pair_statistics = self.matching_engine.statistics.get_pair_statistics('MB', 'BTC')
+        self.assertEqual(1, pair_statistics.num_engine_matches)
+        self.assertEqual(1, pair_statistics.num_matched_ticks)
+        self.assertEqual(1, pair_statistics.engine_latency.count)
+        self.assertEqual(1, pair_statistics.ticks_visited.max)
+
+        pairs = self.matching_engine.statistics.to_dictionary(self.order_book)
+        self.assertEqual(1, len(pairs))
+        self.assertEqual(1, pairs[0]["asks"])
+        self.assertEqual(1, pairs[0]["bids"])
+
     def test_multiple_price_levels_asks(self):
         """
         Test matching when there are asks in multiple price levels
@@ -289,3 +371,14 @@ class MatchingEngineTestSuite(AbstractServer):
         self.order_book.insert_ask(my_ask)
         matching_ticks = self.matching_engine.match(self.order_book.get_ask(my_ask.order_id))
         self.assertEqual(len(matching_ticks), 1)
+
+    def test_match_batch(self):
+        """
+        Test batch matching with multiple price levels on both sides
+        """
+        self.order_book.insert_bid(self.create_bid(10, 60))
+        self.order_book.insert_bid(self.create_bid(10, 50))
+        self.order_book.insert_ask(self.create_ask(5, 25))
+        self.order_book.insert_ask(self.create_ask(10, 55))
+        matches = self.matching_engine.match_batch('MB', 'BTC')
+        self.assertEqual(len(matches), 2)
@@ -0,0 +1,78 @@
+from anydex.core.assetamount import AssetAmount
+from anydex.core.assetpair import AssetPair
+from anydex.core.matching_shard import ShardedMatchingEngine
+from anydex.core.message import TraderId
+from anydex.core.order import OrderId, OrderNumber
+from anydex.core.orderbook import OrderBook
+from anydex.core.tick import Ask, Bid
+from anydex.core.timeout import Timeout
+from anydex.core.timestamp import Timestamp
+from anydex.test.base import AbstractServer
+from anydex.test.util import timeout
+
+
+class ShardedMatchingEngineTestSuite(AbstractServer):
+    """Sharded matching engine test cases."""
+
+    async def setUp(self):
+        super(ShardedMatchingEngineTestSuite, self).setUp()
+        self.ask = Ask(OrderId(TraderId(b'2' * 20), OrderNumber(1)),
+                       AssetPair(AssetAmount(3000, 'BTC'), AssetAmount(30, 'MB')), Timeout(30), Timestamp.now())
+        self.bid = Bid(OrderId(TraderId(b'4' * 20), OrderNumber(2)),
+                       AssetPair(AssetAmount(3000, 'BTC'), AssetAmount(30, 'MB')), Timeout(30), Timestamp.now())
+        self.order_book = OrderBook()
+        self.order_book.insert_ask(self.ask)
+        self.matching_engine = ShardedMatchingEngine(self.order_book, 2)
+        self.matching_engine.start()
+
+    async def tearDown(self):
+        await self.matching_engine.shutdown()
+        await self.order_book.shutdown_task_manager()
+        await super(ShardedMatchingEngineTestSuite, self).tearDown()
+
+    def test_shard_index(self):
+        """
+        Test whether an asset pair is always assigned to the same shard
+        """
+        shard_index = self.matching_engine.get_shard_index('MB', 'BTC')
+        self.assertEqual(shard_index, self.matching_engine.get_shard_index('MB', 'BTC'))
+        self.assertIn(shard_index, range(2))
+
+    @timeout(10)
+    async def test_match(self):
+        """
+        Test matching a tick in a shard
+        """
+        self.order_book.insert_bid(self.bid)
+        matched_ticks = await self.matching_engine.match(self.order_book.get_bid(self.bid.order_id))
+        self.assertEqual([self.order_book.get_ask(self.ask.order_id)], matched_ticks)
+
+    @timeout(10)
+    async def test_match_removed(self):
+        """
+        Test whether removed ticks are not matched in a shard
+        """
+        self.order_book.insert_bid(self.bid)
+        self.order_book.remove_tick(self.ask.order_id)
+        matched_ticks = await self.matching_engine.match(self.order_book.get_bid(self.bid.order_id))
+        self.assertEqual([], matched_ticks)
+
+    @timeout(10)
+    async def test_match_blocked(self):
+        """
+        Test whether blocked ticks are not matched in a shard
+        """
+        self.order_book.insert_bid(self.bid)
+        self.order_book.block_for_matching(self.ask.order_id, self.bid.order_id)
+        matched_ticks = await self.matching_engine.match(self.order_book.get_bid(self.bid.order_id))
+        self.assertEqual([], matched_ticks)
+
+    @timeout(10)
+    async def test_match_batch(self):
+        """
+        Test batch matching an asset pair in a shard
+        """
+        self.order_book.insert_bid(self.bid)
+        matches = await self.matching_engine.match_batch('MB', 'BTC')
+        self.assertEqual([(self.order_book.get_bid(self.bid.order_id), self.order_book.get_ask(self.ask.order_id))],
+                         matches)
@@ -0,0 +1,59 @@
+import unittest
+
+from anydex.core.assetamount import AssetAmount
+from anydex.core.assetpair import AssetPair
+from anydex.core.message import TraderId
+from anydex.core.order import OrderId, OrderNumber
+from anydex.core.order_manager import OrderManager
+from anydex.core.order_repository import MemoryOrderRepository
+from anydex.core.timeout import Timeout
+from anydex.core.timestamp import Timestamp
+
+
+class OrderManagerTestSuite(unittest.TestCase):
+    """Order manager test cases."""
+
+    def setUp(self):
+        # Object creation
+        self.order_repository = MemoryOrderRepository(b'0' * 20)
+        self.order_manager = OrderManager(self.order_repository)
+        self.assets = AssetPair(AssetAmount(10, 'BTC'), AssetAmount(10, 'MB'))
+
+    def test_open_orders(self):
+        # Test for counting the open orders when their status changes
+        order = self.order_manager.create_ask_order(self.assets, Timeout(3600))
+        self.assertEqual(0, self.order_manager.get_num_open_orders())
+        order.set_verified()
+        self.order_manager.update_order(order)
+        self.assertEqual(1, self.order_manager.get_num_open_orders())
+
+        other_order_id = OrderId(TraderId(b'1' * 20), OrderNumber(1))
+        order.reserve_quantity_for_tick(other_order_id, 10)
+        order.add_trade(other_order_id, AssetAmount(10, 'BTC'))
+        order.add_trade(other_order_id, AssetAmount(10, 'MB'))
+        self.order_manager.update_order(order)
+        self.assertEqual(0, self.order_manager.get_num_open_orders())
+
+        order = self.order_manager.create_bid_order(self.assets, Timeout(3600))
+        order.set_verified()
+        self.order_manager.update_order(order)
+        self.assertEqual(1, self.order_manager.get_num_open_orders())
+        self.order_manager.cancel_order(order.order_id)
+        self.assertEqual(0, self.order_manager.get_num_open_orders())
+
+    def test_expired_orders(self):
+        # Test whether orders that expire are not counted as open anymore
+        order = self.order_manager.create_ask_order(self.assets, Timeout(3600))
+        order.set_verified()
+        self.order_manager.update_order(order)
+        self.assertEqual(1, self.order_manager.get_num_open_orders())
+        self.order_manager.open_orders[order.order_id] = int(Timestamp.now()) - 1
+        self.assertEqual(0, self.order_manager.get_num_open_orders())
+        self.assertFalse(self.order_manager.open_orders)
+
+    def test_restore_open_orders(self):
+        # Test whether the open orders are restored from the repository
+        order = self.order_manager.create_ask_order(self.assets, Timeout(3600))
+        order.set_verified()
+        self.order_manager.create_bid_order(self.assets, Timeout(3600))
+        self.assertEqual(1, OrderManager(self.order_repository).get_num_open_orders())
@@ -1,15 +1,20 @@
+import os
+import time
+from asyncio import sleep
+
 from anydex.core.assetamount import AssetAmount
 from anydex.core.assetpair import AssetPair
+from anydex.core.database import MarketDB
 from anydex.core.message import TraderId
 from anydex.core.order import OrderId, OrderNumber
-from anydex.core.orderbook import OrderBook
+from anydex.core.orderbook import DatabaseOrderBook, OrderBook
 from anydex.core.price import Price
 from anydex.core.tick import Ask, Bid
 from anydex.core.timeout import Timeout
 from anydex.core.timestamp import Timestamp
 from anydex.core.trade import Trade
 from anydex.test.base import AbstractServer
-from anydex.test.util import timeout
+from anydex.test.util import MockObject, timeout
 
 
 class AbstractTestOrderBook(AbstractServer):
@@ -67,6 +72,147 @@ class TestOrderBook(AbstractTestOrderBook):
         self.assertFalse(self.order_book.bid_exists(self.ask2.order_id))
         self.assertEqual(self.ask2, self.order_book.get_ask(self.ask2.order_id).tick)
 
+    def test_insert_ticks(self):
+        """
+        Test inserting multiple ticks at once
+        """
+        self.order_book.insert_ask(self.ask)
+        ask3 = Ask(OrderId(TraderId(b'4' * 20), OrderNumber(1)),
+                   AssetPair(AssetAmount(100, 'BTC'), AssetAmount(30, 'MB')), Timeout(100), Timestamp.now())
+        inserted_ticks = self.order_book.insert_ticks([self.ask, self.ask2, ask3, self.bid, self.bid2, self.bid,
+                                                       self.invalid_bid])
+        self.assertEqual([self.ask2, ask3, self.bid, self.bid2], inserted_ticks)
+        self.assertEqual(3, len(self.order_book.asks))
+        self.assertEqual(2, len(self.order_book.bids))
+        self.assertEqual(Price(3, 40, 'MB', 'BTC'), self.order_book.get_ask_price('MB', 'BTC'))
+        price_level = self.order_book.get_ask(ask3.order_id).price_level()
+        self.assertEqual(2, price_level.length)
+        self.assertEqual(self.ask.order_id, price_level.first_tick.order_id)
+        self.assertEqual(Price(3, 20, 'MB', 'BTC'), self.order_book.get_bid_price('MB', 'BTC'))
+
+    async def test_insert_ticks_expiry(self):
+        """
+        Test whether ticks inserted in bulk are removed when they time out
+        """
+        ask = Ask(OrderId(TraderId(b'4' * 20), OrderNumber(1)),
+                  AssetPair(AssetAmount(100, 'BTC'), AssetAmount(30, 'MB')), Timeout(1),
+                  Timestamp(int(time.time() * 1000) - 900))
+        self.order_book.insert_ticks([ask, self.ask2])
+        self.assertTrue(self.order_book.tick_exists(ask.order_id))
+        await sleep(0.3)
+        self.assertFalse(self.order_book.tick_exists(ask.order_id))
+        self.assertTrue(self.order_book.tick_exists(self.ask2.order_id))
+
+    async def test_restore_from_database(self):
+        """
+        Test restoring the ticks of an order book from the database
+        """
+        database = MockObject()
+        database.get_ticks = lambda: [self.ask, self.bid, self.invalid_ask]
+        database.compact_tick_journal = lambda: 0
+        database.get_order_book_snapshot_id = lambda: None
+        order_book = DatabaseOrderBook(database)
+        order_book.restore_from_database()
+        self.assertEqual([self.bid.order_id, self.ask.order_id], order_book.get_order_ids())
+        await order_book.shutdown_task_manager()
+
+    async def test_tick_journal(self):
+        """
+        Test whether the changes to the order book are restored from the tick journal
+        """
+        os.makedirs(os.path.join(self.getStateDir(), 'sqlite'), exist_ok=True)
+        database = MarketDB(self.getStateDir(), 'market')
+        order_book = DatabaseOrderBook(database)
+        order_book.start_journal(60, 60)
+        order_book.insert_ask(self.ask)
+        order_book.insert_bid(self.bid)
+        order_book.insert_bid(self.bid2)
+        order_book.compact_journal()
+
+        ask_dict = {
+            "trader_id": self.ask.order_id.trader_id.as_hex(),
+            "order_number": int(self.ask.order_id.order_number),
+            "assets": self.ask.assets.to_dictionary(),
+            "traded": 10,
+            "timeout": 100,
+            "timestamp": int(self.ask.timestamp)
+        }
+        bid_dict = {
+            "trader_id": self.bid.order_id.trader_id.as_hex(),
+            "order_number": int(self.bid.order_id.order_number),
+            "assets": self.bid.assets.to_dictionary(),
+            "traded": 200,
+            "timeout": 100,
+            "timestamp": int(self.bid.timestamp)
+        }
+        order_book.update_ticks(ask_dict, bid_dict, 10)
+        order_book.save_to_database()
+        self.assertEqual(database.get_tick_journal_size(), 3)
+        await order_book.shutdown_task_manager()
+
+        restored_order_book = DatabaseOrderBook(database)
+        restored_order_book.restore_from_database()
+        self.assertEqual(database.get_tick_journal_size(), 0)
+        self.assertEqual([self.bid2.order_id, self.ask.order_id], restored_order_book.get_order_ids())
+        self.assertEqual(10, restored_order_book.get_tick(self.ask.order_id).traded)
+        await restored_order_book.shutdown_task_manager()
+        database.close()
+
+    async def test_restore_from_snapshot(self):
+        """
+        Test whether the order book is restored from the snapshot instead of the database
+        """
+        database = MockObject()
+        database.get_ticks = lambda: []
+        database.delete_all_ticks = lambda: None
+        database.add_tick = lambda _: None
+        database.compact_tick_journal = lambda: 0
+        snapshot_ids = []
+        database.get_order_book_snapshot_id = lambda: snapshot_ids[-1] if snapshot_ids else None
+        database.set_order_book_snapshot_id = snapshot_ids.append
+        snapshot_path = os.path.join(self.getStateDir(), 'orderbook.snapshot')
+
+        order_book = DatabaseOrderBook(database, snapshot_path=snapshot_path)
+        order_book.insert_ask(self.ask)
+        order_book.insert_bid(self.bid)
+        order_book.save_to_database()
+        await order_book.shutdown_task_manager()
+        self.assertTrue(os.path.exists(snapshot_path))
+
+        restored_order_book = DatabaseOrderBook(database, snapshot_path=snapshot_path)
+        restored_order_book.restore_from_database()
+        self.assertEqual([self.bid.order_id, self.ask.order_id], restored_order_book.get_order_ids())
+        self.assertFalse(os.path.exists(snapshot_path))
+        await restored_order_book.shutdown_task_manager()
+
+    async def test_restore_stale_snapshot(self):
+        """
+        Test whether a snapshot is ignored when the database has been changed by a run without snapshots
+        """
+        os.makedirs(os.path.join(self.getStateDir(), 'sqlite'), exist_ok=True)
+        database = MarketDB(self.getStateDir(), 'market')
+        snapshot_path = os.path.join(self.getStateDir(), 'orderbook.snapshot')
+
+        order_book = DatabaseOrderBook(database, snapshot_path=snapshot_path)
+        order_book.insert_ask(self.ask)
+        order_book.save_to_database()
+        await order_book.shutdown_task_manager()
+
+        # A run without snapshots leaves the snapshot file behind, but changes the ticks in the database
+        order_book = DatabaseOrderBook(database)
+        order_book.restore_from_database()
+        order_book.insert_bid(self.bid)
+        order_book.save_to_database()
+        await order_book.shutdown_task_manager()
+        self.assertTrue(os.path.exists(snapshot_path))
+
+        restored_order_book = DatabaseOrderBook(database, snapshot_path=snapshot_path)
+        restored_order_book.restore_from_database()
+        self.assertEqual([self.bid.order_id, self.ask.order_id], restored_order_book.get_order_ids())
+        self.assertFalse(os.path.exists(snapshot_path))
+        await restored_order_book.shutdown_task_manager()
+        database.close()
+
     def test_get_tick(self):
         """
         Test the retrieval of a tick from the order book
@@ -0,0 +1,76 @@
+import os
+
+from anydex.core.assetamount import AssetAmount
+from anydex.core.assetpair import AssetPair
+from anydex.core.message import TraderId
+from anydex.core.order import OrderId, OrderNumber
+from anydex.core.orderbook_snapshot import OrderBookSnapshot, SnapshotError, write_snapshot
+from anydex.core.tick import Ask, Bid
+from anydex.core.timeout import Timeout
+from anydex.core.timestamp import Timestamp
+from anydex.test.base import AbstractServer
+
+
+class TestOrderBookSnapshot(AbstractServer):
+    """
+    Tests for the binary order book snapshot.
+    """
+
+    async def setUp(self):
+        super(TestOrderBookSnapshot, self).setUp()
+        self.path = os.path.join(self.getStateDir(), 'orderbook.snapshot')
+        self.ask = Ask(OrderId(TraderId(b'0' * 20), OrderNumber(1)),
+                       AssetPair(AssetAmount(100, 'BTC'), AssetAmount(30, 'MB')), Timeout(100), Timestamp.now(),
+                       traded=20, block_hash=b'a' * 32)
+        self.bid = Bid(OrderId(TraderId(b'1' * 20), OrderNumber(2)),
+                       AssetPair(AssetAmount(200, 'BTC'), AssetAmount(50, 'ETH')), Timeout(100), Timestamp.now())
+        self.expired_bid = Bid(OrderId(TraderId(b'2' * 20), OrderNumber(3)),
+                               AssetPair(AssetAmount(200, 'BTC'), AssetAmount(50, 'MB')), Timeout(1), Timestamp(0))
+
+    def test_write_read_snapshot(self):
+        """
+        Test whether the ticks in a snapshot are read back correctly
+        """
+        self.assertEqual(3, write_snapshot(self.path, [self.ask, self.bid, self.expired_bid], b'b' * 16))
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+        snapshot = OrderBookSnapshot(self.path)
+        self.assertEqual(b'b' * 16, snapshot.snapshot_id)
+        self.assertEqual(3, len(snapshot))
+        ask = snapshot[0]
+        self.assertTrue(ask.is_ask())
+        self.assertEqual(self.ask.order_id, ask.order_id)
+        self.assertEqual(self.ask.assets, ask.assets)
+        self.assertEqual(self.ask.timestamp, ask.timestamp)
+        self.assertEqual(20, ask.traded)
+        self.assertEqual(b'a' * 32, ask.block_hash)
+        self.assertFalse(snapshot[1].is_ask())
+        self.assertEqual('ETH', snapshot[1].assets.second.asset_id)
+        self.assertEqual(3, len(list(snapshot)))
+        with self.assertRaises(IndexError):
+            _ = snapshot[3]
+        snapshot.close()
+
+    def test_active_ticks(self):
+        """
+        Test whether timed out ticks are skipped when reading the active ticks
+        """
+        write_snapshot(self.path, [self.ask, self.expired_bid, self.bid])
+        snapshot = OrderBookSnapshot(self.path)
+        self.assertEqual([self.ask.order_id, self.bid.order_id],
+                         [tick.order_id for tick in snapshot.get_active_ticks()])
+        snapshot.close()
+
+    def test_invalid_snapshot(self):
+        """
+        Test whether an error is raised when reading an invalid snapshot
+        """
+        write_snapshot(self.path, [self.ask, self.bid])
+        with open(self.path, 'rb') as snapshot_file:
+            data = snapshot_file.read()
+
+        for invalid_data in [b'', b'garbage' * 10, data[:-1]]:
+            with open(self.path, 'wb') as snapshot_file:
+                snapshot_file.write(invalid_data)
+            with self.assertRaises(SnapshotError):
+                OrderBookSnapshot(self.path)
@@ -0,0 +1,112 @@
+import unittest
+
+from ipv8.messaging.payload_headers import BinMemberAuthenticationPayload
+from ipv8.messaging.serialization import PackError, default_serializer
+
+from anydex.core.assetamount import AssetAmount
+from anydex.core.assetpair import AssetPair
+from anydex.core.message import TraderId
+from anydex.core.order import OrderId, OrderNumber
+from anydex.core.payload import DeclineMatchPayload, InfoPayload, LazyMatchPayload, LazyTradePayload, MatchPayload,\
+    OrderStatusResponsePayload, PayloadCodec, TradePayload, market_serializer
+from anydex.core.timeout import Timeout
+from anydex.core.timestamp import Timestamp
+
+
+class PayloadCodecTestSuite(unittest.TestCase):
+    """Precompiled payload codec test cases."""
+
+    def setUp(self):
+        trader_id = TraderId(b'0' * 20)
+        assets = AssetPair(AssetAmount(30, 'BTC'), AssetAmount(40, 'MC'))
+        self.payloads = [
+            InfoPayload(trader_id, Timestamp(1000), True),
+            MatchPayload(trader_id, Timestamp(1000), OrderNumber(1), assets, Timeout(3600), 10, OrderNumber(2),
+                         TraderId(b'1' * 20), TraderId(b'2' * 20)),
+            DeclineMatchPayload(trader_id, Timestamp(1000), OrderNumber(1), OrderId(TraderId(b'1' * 20),
+                                                                                    OrderNumber(2)), 3),
+            TradePayload(trader_id, Timestamp(1000), OrderNumber(1), OrderId(TraderId(b'1' * 20), OrderNumber(2)),
+                         1234, assets),
+            OrderStatusResponsePayload(trader_id, Timestamp(1000), OrderNumber(1), assets, Timeout(3600), 10, 5),
+        ]
+
+    def test_wire_compatibility(self):
+        """
+        Test whether payloads are serialized the same as with the default serializer
+        """
+        for payload in self.payloads:
+            packed = market_serializer.pack_multiple(payload.to_pack_list())
+            self.assertEqual(default_serializer.pack_multiple(payload.to_pack_list()), packed)
+
+            unpacked = market_serializer.ez_unpack_serializables([payload.__class__], packed[0])[0]
+            self.assertEqual(packed, market_serializer.pack_multiple(unpacked.to_pack_list()))
+
+    def test_unpack_with_other_payloads(self):
+        """
+        Test unpacking a registered payload that is followed by a payload without a codec
+        """
+        auth = BinMemberAuthenticationPayload(b'a' * 74)
+        data = default_serializer.ez_pack_serializables([self.payloads[1], auth, self.payloads[3]])
+        match, unpacked_auth, trade = market_serializer.ez_unpack_serializables(
+            [MatchPayload, BinMemberAuthenticationPayload, TradePayload], data)
+        self.assertEqual(2, int(match.recipient_order_number))
+        self.assertEqual(b'a' * 74, unpacked_auth.public_key_bin)
+        self.assertEqual(1234, trade.proposal_id)
+
+    def test_truncated_data(self):
+        """
+        Test whether unpacking truncated data fails
+        """
+        data = market_serializer.pack_multiple(self.payloads[1].to_pack_list())[0]
+        self.assertRaises(PackError, market_serializer.ez_unpack_serializables, [MatchPayload], data[:-1])
+        self.assertRaises(PackError, market_serializer.ez_unpack_serializables, [MatchPayload], data[:30])
+
+    def test_invalid_format(self):
+        """
+        Test whether a format list with a format that cannot be precompiled is rejected
+        """
+        self.assertEqual(2, len(PayloadCodec(['I', 'Q', 'varlenI']).segments))
+        self.assertRaises(ValueError, PayloadCodec, ['I', 'varlenH'])
+
+    def test_lazy_decoding(self):
+        """
+        Test whether received match and trade payloads only create domain objects for the fields that are used
+        """
+        data = market_serializer.pack_multiple(self.payloads[1].to_pack_list())[0]
+        match = market_serializer.ez_unpack_serializables([MatchPayload], data)[0]
+        self.assertIsInstance(match, LazyMatchPayload)
+        self.assertEqual(OrderNumber(2), match.recipient_order_number)
+        self.assertNotIn('assets', match.__dict__)
+        self.assertEqual(self.payloads[1].assets, match.assets)
+        self.assertIs(match.assets, match.assets)
+
+        data = market_serializer.pack_multiple(self.payloads[3].to_pack_list())[0]
+        trade = market_serializer.ez_unpack_serializables([TradePayload], data)[0]
+        self.assertIsInstance(trade, LazyTradePayload)
+        self.assertEqual(1234, trade.proposal_id)
+        self.assertNotIn('recipient_order_id', trade.__dict__)
+        self.assertEqual(self.payloads[3].recipient_order_id, trade.recipient_order_id)
+
+    def test_lazy_validation(self):
+        """
+        Test whether invalid fields of received match and trade payloads are detected before they are used
+        """
+        data = market_serializer.pack_multiple(self.payloads[1].to_pack_list())[0]
+        self.assertTrue(market_serializer.ez_unpack_serializables([MatchPayload], data)[0].is_valid())
+
+        pack_list = self.payloads[1].to_pack_list()
+        pack_list[4], pack_list[6] = pack_list[6], pack_list[4]
+        data = market_serializer.pack_multiple(pack_list)[0]
+        match = market_serializer.ez_unpack_serializables([MatchPayload], data)[0]
+        self.assertFalse(match.is_valid())
+        self.assertRaises(ValueError, getattr, match, 'assets')
+
+        data = market_serializer.pack_multiple(self.payloads[3].to_pack_list())[0]
+        self.assertTrue(market_serializer.ez_unpack_serializables([TradePayload], data)[0].is_valid())
+
+        pack_list = self.payloads[3].to_pack_list()
+        pack_list[3] = ('varlenI', b'1' * 5)
+        data = market_serializer.pack_multiple(pack_list)[0]
+        trade = market_serializer.ez_unpack_serializables([TradePayload], data)[0]
+        self.assertFalse(trade.is_valid())
+        self.assertEqual(1234, trade.proposal_id)
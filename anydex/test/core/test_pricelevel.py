@@ -63,3 +63,26 @@ class PriceLevelTestSuite(unittest.TestCase):
         self.price_level.append_tick(self.tick_entry2)
         self.assertEqual('60 BTC\t@\t0.5 MC\n'
                           '60 BTC\t@\t0.5 MC\n', str(self.price_level))
+
+    def test_trader_count(self):
+        # Test whether the number of ticks per trader is tracked
+        self.price_level.append_tick(self.tick_entry1)
+        self.price_level.append_tick(self.tick_entry5)
+        self.assertEqual(2, self.price_level.trader_count(TraderId(b'0' * 20)))
+        self.assertEqual(0, self.price_level.trader_count(TraderId(b'1' * 20)))
+
+        self.price_level.remove_tick(self.tick_entry1)
+        self.assertEqual(1, self.price_level.trader_count(TraderId(b'0' * 20)))
+
+    def test_eligible_count(self):
+        # Test whether ticks of the same trader and blocked ticks are not eligible for matching
+        self.price_level.append_tick(self.tick_entry1)
+        self.price_level.append_tick(self.tick_entry5)
+        self.assertEqual(0, self.price_level.eligible_count(OrderId(TraderId(b'0' * 20), OrderNumber(3))))
+
+        other_order_id = OrderId(TraderId(b'1' * 20), OrderNumber(1))
+        self.assertEqual(2, self.price_level.eligible_count(other_order_id))
+        self.price_level.block_tick(other_order_id)
+        self.assertEqual(1, self.price_level.eligible_count(other_order_id))
+        self.price_level.unblock_tick(other_order_id)
+        self.assertEqual(2, self.price_level.eligible_count(other_order_id))
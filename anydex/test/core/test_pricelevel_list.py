@@ -76,6 +76,13 @@ class PriceLevelListTestSuite(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.price_level_list.remove(self.price4)
 
+    def test_insert_many(self):
+        # Test for inserting multiple price levels at once
+        self.price_level_list2.insert_many([self.price_level3, self.price_level, self.price_level2])
+        self.assertEqual(self.price, self.price_level_list2.min_key())
+        self.assertEqual(self.price3, self.price_level_list2.max_key())
+        self.assertEqual([self.price_level, self.price_level2, self.price_level3], self.price_level_list2.items())
+
     def test_items(self):
         # Test for items
         self.assertEqual(
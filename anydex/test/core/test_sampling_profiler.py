@@ -0,0 +1,88 @@
+import json
+import os
+import time
+
+from anydex.core.sampling_profiler import SamplingProfiler
+from anydex.test.base import AbstractServer
+from anydex.test.util import timeout
+
+
+class TestSamplingProfiler(AbstractServer):
+    """
+    Tests for the sampling profiler of the event loop.
+    """
+
+    async def setUp(self):
+        super(TestSamplingProfiler, self).setUp()
+        self.profiler = SamplingProfiler(interval=0.001)
+        self.profile_dir = self.getStateDir()
+
+    async def tearDown(self):
+        self.profiler.stop()
+        await super(TestSamplingProfiler, self).tearDown()
+
+    def busy_callback(self):
+        end = time.monotonic() + 0.2
+        while time.monotonic() < end:
+            pass
+
+    @timeout(10)
+    async def test_collapsed(self):
+        """
+        Test whether the stacks of the event loop are sampled and written as collapsed stacks
+        """
+        path = os.path.join(self.profile_dir, "profile.txt")
+        profile = self.profiler.start(0.1, path)
+        self.assertTrue(self.profiler.running)
+        self.busy_callback()
+        self.assertEqual(await profile, path)
+        self.assertFalse(self.profiler.running)
+        self.assertGreater(self.profiler.num_samples, 0)
+
+        with open(path) as profile_file:
+            lines = profile_file.read().splitlines()
+        self.assertTrue(lines)
+        self.assertEqual(sum(int(line.rsplit(" ", 1)[1]) for line in lines), self.profiler.num_samples)
+        self.assertTrue(any("busy_callback (test_sampling_profiler.py:" in line for line in lines))
+
+    @timeout(10)
+    async def test_speedscope(self):
+        """
+        Test whether the profile is written in the speedscope format
+        """
+        path = os.path.join(self.profile_dir, "profile.speedscope.json")
+        profile = self.profiler.start(0.1, path, output_format="speedscope")
+        self.busy_callback()
+        await profile
+
+        with open(path) as profile_file:
+            speedscope = json.load(profile_file)
+        frames = speedscope["shared"]["frames"]
+        sampled = speedscope["profiles"][0]
+        self.assertEqual(sampled["type"], "sampled")
+        self.assertEqual(len(sampled["samples"]), len(sampled["weights"]))
+        self.assertTrue(all(index < len(frames) for sample in sampled["samples"] for index in sample))
+        self.assertIn("busy_callback", [frame["name"] for frame in frames])
+
+    @timeout(10)
+    async def test_stop(self):
+        """
+        Test whether the profile is written before stopping the profiler early returns
+        """
+        path = os.path.join(self.profile_dir, "profile.txt")
+        profile = self.profiler.start(60, path)
+        with self.assertRaises(RuntimeError):
+            self.profiler.start(60, path)
+        self.profiler.stop()
+        self.assertFalse(self.profiler.running)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(await profile, path)
+        self.assertTrue(os.path.exists(path))
+
+    def test_unknown_format(self):
+        """
+        Test whether an unknown profile format is refused
+        """
+        with self.assertRaises(ValueError):
+            self.profiler.start(1, "profile", output_format="pstats")
+        self.assertFalse(self.profiler.running)
@@ -66,6 +66,17 @@ class SideTestSuite(unittest.TestCase):
         self.side.remove_tick(OrderId(TraderId(b'1' * 20), OrderNumber(2)))
         self.assertEqual(0, len(self.side))
 
+    def test_get_tick_count(self):
+        """
+        Test the number of ticks of an asset pair in a side
+        """
+        self.assertEqual(0, self.side.get_tick_count('MB', 'BTC'))
+        self.side.insert_tick(self.tick)
+        self.side.insert_tick(self.tick2)
+        self.assertEqual(2, self.side.get_tick_count('MB', 'BTC'))
+        self.side.remove_tick(OrderId(TraderId(b'0' * 20), OrderNumber(1)))
+        self.assertEqual(1, self.side.get_tick_count('MB', 'BTC'))
+
     def test_get_price_level_list_wallets(self):
         """
         Test the price level lists of wallets of a side
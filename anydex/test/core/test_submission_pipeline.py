@@ -0,0 +1,101 @@
+from asyncio import ensure_future, gather, sleep
+
+from anydex.core.submission_pipeline import SubmissionPipeline
+from anydex.test.base import AbstractServer
+from anydex.test.util import timeout
+
+
+class TestSubmissionPipeline(AbstractServer):
+    """
+    Tests for the pipeline that processes submitted items in batches.
+    """
+
+    async def setUp(self):
+        super(TestSubmissionPipeline, self).setUp()
+        self.batches = []
+        self.discarded = []
+
+        def process_batch(items):
+            self.batches.append(items)
+            return [ValueError("Invalid item") if item < 0 else item * 2 for item in items]
+
+        self.pipeline = SubmissionPipeline(process_batch, max_queue_size=4, max_batch_size=3,
+                                           discard_item=self.discarded.append)
+
+    async def tearDown(self):
+        await self.pipeline.shutdown()
+        await super(TestSubmissionPipeline, self).tearDown()
+
+    @timeout(10)
+    async def test_submit(self):
+        """
+        Test whether concurrently submitted items are processed in batches, in submission order
+        """
+        results = await gather(*[self.pipeline.submit(item) for item in range(7)])
+        self.assertEqual([item * 2 for item in range(7)], results)
+        self.assertEqual(list(range(7)), [item for batch in self.batches for item in batch])
+        self.assertTrue(all(len(batch) <= 3 for batch in self.batches))
+        self.assertLess(len(self.batches), 7)
+        self.assertEqual(7, self.pipeline.num_processed)
+        self.assertEqual(len(self.batches), self.pipeline.num_batches)
+
+    @timeout(10)
+    async def test_submit_error(self):
+        """
+        Test whether an item that cannot be processed fails without affecting the other items in its batch
+        """
+        results = await gather(*[self.pipeline.submit(item) for item in (1, -1, 2)], return_exceptions=True)
+        self.assertEqual(2, results[0])
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(4, results[2])
+
+    @timeout(10)
+    async def test_failed_batch(self):
+        """
+        Test whether all items of a batch fail when the batch cannot be processed
+        """
+        def process_batch(_):
+            raise RuntimeError("Processing failed")
+
+        self.pipeline.process_batch = process_batch
+        results = await gather(*[self.pipeline.submit(item) for item in range(2)], return_exceptions=True)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+    @timeout(10)
+    async def test_bounded_queue(self):
+        """
+        Test whether submitters wait when the queue is full
+        """
+        self.pipeline.worker = True  # Prevent the worker from starting
+        submissions = [self.pipeline.submit(item) for item in range(5)]
+        tasks = gather(*submissions, return_exceptions=True)
+        await sleep(0.01)
+        self.assertEqual(4, self.pipeline.queue.qsize())
+        self.pipeline.worker = None
+        tasks.cancel()
+
+    @timeout(10)
+    async def test_cancelled_submission(self):
+        """
+        Test whether an item is discarded instead of processed when its submitter has been cancelled while waiting
+        """
+        self.pipeline.worker = True  # Prevent the worker from starting
+        cancelled = ensure_future(self.pipeline.submit(1))
+        await sleep(0.01)
+        cancelled.cancel()
+        await sleep(0.01)
+        self.pipeline.worker = None
+
+        self.assertEqual(4, await self.pipeline.submit(2))
+        self.assertEqual([[2]], self.batches)
+        self.assertEqual([1], self.discarded)
+        self.assertEqual(1, self.pipeline.num_processed)
+
+    @timeout(10)
+    async def test_missing_results(self):
+        """
+        Test whether all items of a batch fail when the batch does not return a result for every item
+        """
+        self.pipeline.process_batch = lambda items: items[:-1]
+        results = await gather(*[self.pipeline.submit(item) for item in range(2)], return_exceptions=True)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
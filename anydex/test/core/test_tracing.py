@@ -0,0 +1,91 @@
+import unittest
+
+from anydex.core.message import TraderId
+from anydex.core.order import OrderId, OrderNumber
+from anydex.core.tracing import Tracer, get_trace_id
+
+
+class TracerTestSuite(unittest.TestCase):
+    """
+    Tracer test cases.
+    """
+
+    def setUp(self):
+        self.time = 100.0
+        self.tracer = Tracer(max_spans=3, clock=lambda: self.time)
+
+    def test_trace_id(self):
+        """
+        Test whether both parties of a trade use the same trace id
+        """
+        order_id1 = OrderId(TraderId(b'0' * 20), OrderNumber(1))
+        order_id2 = OrderId(TraderId(b'1' * 20), OrderNumber(2))
+        self.assertEqual(get_trace_id(order_id1, order_id2), get_trace_id(order_id2, order_id1))
+
+    def test_begin_end(self):
+        """
+        Test timing a span that is started and finished in different places
+        """
+        self.tracer.begin("trade", "proposal", proposal_id=1)
+        self.time += 1
+        self.tracer.begin("trade", "proposal", proposal_id=2)
+        self.time += 1
+        span = self.tracer.end("trade", "proposal", result="accepted")
+        self.assertEqual(2, span.duration)
+        self.assertEqual({"proposal_id": 1, "result": "accepted"}, span.attributes)
+        self.assertIsNone(self.tracer.end("trade", "proposal"))
+
+    def test_span(self):
+        """
+        Test timing a span with the context manager, also when it fails
+        """
+        with self.tracer.span("trade", "tx_init"):
+            self.time += 0.5
+
+        with self.assertRaises(RuntimeError):
+            with self.tracer.span("trade", "send_payment"):
+                raise RuntimeError("transfer failed")
+
+        spans = self.tracer.get_spans("trade")
+        self.assertEqual(["tx_init", "send_payment"], [span.name for span in spans])
+        self.assertEqual(0.5, spans[0].duration)
+        self.assertEqual("transfer failed", spans[1].attributes["error"])
+
+    def test_ring_buffer(self):
+        """
+        Test whether only the most recent spans are kept and open spans are bounded
+        """
+        for index in range(5):
+            with self.tracer.span("trade%d" % index, "tx_init"):
+                pass
+            self.tracer.begin("trade%d" % index, "proposal")
+        self.assertEqual(["trade2", "trade3", "trade4"], [span.trace_id for span in self.tracer.get_spans()])
+        self.assertEqual(3, len(self.tracer.open_spans))
+        self.assertIsNone(self.tracer.end("trade0", "proposal"))
+
+    def test_disabled(self):
+        """
+        Test whether no spans are recorded when tracing is disabled
+        """
+        tracer = Tracer(max_spans=0)
+        tracer.begin("trade", "proposal")
+        with tracer.span("trade", "tx_init"):
+            pass
+        self.assertFalse(tracer.get_spans())
+        self.assertFalse(tracer.open_spans)
+
+    def test_chrome_trace(self):
+        """
+        Test exporting the spans in the Chrome trace event format
+        """
+        with self.tracer.span("trade1", "tx_init"):
+            self.time += 0.25
+        with self.tracer.span("trade2", "tx_init"):
+            pass
+
+        events = self.tracer.to_chrome_trace()["traceEvents"]
+        complete_events = [event for event in events if event["ph"] == "X"]
+        self.assertEqual(2, len([event for event in events if event["ph"] == "M"]))
+        self.assertEqual(250000, complete_events[0]["dur"])
+        self.assertNotEqual(complete_events[0]["tid"], complete_events[1]["tid"])
+        self.assertEqual(1, len(self.tracer.to_chrome_trace("trade1")["traceEvents"]) - 1)
@@ -0,0 +1,124 @@
+import unittest
+from binascii import hexlify
+
+from anydex.core.trade_status_index import TradeStatusIndex
+from anydex.test.util import MockObject
+
+
+class TradeStatusIndexTestSuite(unittest.TestCase):
+    """TradeStatusIndex test cases."""
+
+    def setUp(self):
+        self.blocks = []
+        self.linked_blocks = {}
+        self.num_crawls = 0
+
+        def crawl(public_key, start_seq_num, end_seq_num, limit=100):
+            self.num_crawls += 1
+            return [block for block in self.blocks if block.public_key == public_key
+                    and start_seq_num <= block.sequence_number <= end_seq_num][:limit]
+
+        persistence = MockObject()
+        persistence.crawl = crawl
+        persistence.get_linked = lambda block: self.linked_blocks.get(block.hash)
+        self.index = TradeStatusIndex(persistence, batch_size=2, history_size=5)
+
+    def create_block(self, block_type, link_sequence_number=0, txid=None, public_key=b'a'):
+        sequence_number = len([block for block in self.blocks if block.public_key == public_key]) + 1
+        block = MockObject()
+        block.type = block_type
+        block.public_key = public_key
+        block.sequence_number = sequence_number
+        block.link_sequence_number = link_sequence_number
+        block.hash = b'%s-%d' % (public_key, sequence_number)
+        if block_type == b'tx_payment':
+            block.transaction = {"payment": {"transaction_id": hexlify(txid).decode('utf-8')}}
+        elif block_type == b'tx_done':
+            block.transaction = {"tx": {"transaction_id": hexlify(txid).decode('utf-8')}}
+        self.blocks.append(block)
+        return block
+
+    def test_empty_chain(self):
+        """
+        Test whether we can trade with a trader without transactions
+        """
+        self.assertTrue(self.index.can_trade(b'a'))
+
+    def test_initiated_transaction(self):
+        """
+        Test whether we cannot trade with a trader that initiated a transaction and has to pay first
+        """
+        tx_init = self.create_block(b'tx_init')
+        self.create_block(b'tx_init', public_key=b'b')
+        self.assertFalse(self.index.can_trade(b'a'))
+
+        self.create_block(b'tx_payment', txid=tx_init.hash)
+        self.assertTrue(self.index.can_trade(b'a'))
+
+        self.create_block(b'tx_payment', link_sequence_number=3, txid=tx_init.hash)
+        self.assertFalse(self.index.can_trade(b'a'))
+
+        self.create_block(b'tx_done', txid=tx_init.hash)
+        self.assertTrue(self.index.can_trade(b'a'))
+        self.assertFalse(self.index.chains[b'a'].tx_status)
+
+    def test_counter_signed_transaction(self):
+        """
+        Test whether we can trade with a trader that counter-signed a transaction
+        """
+        proposal = self.create_block(b'tx_init', public_key=b'b')
+        agreement = self.create_block(b'tx_init', link_sequence_number=1)
+        self.linked_blocks[agreement.hash] = proposal
+        self.assertTrue(self.index.can_trade(b'a'))
+        self.assertIn(proposal.hash, self.index.chains[b'a'].tx_status)
+
+    def test_incremental_update(self):
+        """
+        Test whether received blocks are processed without reading the database
+        """
+        self.create_block(b'tx_init')
+        self.assertFalse(self.index.can_trade(b'a'))
+
+        self.index.add_block(self.create_block(b'tx_init'))
+        self.index.add_block(self.create_block(b'tx_init', public_key=b'b'))
+        self.assertEqual(2, self.index.chains[b'a'].sequence_number)
+        self.assertNotIn(b'b', self.index.chains)
+
+        # A block that does not follow the processed blocks is read from the database later
+        self.create_block(b'tx_init')
+        self.index.add_block(self.create_block(b'tx_init'))
+        self.assertEqual(2, self.index.chains[b'a'].sequence_number)
+
+        num_crawls = self.num_crawls
+        self.index.update(b'a')
+        self.assertEqual(4, self.index.chains[b'a'].sequence_number)
+        self.assertEqual(4, len(self.index.chains[b'a'].open_transactions))
+        self.assertEqual(num_crawls + 2, self.num_crawls)
+
+    def test_missing_block(self):
+        """
+        Test whether blocks after a missing block are only processed once the missing block has been stored
+        """
+        tx_init = self.create_block(b'tx_init')
+        self.create_block(b'tx_payment', txid=tx_init.hash)
+        missing_block = self.blocks.pop(0)
+        self.assertTrue(self.index.can_trade(b'a'))
+        self.assertEqual(0, self.index.chains[b'a'].sequence_number)
+
+        self.blocks.insert(0, missing_block)
+        self.assertTrue(self.index.can_trade(b'a'))
+        self.assertEqual(2, self.index.chains[b'a'].sequence_number)
+        self.assertIn(tx_init.hash, self.index.chains[b'a'].tx_status)
+
+    def test_abandoned_transaction(self):
+        """
+        Test whether a transaction without tx_done block no longer blocks the trader after enough blocks
+        """
+        self.create_block(b'tx_init')
+        for _ in range(4):
+            self.create_block(b'ask')
+        self.assertFalse(self.index.can_trade(b'a'))
+
+        self.create_block(b'ask')
+        self.assertTrue(self.index.can_trade(b'a'))
+        self.assertFalse(self.index.chains[b'a'].tx_status)
@@ -4,10 +4,13 @@ from anydex.core.assetamount import AssetAmount
 from anydex.core.assetpair import AssetPair
 from anydex.core.message import TraderId
 from anydex.core.order import OrderId, OrderNumber
+from anydex.core.payment import Payment
+from anydex.core.payment_id import PaymentId
 from anydex.core.timestamp import Timestamp
 from anydex.core.transaction import Transaction, TransactionId
 from anydex.core.transaction_manager import TransactionManager
 from anydex.core.transaction_repository import MemoryTransactionRepository
+from anydex.core.wallet_address import WalletAddress
 
 
 class TransactionManagerTestSuite(unittest.TestCase):
@@ -34,3 +37,15 @@ class TransactionManagerTestSuite(unittest.TestCase):
         self.assertEqual([], list(self.transaction_manager.find_all()))
         self.memory_transaction_repository.add(self.transaction)
         self.assertEqual([self.transaction], list(self.transaction_manager.find_all()))
+
+    def test_open_transactions(self):
+        # Test for counting the transactions with outstanding payments
+        self.transaction_manager.add(self.transaction)
+        self.assertEqual(1, self.transaction_manager.get_num_open_transactions())
+        for amount in (AssetAmount(100, 'BTC'), AssetAmount(30, 'MB')):
+            self.transaction.add_payment(Payment(TraderId(b'3' * 20), self.transaction_id, amount,
+                                                 WalletAddress('a'), WalletAddress('b'), PaymentId('c'), Timestamp(0)))
+        self.assertEqual(1, self.transaction_manager.get_num_open_transactions())
+        self.transaction_manager.update(self.transaction)
+        self.assertEqual(0, self.transaction_manager.get_num_open_transactions())
+        self.assertFalse(self.transaction_manager.open_transaction_ids)
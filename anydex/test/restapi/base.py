@@ -45,6 +45,7 @@ class TestRestApiBase(TestBase):
         self.expected_response_json = None
         self.should_check_equality = True
         self.restapi = None
+        self.restapi_started = None
 
         self.initialize(MarketCommunity, self.NUM_NODES)
         for node in self.nodes:
@@ -72,7 +73,7 @@ class TestRestApiBase(TestBase):
         # Start REST API
         self.restapi = RESTManager(mock_ipv8)
         random_port = get_random_port()
-        ensure_future(self.restapi.start(random_port))
+        self.restapi_started = ensure_future(self.restapi.start(random_port))
 
         return mock_ipv8
 
@@ -81,6 +82,9 @@ class TestRestApiBase(TestBase):
         self.expected_response_code = expected_code
         self.expected_response_json = expected_json
 
+        # Make sure the REST API is listening before we connect to it
+        await self.restapi_started
+
         url = 'http://localhost:%d/%s' % (self.restapi.port, endpoint)
         headers = {'User-Agent': 'AnyDex'}
 
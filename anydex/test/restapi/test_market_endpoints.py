@@ -168,6 +168,120 @@ class TestMarketEndpoint(TestRestApiBase):
         self.assertIn('orders', json_response)
         self.assertEqual(len(json_response['orders']), 1)
 
+    @timeout(10)
+    async def test_get_matching_statistics(self):
+        """
+        Test whether the API returns the matching statistics and order book sizes of the asset pairs
+        """
+        await self.nodes[0].overlay.create_ask(AssetPair(AssetAmount(10, 'DUM1'), AssetAmount(10, 'DUM2')), 3600)
+        self.should_check_equality = False
+        json_response = await self.do_request('statistics/matching', expected_code=200)
+        self.assertIn('matching', json_response)
+        self.assertEqual(len(json_response['matching']), 1)
+        self.assertEqual(json_response['matching'][0]['asks'], 1)
+        self.assertEqual(json_response['matching'][0]['bids'], 0)
+        self.assertIn('engine_latency', json_response['matching'][0])
+
+    @timeout(10)
+    async def test_get_address_statistics(self):
+        """
+        Test whether the API returns the statistics of the trader address cache
+        """
+        self.should_check_equality = False
+        json_response = await self.do_request('statistics/addresses', expected_code=200)
+        self.assertIn('addresses', json_response)
+        self.assertIn('hit_rate', json_response['addresses'])
+
+    @timeout(10)
+    async def test_get_network_statistics(self):
+        """
+        Test whether the API returns the number of sent packets and the statistics of the block packet cache
+        """
+        self.should_check_equality = False
+        json_response = await self.do_request('statistics/network', expected_code=200)
+        self.assertIn('network', json_response)
+        self.assertIn('packets_per_second', json_response['network']['sent'])
+        self.assertIn('hits', json_response['network']['block_packet_cache'])
+
+    @timeout(10)
+    async def test_get_message_statistics(self):
+        """
+        Test whether the API returns the statistics of the incoming messages, once they are enabled
+        """
+        self.should_check_equality = False
+        await self.do_request('statistics/messages', expected_code=404)
+
+        self.nodes[0].overlay.start_message_statistics()
+        json_response = await self.do_request('statistics/messages', expected_code=200)
+        self.assertIn('match', json_response['messages']['messages'])
+        self.assertEqual(json_response['messages']['messages']['match']['count'], 0)
+
+    @timeout(10)
+    async def test_get_traces(self):
+        """
+        Test whether the API returns the spans of the trade traces, also in the Chrome trace format
+        """
+        with self.nodes[0].overlay.tracer.span("trade", "tx_init"):
+            pass
+
+        self.should_check_equality = False
+        json_response = await self.do_request('statistics/traces', expected_code=200)
+        self.assertEqual(json_response['traces']['spans'][0]['name'], 'tx_init')
+        json_response = await self.do_request('statistics/traces?format=chrome&trace_id=trade', expected_code=200)
+        self.assertEqual(json_response['traceEvents'][1]['name'], 'tx_init')
+        json_response = await self.do_request('statistics/traces?trace_id=other', expected_code=200)
+        self.assertFalse(json_response['traces']['spans'])
+
+    @timeout(10)
+    async def test_get_metrics(self):
+        """
+        Test whether the API returns the metrics in the Prometheus text format
+        """
+        await self.nodes[0].overlay.create_ask(AssetPair(AssetAmount(10, 'DUM1'), AssetAmount(10, 'DUM2')), 3600)
+        self.should_check_equality = False
+        response = await self.do_request('metrics', expected_code=200, json_response=False)
+        lines = response.decode('utf-8').splitlines()
+        self.assertIn('anydex_order_book_ticks{price_type="DUM2",quantity_type="DUM1",side="ask"} 1', lines)
+        self.assertIn('anydex_open_orders 1', lines)
+        self.assertIn('# TYPE anydex_db_statement_duration_seconds summary', lines)
+        self.assertNotIn('# TYPE anydex_loop_lag_seconds summary', lines)
+
+    @timeout(10)
+    async def test_get_loop_statistics(self):
+        """
+        Test whether the API returns the statistics of the loop monitor, once it is enabled
+        """
+        self.should_check_equality = False
+        await self.do_request('statistics/loop', expected_code=404)
+
+        self.nodes[0].overlay.start_loop_monitor()
+        json_response = await self.do_request('statistics/loop', expected_code=200)
+        self.assertIn('lag', json_response['loop'])
+        self.assertEqual(json_response['loop']['num_slow_callbacks'], 0)
+
+    @timeout(10)
+    async def test_profile(self):
+        """
+        Test whether the sampling profiler can be started, inspected and stopped through the API
+        """
+        self.should_check_equality = False
+        self.nodes[0].overlay.profile_directory = self.temporary_directory()
+        await self.do_request('statistics/profile', expected_code=404, request_type='DELETE')
+        await self.do_request('statistics/profile?format=pstats', expected_code=400, request_type='PUT')
+        for duration in ('-1', '0', 'nan', 'inf'):
+            await self.do_request('statistics/profile?duration=%s' % duration, expected_code=400, request_type='PUT')
+
+        json_response = await self.do_request('statistics/profile?duration=60&format=speedscope',
+                                              expected_code=200, request_type='PUT')
+        self.assertTrue(json_response['profile']['running'])
+        self.assertTrue(json_response['profile']['path'].endswith('.speedscope.json'))
+        await self.do_request('statistics/profile', expected_code=400, request_type='PUT')
+
+        profiler = self.nodes[0].overlay.profiler
+        await self.do_request('statistics/profile', expected_code=200, request_type='DELETE')
+        json_response = await self.do_request('statistics/profile', expected_code=200)
+        self.assertFalse(json_response['profile']['running'])
+
     @timeout(10)
     async def test_get_payments(self):
         """
@@ -216,6 +330,65 @@ class TestMarketEndpoint(TestRestApiBase):
         cancelled_order = self.nodes[0].overlay.order_manager.order_repository.find_by_id(order.order_id)
         self.assertTrue(cancelled_order.cancelled)
 
+    @timeout(10)
+    async def test_create_orders(self):
+        """
+        Test whether we can create multiple orders at once using the API
+        """
+        self.should_check_equality = False
+        order = {'first_asset_amount': 10, 'second_asset_amount': 10, 'first_asset_type': 'DUM1',
+                 'second_asset_type': 'DUM2'}
+        post_data = json.dumps({'orders': [dict(order, type='ask'), dict(order, type='bid', second_asset_amount=5),
+                                           dict(order, type='bid', timeout=-1), {'type': 'ask'}]})
+        json_response = await self.do_request('orders/batch', request_type='PUT', post_data=post_data)
+        self.assertEqual(4, len(json_response['orders']))
+        self.assertTrue(json_response['orders'][0]['is_ask'])
+        self.assertFalse(json_response['orders'][1]['is_ask'])
+        self.assertIn('error', json_response['orders'][2])
+        self.assertIn('error', json_response['orders'][3])
+        self.assertEqual(1, len(self.nodes[0].overlay.order_book.asks))
+        self.assertEqual(1, len(self.nodes[0].overlay.order_book.bids))
+
+    @timeout(10)
+    async def test_create_orders_invalid(self):
+        """
+        Test whether an error is returned when the orders to create are missing
+        """
+        self.should_check_equality = False
+        await self.do_request('orders/batch', request_type='PUT', post_data='{}', expected_code=400)
+        for orders in (5, "ask", {"type": "ask"}):
+            await self.do_request('orders/batch', request_type='PUT', post_data=json.dumps({'orders': orders}),
+                                  expected_code=400)
+
+    @timeout(10)
+    async def test_cancel_orders(self):
+        """
+        Test whether we can cancel multiple orders at once using the API
+        """
+        for _ in range(2):
+            self.nodes[0].overlay.order_manager.create_ask_order(
+                AssetPair(AssetAmount(3, 'DUM1'), AssetAmount(4, 'DUM2')), Timeout(3600))
+
+        self.should_check_equality = False
+        post_data = json.dumps({'order_numbers': [1, 2, 2, 1234]})
+        json_response = await self.do_request('orders/cancel-batch', request_type='POST', post_data=post_data)
+        self.assertEqual([True, True], [result.get('cancelled') for result in json_response['orders'][:2]])
+        self.assertIn('error', json_response['orders'][2])
+        self.assertEqual('order not found', json_response['orders'][3]['error'])
+        self.assertTrue(all(order.cancelled for order in
+                            self.nodes[0].overlay.order_manager.order_repository.find_all()))
+
+    @timeout(10)
+    async def test_cancel_orders_invalid(self):
+        """
+        Test whether an error is returned when the order numbers to cancel are missing or not a list of integers
+        """
+        self.should_check_equality = False
+        await self.do_request('orders/cancel-batch', request_type='POST', post_data='{}', expected_code=400)
+        for order_numbers in (5, "12", {"1": 1}, [1, "a"]):
+            await self.do_request('orders/cancel-batch', request_type='POST',
+                                  post_data=json.dumps({'order_numbers': order_numbers}), expected_code=400)
+
     @timeout(10)
     async def test_get_matchmakers(self):
         """
@@ -0,0 +1,96 @@
+import abc
+import unittest
+from asyncio import get_event_loop
+
+from anydex.wallet.provider import Provider, provider_statistics, reset_provider_statistics
+
+
+class MockProvider(Provider, metaclass=abc.ABCMeta):
+
+    @abc.abstractmethod
+    async def get_fee(self):
+        return
+
+
+class MockProviderImpl(MockProvider):
+
+    def __init__(self):
+        self.fail = False
+
+    def submit_transaction(self, tx):
+        if self.fail:
+            raise RuntimeError("Submission failed")
+        return "hash"
+
+    def get_balance(self, address):
+        return 42
+
+    def get_transactions(self, address):
+        return []
+
+    async def get_fee(self):
+        return 1
+
+    def get_network(self):
+        return "testnet"
+
+
+class MockProviderSubclass(MockProviderImpl):
+
+    def get_balance(self, address):
+        return super().get_balance(address) + 1
+
+
+class TestProvider(unittest.TestCase):
+    """
+    Tests for the timing of wallet provider calls.
+    """
+
+    def setUp(self):
+        self.provider = MockProviderImpl()
+        reset_provider_statistics()
+
+    def tearDown(self):
+        reset_provider_statistics()
+
+    def get_statistics(self, method_name, provider_name="MockProviderImpl"):
+        return provider_statistics[(provider_name, method_name)]
+
+    def test_timed_calls(self):
+        """
+        Test whether calls to the provider interface are counted and timed, including failed calls
+        """
+        self.assertEqual("hash", self.provider.submit_transaction(None))
+        self.provider.fail = True
+        self.assertRaises(RuntimeError, self.provider.submit_transaction, None)
+        self.assertEqual(42, self.provider.get_balance("address"))
+
+        self.assertEqual(2, self.get_statistics("submit_transaction").count)
+        self.assertEqual(1, self.get_statistics("submit_transaction").errors)
+        self.assertLessEqual(self.get_statistics("submit_transaction").max_duration,
+                             self.get_statistics("submit_transaction").total_duration)
+        self.assertEqual(1, self.get_statistics("get_balance").count)
+        self.assertNotIn(("MockProviderImpl", "get_network"), provider_statistics)
+
+    def test_timed_coroutine(self):
+        """
+        Test whether a coroutine of the provider is timed until it has finished
+        """
+        self.assertEqual(1, get_event_loop().run_until_complete(self.provider.get_fee()))
+        self.assertEqual(1, self.get_statistics("get_fee").count)
+
+    def test_timed_subclass(self):
+        """
+        Test whether a call to a subclass that calls the implementation of its superclass is only counted once
+        """
+        self.assertEqual(43, MockProviderSubclass().get_balance("address"))
+        self.assertEqual(1, self.get_statistics("get_balance", "MockProviderSubclass").count)
+        self.assertNotIn(("MockProviderImpl", "get_balance"), provider_statistics)
+
+    def test_reset(self):
+        """
+        Test whether the statistics of the provider calls can be reset
+        """
+        self.provider.get_transactions("address")
+        reset_provider_statistics()
+        self.assertFalse(provider_statistics)
@@ -1,4 +1,78 @@
 import abc
+import time
+from asyncio import iscoroutinefunction
+from functools import wraps
+
+provider_statistics = {}  # Map: (provider name, method name) -> ProviderStatistics
+
+
+class ProviderStatistics:
+    """
+    Keeps track of the number of calls to a provider method, the number of failed calls and the time spent in them.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+
+    def record(self, duration, failed=False):
+        self.count += 1
+        self.total_duration += duration
+        self.max_duration = max(self.max_duration, duration)
+        if failed:
+            self.errors += 1
+
+
+def reset_provider_statistics():
+    """
+    Forget the statistics of all provider calls that have been recorded so far.
+    """
+    provider_statistics.clear()
+
+
+def timed_provider_call(provider_name, method_name, method):
+    """
+    Wrap a provider method, so the number of calls, the failed calls and the latency are recorded.
+    A call is only recorded by the implementation that is used by the class of the provider, so an implementation
+    that calls the implementation of its superclass is counted once.
+    """
+    def get_statistics(provider):
+        if getattr(type(provider), method_name, None) is not wrapper:
+            return None
+        return provider_statistics.setdefault((provider_name, method_name), ProviderStatistics())
+
+    def record(statistics, start, failed=False):
+        if statistics is not None:
+            statistics.record(time.perf_counter() - start, failed=failed)
+
+    if iscoroutinefunction(method):
+        @wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            statistics = get_statistics(self)
+            start = time.perf_counter()
+            try:
+                result = await method(self, *args, **kwargs)
+            except Exception:
+                record(statistics, start, failed=True)
+                raise
+            record(statistics, start)
+            return result
+    else:
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            statistics = get_statistics(self)
+            start = time.perf_counter()
+            try:
+                result = method(self, *args, **kwargs)
+            except Exception:
+                record(statistics, start, failed=True)
+                raise
+            record(statistics, start)
+            return result
+
+    return wrapper
 
 
 class Provider(metaclass=abc.ABCMeta):
@@ -9,8 +83,21 @@ class Provider(metaclass=abc.ABCMeta):
     For each cryptocurrency, a new abstract class specific to that
     cryptocurrency should be created and any method specific to the cryptocurrency should be specified.
     That class can than be subclassed and implemented.
+
+    The implementations of the abstract methods are timed automatically, see provider_statistics.
     """
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        interface = set()
+        for base in cls.__mro__[1:]:
+            interface |= set(getattr(base, '__abstractmethods__', ()))
+
+        for name in interface:
+            method = cls.__dict__.get(name)
+            if callable(method) and not getattr(method, '__isabstractmethod__', False):
+                setattr(cls, name, timed_provider_call(cls.__name__, name, method))
+
     @abc.abstractmethod
     def submit_transaction(self, tx):
         """
@@ -0,0 +1,91 @@
+"""
+Benchmark continuous matching against batch matching of a burst of incoming ticks.
+
+Run from the root of the repository with: python3 -m benchmarks.matching_engine
+"""
+import argparse
+import random
+from asyncio import get_event_loop
+from time import time
+
+from anydex.core.assetamount import AssetAmount
+from anydex.core.assetpair import AssetPair
+from anydex.core.matching_engine import MatchingEngine, PriceTimeStrategy
+from anydex.core.message import TraderId
+from anydex.core.order import OrderId, OrderNumber
+from anydex.core.orderbook import OrderBook
+from anydex.core.tick import Ask, Bid
+from anydex.core.timeout import Timeout
+from anydex.core.timestamp import Timestamp
+
+
+def create_ticks(num_ticks, num_traders, seed):
+    """
+    Create a burst of asks and bids with prices around the same mid price, so a part of them crosses.
+    """
+    rand = random.Random(seed)
+    ticks = []
+    for order_number in range(1, num_ticks + 1):
+        trader_id = TraderId(b'%020d' % rand.randint(0, num_traders - 1))
+        quantity = rand.randint(1, 10) * 100
+        price = rand.randint(90, 110)
+        assets = AssetPair(AssetAmount(quantity, 'BTC'), AssetAmount(quantity * price, 'MB'))
+        tick_cls = Ask if rand.random() < 0.5 else Bid
+        ticks.append(tick_cls(OrderId(trader_id, OrderNumber(order_number)), assets, Timeout(3600), Timestamp.now()))
+    return ticks
+
+
+async def run_continuous(ticks):
+    order_book = OrderBook()
+    matching_engine = MatchingEngine(PriceTimeStrategy(order_book))
+    num_matches = 0
+    match_duration = 0
+
+    start = time()
+    for tick in ticks:
+        order_book.insert_ask(tick) if tick.is_ask() else order_book.insert_bid(tick)
+        match_start = time()
+        num_matches += len(matching_engine.match(order_book.get_tick(tick.order_id)))
+        match_duration += time() - match_start
+    duration = time() - start
+
+    await order_book.shutdown_task_manager()
+    return duration, match_duration, num_matches
+
+
+async def run_batch(ticks):
+    order_book = OrderBook()
+    matching_engine = MatchingEngine(PriceTimeStrategy(order_book))
+
+    start = time()
+    for tick in ticks:
+        order_book.insert_ask(tick) if tick.is_ask() else order_book.insert_bid(tick)
+    match_start = time()
+    num_matches = len(matching_engine.match_batch('MB', 'BTC'))
+    match_duration = time() - match_start
+    duration = time() - start
+
+    await order_book.shutdown_task_manager()
+    return duration, match_duration, num_matches
+
+
+async def run_benchmark(args):
+    ticks = create_ticks(args.ticks, args.traders, args.seed)
+    for name, runner in (("continuous", run_continuous), ("batch", run_batch)):
+        duration, match_duration, num_matches = await runner(ticks)
+        print("%-10s %8d ticks %8d matches %8.3f s total %8.3f s matching %10.0f ticks/s" %
+              (name, len(ticks), num_matches, duration, match_duration, len(ticks) / duration))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark continuous and batch matching')
+    parser.add_argument('--ticks', default=10000, type=int, help='The number of ticks in the burst')
+    parser.add_argument('--traders', default=50, type=int, help='The number of traders creating ticks')
+    parser.add_argument('--seed', default=42, type=int, help='The seed used to generate the ticks')
+    args = parser.parse_args()
+
+    get_event_loop().run_until_complete(run_benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark placing and cancelling orders through the REST API: one order per request, one order per request from
+concurrent clients and batch requests.
+
+Run from the root of the repository with: python3 -m benchmarks.order_placement
+"""
+import argparse
+import json
+from asyncio import gather, get_event_loop
+from time import time
+
+from aiohttp import ClientSession
+
+from ipv8.test.mocking.ipv8 import MockIPv8
+
+from anydex.core.community import MarketCommunity
+from anydex.restapi.rest_manager import RESTManager
+from anydex.test.util import get_random_port
+from anydex.wallet.dummy.dummy_wallet import DummyWallet1, DummyWallet2
+
+
+ORDER = {
+    'first_asset_amount': 10,
+    'second_asset_amount': 10,
+    'first_asset_type': 'DUM1',
+    'second_asset_type': 'DUM2'
+}
+
+
+async def start_node():
+    wallets = {'DUM1': DummyWallet1(), 'DUM2': DummyWallet2()}
+    mock_ipv8 = MockIPv8(u"curve25519", MarketCommunity, create_trustchain=True, create_dht=True,
+                         is_matchmaker=True, wallets=wallets, use_database=False, working_directory=u":memory:")
+    mock_ipv8.overlays = [mock_ipv8.overlay]
+    restapi = RESTManager(mock_ipv8)
+    await restapi.start(get_random_port())
+    return mock_ipv8, restapi
+
+
+async def run_single(session, url, num_orders):
+    start = time()
+    for _ in range(num_orders):
+        async with session.put(url + 'asks', data=ORDER) as response:
+            await response.read()
+    create_duration = time() - start
+
+    start = time()
+    for order_number in range(1, num_orders + 1):
+        async with session.post(url + 'orders/%d/cancel' % order_number) as response:
+            await response.read()
+    return create_duration, time() - start
+
+
+async def run_concurrent(session, url, num_orders, concurrency):
+    async def create_orders(num_client_orders):
+        for _ in range(num_client_orders):
+            async with session.put(url + 'asks', data=ORDER) as response:
+                await response.read()
+
+    async def cancel_orders(order_numbers):
+        for order_number in order_numbers:
+            async with session.post(url + 'orders/%d/cancel' % order_number) as response:
+                await response.read()
+
+    start = time()
+    await gather(*[create_orders(len(range(client, num_orders, concurrency))) for client in range(concurrency)])
+    create_duration = time() - start
+
+    start = time()
+    await gather(*[cancel_orders(range(client + 1, num_orders + 1, concurrency)) for client in range(concurrency)])
+    return create_duration, time() - start
+
+
+async def run_batch(session, url, num_orders, batch_size):
+    start = time()
+    for offset in range(0, num_orders, batch_size):
+        orders = [dict(ORDER, type='ask')] * min(batch_size, num_orders - offset)
+        async with session.put(url + 'orders/batch', data=json.dumps({'orders': orders})) as response:
+            await response.read()
+    create_duration = time() - start
+
+    start = time()
+    for offset in range(0, num_orders, batch_size):
+        order_numbers = list(range(offset + 1, min(offset + batch_size, num_orders) + 1))
+        async with session.post(url + 'orders/cancel-batch',
+                                data=json.dumps({'order_numbers': order_numbers})) as response:
+            await response.read()
+    return create_duration, time() - start
+
+
+async def run_benchmark(args):
+    for name in ("single", "concurrent", "batch"):
+        mock_ipv8, restapi = await start_node()
+        url = 'http://localhost:%d/' % restapi.port
+        async with ClientSession() as session:
+            if name == "single":
+                create_duration, cancel_duration = await run_single(session, url, args.orders)
+            elif name == "concurrent":
+                create_duration, cancel_duration = await run_concurrent(session, url, args.orders, args.concurrency)
+            else:
+                create_duration, cancel_duration = await run_batch(session, url, args.orders, args.batch_size)
+        await restapi.stop()
+        await mock_ipv8.unload()
+
+        print("%-10s %6d orders   create %8.3f s %8.0f orders/s   cancel %8.3f s %8.0f orders/s" %
+              (name, args.orders, create_duration, args.orders / create_duration,
+               cancel_duration, args.orders / cancel_duration))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark single and batch order placement through the REST API')
+    parser.add_argument('--orders', default=500, type=int, help='The number of orders to place and cancel')
+    parser.add_argument('--batch-size', default=50, type=int, help='The number of orders in a batch request')
+    parser.add_argument('--concurrency', default=20, type=int, help='The number of concurrent clients')
+    args = parser.parse_args()
+
+    get_event_loop().run_until_complete(run_benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
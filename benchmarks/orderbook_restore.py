@@ -0,0 +1,98 @@
+"""
+Benchmark restoring an order book tick by tick, with a single bulk insert, from the database and from a binary
+snapshot.
+
+Run from the root of the repository with: python3 -m benchmarks.orderbook_restore
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+from asyncio import get_event_loop
+from time import time
+
+from anydex.core.assetamount import AssetAmount
+from anydex.core.assetpair import AssetPair
+from anydex.core.database import DATABASE_DIRECTORY, MarketDB
+from anydex.core.message import TraderId
+from anydex.core.order import OrderId, OrderNumber
+from anydex.core.orderbook import OrderBook
+from anydex.core.orderbook_snapshot import OrderBookSnapshot, write_snapshot
+from anydex.core.tick import Ask, Bid
+from anydex.core.timeout import Timeout
+from anydex.core.timestamp import Timestamp
+
+
+def create_ticks(num_ticks, num_prices, seed):
+    """
+    Create asks and bids that do not cross, spread over a number of distinct prices.
+    """
+    rand = random.Random(seed)
+    ticks = []
+    for order_number in range(1, num_ticks + 1):
+        trader_id = TraderId(b'%020d' % rand.randint(0, 99))
+        is_ask = rand.random() < 0.5
+        price = 100000 + rand.randint(1, num_prices) if is_ask else 100000 - rand.randint(1, num_prices)
+        assets = AssetPair(AssetAmount(100, 'BTC'), AssetAmount(price, 'MB'))
+        tick_cls = Ask if is_ask else Bid
+        ticks.append(tick_cls(OrderId(trader_id, OrderNumber(order_number)), assets, Timeout(3600), Timestamp.now()))
+    return ticks
+
+
+def insert_one_by_one(order_book, ticks):
+    for tick in ticks:
+        order_book.insert_ask(tick) if tick.is_ask() else order_book.insert_bid(tick)
+
+
+def insert_bulk(order_book, ticks):
+    order_book.insert_ticks(ticks)
+
+
+def insert_from_database(order_book, database):
+    order_book.insert_ticks(database.get_ticks())
+
+
+def insert_from_snapshot(order_book, snapshot_path):
+    snapshot = OrderBookSnapshot(snapshot_path)
+    order_book.insert_ticks(snapshot.get_active_ticks())
+    snapshot.close()
+
+
+async def run_benchmark(args):
+    ticks = create_ticks(args.ticks, args.prices, args.seed)
+    state_dir = tempfile.mkdtemp()
+    os.makedirs(os.path.join(state_dir, DATABASE_DIRECTORY))
+    database = MarketDB(state_dir, 'market')
+    with database:
+        for tick in ticks:
+            database.add_tick(tick)
+    snapshot_path = os.path.join(state_dir, 'orderbook.snapshot')
+    write_snapshot(snapshot_path, ticks)
+
+    for name, runner, data in (("one-by-one", insert_one_by_one, ticks), ("bulk", insert_bulk, ticks),
+                               ("database", insert_from_database, database),
+                               ("snapshot", insert_from_snapshot, snapshot_path)):
+        order_book = OrderBook()
+        start = time()
+        runner(order_book, data)
+        duration = time() - start
+        print("%-10s %8d ticks %8.3f s %10.0f ticks/s" % (name, len(ticks), duration, len(ticks) / duration))
+        await order_book.shutdown_task_manager()
+
+    database.close()
+    shutil.rmtree(state_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark restoring the order book')
+    parser.add_argument('--ticks', default=20000, type=int, help='The number of ticks in the order book')
+    parser.add_argument('--prices', default=5000, type=int, help='The number of distinct prices per side')
+    parser.add_argument('--seed', default=42, type=int, help='The seed used to generate the ticks')
+    args = parser.parse_args()
+
+    get_event_loop().run_until_complete(run_benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
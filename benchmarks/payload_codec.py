@@ -0,0 +1,58 @@
+"""
+Benchmark encoding and decoding market payloads with precompiled codecs against the default ipv8 serializer.
+
+Run from the root of the repository with: python3 -m benchmarks.payload_codec
+"""
+import argparse
+from timeit import timeit
+
+from ipv8.messaging.serialization import default_serializer
+
+from anydex.core.assetamount import AssetAmount
+from anydex.core.assetpair import AssetPair
+from anydex.core.message import TraderId
+from anydex.core.order import OrderId, OrderNumber
+from anydex.core.payload import DeclineMatchPayload, DeclineTradePayload, InfoPayload, MatchPayload,\
+    PingPongPayload, TradePayload, market_serializer
+from anydex.core.timeout import Timeout
+from anydex.core.timestamp import Timestamp
+
+
+def create_payloads():
+    trader_id = TraderId(b'0' * 20)
+    other_order_id = OrderId(TraderId(b'1' * 20), OrderNumber(2))
+    assets = AssetPair(AssetAmount(30, 'BTC'), AssetAmount(40, 'MB'))
+    return [
+        InfoPayload(trader_id, Timestamp.now(), True),
+        MatchPayload(trader_id, Timestamp.now(), OrderNumber(1), assets, Timeout(3600), 0, OrderNumber(2),
+                     TraderId(b'1' * 20), TraderId(b'2' * 20)),
+        DeclineMatchPayload(trader_id, Timestamp.now(), OrderNumber(1), other_order_id, 1),
+        TradePayload(trader_id, Timestamp.now(), OrderNumber(1), other_order_id, 1234, assets),
+        DeclineTradePayload(trader_id, Timestamp.now(), OrderNumber(1), other_order_id, 1234, 1),
+        PingPongPayload(trader_id, Timestamp.now(), 1234),
+    ]
+
+
+def run_benchmark(args):
+    for payload in create_payloads():
+        pack_list = payload.to_pack_list()
+        data = default_serializer.pack_multiple(pack_list)[0]
+        payload_class = [payload.__class__]
+        for name, serializer in (("default", default_serializer), ("precompiled", market_serializer)):
+            encode = timeit(lambda: serializer.pack_multiple(pack_list), number=args.iterations)
+            decode = timeit(lambda: serializer.ez_unpack_serializables(payload_class, data), number=args.iterations)
+            print("%-20s %-12s encode %8.2f us %10.0f msg/s   decode %8.2f us %10.0f msg/s" %
+                  (payload.__class__.__name__, name, encode * 1e6 / args.iterations, args.iterations / encode,
+                   decode * 1e6 / args.iterations, args.iterations / decode))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark encoding and decoding market payloads')
+    parser.add_argument('--iterations', default=100000, type=int, help='The number of times each payload is packed')
+    args = parser.parse_args()
+
+    run_benchmark(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -167,7 +167,24 @@ class AnyDexService(object):
                                              wallets=self.wallets,
                                              working_directory=options.statedir,
                                              record_transactions=False,
-                                             is_matchmaker=not options.no_matchmaker)
+                                             is_matchmaker=not options.no_matchmaker,
+                                             matching_shards=options.matching_shards,
+                                             tick_journal_interval=options.tick_journal_interval,
+                                             order_book_snapshot=options.order_book_snapshot)
+
+        if options.log_matching_statistics > 0:
+            self.market.start_statistics_logging(options.log_matching_statistics)
+
+        if options.message_statistics or options.log_message_statistics > 0:
+            self.market.start_message_statistics(options.log_message_statistics)
+
+        if options.loop_monitor:
+            self.market.start_loop_monitor(options.slow_callback_threshold / 1000)
+
+        if options.profile > 0:
+            profile = self.market.start_profiler(options.profile, options.profile_format)
+            profile.add_done_callback(lambda future: print("Wrote profile to %s" % future.result())
+                                      if not future.exception() else None)
 
         self.ipv8.overlays.append(self.market)
         self.ipv8.strategies.append((RandomWalk(self.market), 20))
@@ -181,6 +198,36 @@ def main(argv):
         '--no-rest-api', '-a', action='store_const', default=False, const=True, help='Autonomous: disable the REST api')
     parser.add_argument(
         '--no-matchmaker', action='store_const', default=False, const=True, help='Disable matchmaker functionality')
+    parser.add_argument(
+        '--matching-shards', default=0, type=int,
+        help='Match the asset pairs in this many worker processes (0 matches in the main process)')
+    parser.add_argument(
+        '--tick-journal-interval', default=0, type=int,
+        help='Journal order book changes to the database every this many seconds (0 saves the book on shutdown)')
+    parser.add_argument(
+        '--order-book-snapshot', action='store_const', default=False, const=True,
+        help='Write a binary snapshot of the order book on shutdown to speed up the next start')
+    parser.add_argument(
+        '--log-matching-statistics', default=0, type=int,
+        help='Log the matching statistics every this many seconds (0 disables logging)')
+    parser.add_argument(
+        '--message-statistics', action='store_const', default=False, const=True,
+        help='Count and time the incoming market messages and blocks per type')
+    parser.add_argument(
+        '--log-message-statistics', default=0, type=int,
+        help='Log the message statistics every this many seconds (0 disables logging)')
+    parser.add_argument(
+        '--loop-monitor', action='store_const', default=False, const=True,
+        help='Monitor the lag of the event loop and report the callbacks that block it')
+    parser.add_argument(
+        '--slow-callback-threshold', default=100, type=int,
+        help='Report callbacks that block the event loop for longer than this many milliseconds')
+    parser.add_argument(
+        '--profile', default=0, type=int,
+        help='Sample the stack of the event loop for this many seconds and write the profile to the statedir')
+    parser.add_argument(
+        '--profile-format', default='collapsed', choices=['collapsed', 'speedscope'],
+        help='Write the profile as collapsed stacks (for flame graphs) or in the speedscope format')
     parser.add_argument(
         '--statistics', action='store_const', default=False, const=True, help='Enable IPv8 overlay statistics')
     parser.add_argument(